@@ -12,6 +12,7 @@ from .constants import (
     InvoiceType,
     InvoiceStatus,
     PaymentStatus,
+    InvoiceEventType,
     VATRate,
     TaxType,
     DocumentLanguage,
@@ -19,6 +20,7 @@ from .constants import (
     PaymentMethod,
     PaymentTerms,
     CurrencyCode,
+    CalculationEngine,
 )
 
 # Exceptions
@@ -32,16 +34,26 @@ from .exceptions import (
     EInvoiceGenerationError,
     TaxCalculationError,
     DeliveryError,
+    IdempotencyKeyReusedError,
+    InvalidStatusTransitionError,
+    InvoiceConflictError,
+    ExchangeRateNotFoundError,
 )
 
 # Protocols
 from .protocols import (
     InvoiceStorage,
+    InvoiceCache,
+    IdempotencyStore,
+    ChangeFeed,
+    VATAggregateStore,
     PDFTemplateProvider,
     EInvoiceProvider,
     SerialNumberProvider,
+    SerialLockBackend,
     EmailProvider,
     VIESValidator,
+    FXRateProvider,
     I18nProvider,
 )
 
@@ -62,6 +74,13 @@ from .schemas import (
     InvoiceUpdate,
     InvoiceResponse,
     InvoiceListResponse,
+    BulkInvoiceResult,
+    BulkInvoiceResponse,
+    BatchUpdateResult,
+    BatchUpdateResponse,
+    OverdueSweepResult,
+    OverdueSweepReport,
+    InvoiceEvent,
     CreditNoteCreate,
     # Tax calculations
     VATSummary,
@@ -69,6 +88,10 @@ from .schemas import (
     # Payments
     PaymentRecord,
     PaymentRecordCreate,
+    # Bank reconciliation
+    StatementEntry,
+    ReconciliationLine,
+    ReconciliationReport,
     # Reports
     VATReport,
     OutstandingReport,
@@ -86,7 +109,28 @@ from .services import (
     InvoiceManager,
     VATCalculator,
     SerialNumberGenerator,
+    SerialAllocator,
+    SerialReservation,
+    FileSerialLock,
+    LocalInvoiceCache,
+    TaxResultCache,
+    TaxRuleEngine,
+    TaxRuleSet,
+    FXRateCache,
+    FXRateTable,
+    CachedVIESValidator,
+    check_vat_number,
+    check_vat_numbers,
+    check_tax_code,
+    InMemoryIdempotencyStore,
+    InMemoryChangeFeed,
+    FileChangeFeed,
+    ChangeFeedConsumer,
+    InMemoryVATAggregateStore,
+    INVOICE_TRANSITIONS,
+    can_transition,
     ReportingService,
+    ReconciliationService,
 )
 
 # Providers
@@ -107,6 +151,7 @@ __all__ = [
     "InvoiceType",
     "InvoiceStatus",
     "PaymentStatus",
+    "InvoiceEventType",
     "VATRate",
     "TaxType",
     "DocumentLanguage",
@@ -114,6 +159,7 @@ __all__ = [
     "PaymentMethod",
     "PaymentTerms",
     "CurrencyCode",
+    "CalculationEngine",
     # Exceptions
     "BillingError",
     "InvoiceNotFoundError",
@@ -124,13 +170,23 @@ __all__ = [
     "EInvoiceGenerationError",
     "TaxCalculationError",
     "DeliveryError",
+    "IdempotencyKeyReusedError",
+    "InvalidStatusTransitionError",
+    "InvoiceConflictError",
+    "ExchangeRateNotFoundError",
     # Protocols
     "InvoiceStorage",
+    "InvoiceCache",
+    "IdempotencyStore",
+    "ChangeFeed",
+    "VATAggregateStore",
     "PDFTemplateProvider",
     "EInvoiceProvider",
     "SerialNumberProvider",
+    "SerialLockBackend",
     "EmailProvider",
     "VIESValidator",
+    "FXRateProvider",
     "I18nProvider",
     # Schemas
     "Address",
@@ -145,11 +201,21 @@ __all__ = [
     "InvoiceUpdate",
     "InvoiceResponse",
     "InvoiceListResponse",
+    "BulkInvoiceResult",
+    "BulkInvoiceResponse",
+    "BatchUpdateResult",
+    "BatchUpdateResponse",
+    "OverdueSweepResult",
+    "OverdueSweepReport",
+    "InvoiceEvent",
     "CreditNoteCreate",
     "VATSummary",
     "TaxCalculationResult",
     "PaymentRecord",
     "PaymentRecordCreate",
+    "StatementEntry",
+    "ReconciliationLine",
+    "ReconciliationReport",
     "VATReport",
     "OutstandingReport",
     "CustomerBalance",
@@ -161,7 +227,28 @@ __all__ = [
     "InvoiceManager",
     "VATCalculator",
     "SerialNumberGenerator",
+    "SerialAllocator",
+    "SerialReservation",
+    "FileSerialLock",
+    "LocalInvoiceCache",
+    "TaxResultCache",
+    "TaxRuleEngine",
+    "TaxRuleSet",
+    "FXRateCache",
+    "FXRateTable",
+    "CachedVIESValidator",
+    "check_vat_number",
+    "check_vat_numbers",
+    "check_tax_code",
+    "InMemoryIdempotencyStore",
+    "InMemoryChangeFeed",
+    "FileChangeFeed",
+    "ChangeFeedConsumer",
+    "InMemoryVATAggregateStore",
+    "INVOICE_TRANSITIONS",
+    "can_transition",
     "ReportingService",
+    "ReconciliationService",
     # Providers
     "Jinja2PDFProvider",
     "FatturaPAProvider",
@@ -40,6 +40,16 @@ class PaymentStatus(str, Enum):
     REFUNDED = "refunded"
 
 
+class InvoiceEventType(str, Enum):
+    """Change feed event types."""
+    
+    CREATED = "created"
+    UPDATED = "updated"
+    CANCELED = "canceled"
+    SENT = "sent"
+    PAYMENT_RECORDED = "payment_recorded"
+
+
 class VATRate(str, Enum):
     """Common VAT rates (user can define custom)."""
     
@@ -120,9 +130,34 @@ class CurrencyCode(str, Enum):
     JPY = "JPY"
 
 
+class CalculationEngine(str, Enum):
+    """Arithmetic used by VATCalculator."""
+    
+    DECIMAL = "decimal"
+    INTEGER = "integer"  # Scaled integers (minor units)
+
+
+# Decimal places of each currency's minor unit (ISO 4217), default 2
+CURRENCY_MINOR_UNITS = {
+    "EUR": 2,
+    "USD": 2,
+    "GBP": 2,
+    "CHF": 2,
+    "JPY": 0,
+}
+
 # Default VAT rates by country
 DEFAULT_VAT_RATES = {
-    "IT": {"standard": 22, "reduced": [10, 5, 4]},
+    "IT": {
+        "standard": 22,
+        "reduced": [10, 5, 4],
+        # FatturaPA exemption natures (Natura) of zero-rated lines
+        "exempt": [
+            "N1", "N2.1", "N2.2", "N3.1", "N3.2", "N3.3", "N3.4", "N3.5", "N3.6",
+            "N4", "N5", "N6.1", "N6.2", "N6.3", "N6.4", "N6.5", "N6.6", "N6.7",
+            "N6.8", "N6.9", "N7",
+        ],
+    },
     "DE": {"standard": 19, "reduced": [7]},
     "FR": {"standard": 20, "reduced": [10, 5.5, 2.1]},
     "ES": {"standard": 21, "reduced": [10, 4]},
@@ -133,6 +168,12 @@ DEFAULT_VAT_RATES = {
     "PT": {"standard": 23, "reduced": [13, 6]},
 }
 
+# EU member states (ISO 3166-1), for intra-EU supplies
+EU_COUNTRIES = frozenset({
+    "AT", "BE", "BG", "CY", "CZ", "DE", "DK", "EE", "ES", "FI", "FR", "GR", "HR", "HU",
+    "IE", "IT", "LT", "LU", "LV", "MT", "NL", "PL", "PT", "RO", "SE", "SI", "SK",
+})
+
 # Retention rates (Italy)
 RETENTION_RATES_IT = {
     "professional": 20.0,  # Professionisti
@@ -2,6 +2,9 @@
 Custom exceptions for billing system.
 """
 
+from datetime import date
+from typing import Optional
+
 
 class BillingError(Exception):
     """Base exception for billing system."""
@@ -109,3 +112,54 @@ class PaymentAmountError(BillingError):
     
     def __init__(self, message: str):
         super().__init__(f"Payment amount error: {message}")
+
+
+class IdempotencyKeyReusedError(BillingError):
+    """Idempotency key reused with a different request."""
+    
+    def __init__(self, idempotency_key: str):
+        self.idempotency_key = idempotency_key
+        super().__init__(
+            f"Idempotency key {idempotency_key} was already used with a different request"
+        )
+
+
+class InvoiceConflictError(BillingError):
+    """Invoice was modified concurrently."""
+    
+    def __init__(self, invoice_id: str, message: Optional[str] = None):
+        self.invoice_id = invoice_id
+        super().__init__(
+            message or f"Invoice {invoice_id} was modified concurrently"
+        )
+
+
+class InvalidStatusTransitionError(InvalidInvoiceDataError):
+    """Invoice status change not allowed by the state machine."""
+    
+    def __init__(
+        self,
+        invoice_id: str,
+        current: str,
+        target: str,
+        message: Optional[str] = None,
+    ):
+        self.invoice_id = invoice_id
+        self.current = current
+        self.target = target
+        super().__init__(
+            "status",
+            message or f"Invoice {invoice_id} cannot move from {current} to {target}",
+        )
+
+
+class ExchangeRateNotFoundError(BillingError):
+    """No exchange rate available for currency pair and date."""
+    
+    def __init__(self, currency: str, quote_currency: str, on: date):
+        self.currency = currency
+        self.quote_currency = quote_currency
+        self.on = on
+        super().__init__(
+            f"No exchange rate {currency}/{quote_currency} available for {on}"
+        )
@@ -5,8 +5,18 @@ All protocols are database-agnostic and provider-agnostic.
 User implements these protocols with their own storage/services.
 """
 
-from typing import Protocol, Dict, Any, List, Optional
-from datetime import datetime
+from typing import (
+    Protocol,
+    Dict,
+    Any,
+    AsyncContextManager,
+    AsyncIterator,
+    Callable,
+    List,
+    Optional,
+    Tuple,
+)
+from datetime import date, datetime
 from decimal import Decimal
 
 
@@ -16,6 +26,15 @@ class InvoiceStorage(Protocol):
     
     User implements this with their database (PostgreSQL, MongoDB, etc.).
     All methods require tenant_id for multi-tenant isolation.
+    
+    Methods marked (optional) are only used when the implementation
+    defines them: the stubs below are ignored (see optional_method), so
+    subclassing this protocol does not opt into them.
+    
+    Invoices carry an integer version (1 on creation). Storages that
+    implement compare_and_set_invoice must increment it on every write
+    to an invoice (version = version + 1), so that conditional writes
+    detect concurrent changes.
     """
     
     async def create_invoice(
@@ -43,6 +62,19 @@ class InvoiceStorage(Protocol):
         """Get invoice by ID."""
         ...
     
+    async def get_invoices(
+        self,
+        tenant_id: str,
+        invoice_ids: List[str],
+    ) -> List[Dict[str, Any]]:
+        """
+        Get several invoices by ID in one round trip (optional).
+        
+        Unknown ids are skipped. Without it, get_invoice is called per
+        invoice.
+        """
+        ...
+    
     async def get_invoice_by_number(
         self,
         tenant_id: str,
@@ -51,6 +83,26 @@ class InvoiceStorage(Protocol):
         """Get invoice by unique number."""
         ...
     
+    async def create_invoices(
+        self,
+        tenant_id: str,
+        items: List[Dict[str, Any]],
+    ) -> List[Dict[str, Any]]:
+        """
+        Create several invoices in a single write (optional).
+        
+        Used by InvoiceManager.create_invoices_bulk. Storages that do
+        not implement it are called once per invoice via create_invoice.
+        
+        Args:
+            tenant_id: Tenant identifier
+            items: Invoice data dicts, same shape as create_invoice
+            
+        Returns:
+            Created invoices with id, in the same order as items
+        """
+        ...
+    
     async def update_invoice(
         self,
         tenant_id: str,
@@ -60,6 +112,49 @@ class InvoiceStorage(Protocol):
         """Update invoice fields."""
         ...
     
+    async def update_invoices(
+        self,
+        tenant_id: str,
+        updates: Dict[str, Dict[str, Any]],
+        expected: Optional[Dict[str, Dict[str, List[Any]]]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Update several invoices in one round trip (optional).
+        
+        updates maps invoice id to its field updates; batches often share
+        the same payload and can be written as a single statement (e.g.
+        UPDATE ... WHERE id = ANY($1) RETURNING *). Unknown ids are
+        skipped. Without it, update_invoice is called per invoice.
+        
+        expected maps invoice id to conditions as in
+        compare_and_set_invoice; invoices not matching them are skipped.
+        
+        Returns:
+            Updated invoices
+        """
+        ...
+    
+    async def compare_and_set_invoice(
+        self,
+        tenant_id: str,
+        invoice_id: str,
+        expected: Dict[str, List[Any]],
+        updates: Dict[str, Any],
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Update invoice only if its current fields match (optional).
+        
+        expected maps field names to the allowed current values, e.g.
+        {"version": [3]} for UPDATE ... SET version = version + 1 WHERE
+        version = $1 RETURNING *, or {"status": ["issued", "sent"]}.
+        Used for optimistic concurrency on read-modify-write sequences;
+        without it updates are unconditional.
+        
+        Returns:
+            Updated invoice, or None if not found or not matching
+        """
+        ...
+    
     async def list_invoices(
         self,
         tenant_id: str,
@@ -70,7 +165,45 @@ class InvoiceStorage(Protocol):
         """
         List invoices with filters.
         
-        Filters can include: status, customer_id, date_from, date_to, etc.
+        Filters can include: status, status_in, customer_id, date_from,
+        date_to, due_date_before (payment_info.due_date < value), etc.
+        Range filters should be served by an index, e.g. on
+        (tenant_id, status, due_date) for the overdue sweep.
+        """
+        ...
+    
+    async def list_invoices_after(
+        self,
+        tenant_id: str,
+        after: Optional[Dict[str, Any]] = None,
+        limit: int = 100,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        List invoices with keyset pagination (optional).
+        
+        Invoices are ordered by (issue_date, id) ascending. When after is
+        given (keys: issue_date, id), only invoices strictly after that
+        key are returned, e.g. WHERE (issue_date, id) > ($1, $2). Backed
+        by an index on (tenant_id, issue_date, id), cost does not grow
+        with the page depth and concurrent inserts never shift pages.
+        
+        Storages without it are paginated with list_invoices offsets.
+        """
+        ...
+    
+    def stream_invoices(
+        self,
+        tenant_id: str,
+        filters: Optional[Dict[str, Any]] = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream matching invoices one at a time (optional).
+        
+        Typically an async generator over a server-side cursor, fetching
+        batch_size rows per round trip. Used by reports, exports and
+        sweeps to run in bounded memory.
         """
         ...
     
@@ -83,6 +216,25 @@ class InvoiceStorage(Protocol):
         """Record payment for invoice."""
         ...
     
+    async def apply_payment(
+        self,
+        tenant_id: str,
+        invoice_id: str,
+        payment_data: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """
+        Record payment and increment invoice amount_paid atomically (optional).
+        
+        Must insert the payment and add payment_data["amount"] to the
+        invoice amount_paid in the same transaction (e.g. INSERT plus
+        UPDATE ... SET amount_paid = amount_paid + $1 RETURNING ...).
+        
+        Returns:
+            Dict with keys: payment (created payment with id),
+            invoice (invoice with updated amount_paid)
+        """
+        ...
+    
     async def get_payments(
         self,
         tenant_id: str,
@@ -91,6 +243,47 @@ class InvoiceStorage(Protocol):
         """Get all payments for invoice."""
         ...
     
+    async def append_events(
+        self,
+        tenant_id: str,
+        events: List[Dict[str, Any]],
+    ) -> None:
+        """
+        Write change events to the outbox (optional).
+        
+        Called by InvoiceManager inside unit_of_work right after each
+        mutation, so events commit or roll back together with it. The
+        outbox assigns increasing positions and is read through a
+        ChangeFeed implementation.
+        """
+        ...
+    
+    async def add_vat_buckets(
+        self,
+        tenant_id: str,
+        buckets: List[Dict[str, Any]],
+    ) -> None:
+        """
+        Add amounts to daily VAT aggregates (optional).
+        
+        Same contract as VATAggregateStore.add_vat_buckets; called inside
+        unit_of_work, so aggregates commit together with the invoice.
+        """
+        ...
+    
+    def unit_of_work(
+        self,
+        tenant_id: str,
+    ) -> AsyncContextManager[None]:
+        """
+        Open a transaction spanning the following storage calls (optional).
+        
+        Typically binds one database transaction to the current task
+        (e.g. via contextvars); commits on exit, rolls back on error.
+        Without it, events are appended after the mutation completes.
+        """
+        ...
+    
     async def get_last_serial_number(
         self,
         tenant_id: str,
@@ -99,6 +292,220 @@ class InvoiceStorage(Protocol):
     ) -> Optional[int]:
         """Get last used serial number for tenant/year/series."""
         ...
+    
+    async def reserve_serial_block(
+        self,
+        tenant_id: str,
+        year: int,
+        series: Optional[str] = None,
+        size: int = 1,
+    ) -> int:
+        """
+        Atomically claim a block of serial numbers (optional).
+        
+        Advances the tenant/year/series counter by size in a single
+        atomic operation (e.g. UPDATE ... RETURNING) so that concurrent
+        generators never receive overlapping blocks.
+        
+        Args:
+            tenant_id: Tenant identifier
+            year: Fiscal year
+            series: Optional series identifier
+            size: Number of serials to claim
+            
+        Returns:
+            First serial number of the claimed block
+        """
+        ...
+    
+    async def compare_and_set_serial(
+        self,
+        tenant_id: str,
+        year: int,
+        series: Optional[str],
+        expected: Optional[int],
+        new: int,
+    ) -> bool:
+        """
+        Atomically move the serial counter from expected to new (optional).
+        
+        Used by SerialAllocator in compare-and-set mode. The counter must
+        be the value returned by get_last_serial_number.
+        
+        Returns:
+            True if the counter was equal to expected and has been updated
+        """
+        ...
+    
+    async def release_serial_block(
+        self,
+        tenant_id: str,
+        year: int,
+        series: Optional[str],
+        start: int,
+        end: int,
+    ) -> None:
+        """
+        Account for reserved serials that were never used (optional).
+        
+        Called with the inclusive range [start, end] of a block that is
+        being abandoned. Storage can hand the range back if the counter
+        has not moved past it, or record the numbers as voided so that
+        the gap is documented.
+        """
+        ...
+
+
+class ChangeFeed(Protocol):
+    """
+    Protocol for the invoice change feed (outbox reader).
+    
+    User implements on top of the outbox written by
+    InvoiceStorage.append_events (e.g. SELECT ... WHERE position > $1
+    ORDER BY position LIMIT $2), or uses InMemoryChangeFeed /
+    FileChangeFeed locally.
+    """
+    
+    async def append_events(
+        self,
+        tenant_id: str,
+        events: List[Dict[str, Any]],
+    ) -> None:
+        """Append events, assigning increasing positions."""
+        ...
+    
+    async def read_events(
+        self,
+        after: int,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """Read up to limit events with position greater than after."""
+        ...
+    
+    async def load_checkpoint(self, consumer: str) -> int:
+        """Get last processed position of consumer (0 if none)."""
+        ...
+    
+    async def save_checkpoint(self, consumer: str, position: int) -> None:
+        """Store last processed position of consumer."""
+        ...
+
+
+class VATAggregateStore(Protocol):
+    """
+    Protocol for materialised daily VAT totals.
+    
+    User implements with a table keyed by (tenant_id, day, vat_rate,
+    currency), or uses InMemoryVATAggregateStore. Buckets are dicts with
+    keys: day (date), vat_rate (Decimal, None for invoice totals),
+    currency (str), invoices (int), taxable, vat, gross (Decimal).
+    """
+    
+    async def add_vat_buckets(
+        self,
+        tenant_id: str,
+        buckets: List[Dict[str, Any]],
+    ) -> None:
+        """Add invoices and amounts of buckets, creating missing ones (upsert)."""
+        ...
+    
+    async def get_vat_buckets(
+        self,
+        tenant_id: str,
+        start: date,
+        end: date,
+    ) -> List[Dict[str, Any]]:
+        """Get buckets with day between start and end (inclusive)."""
+        ...
+    
+    async def clear_vat_buckets(
+        self,
+        tenant_id: str,
+        start: date,
+        end: date,
+    ) -> None:
+        """Delete buckets with day between start and end (inclusive)."""
+        ...
+
+
+class SerialLockBackend(Protocol):
+    """
+    Protocol for cross-process serial allocation locks.
+    
+    User implements with file locks, Redis, database advisory locks, etc.
+    """
+    
+    async def acquire(self, key: str) -> None:
+        """Block until the exclusive lock for key is held."""
+        ...
+    
+    async def release(self, key: str) -> None:
+        """Release the lock for key."""
+        ...
+
+
+class InvoiceCache(Protocol):
+    """
+    Protocol for caching invoice records in front of InvoiceStorage.
+    
+    User implements with Redis, Memcached, etc. Keys are scoped by
+    tenant_id for multi-tenant isolation.
+    """
+    
+    async def get(
+        self,
+        tenant_id: str,
+        key: str,
+    ) -> Optional[Dict[str, Any]]:
+        """Get cached value, None on miss."""
+        ...
+    
+    async def set(
+        self,
+        tenant_id: str,
+        key: str,
+        value: Dict[str, Any],
+    ) -> None:
+        """Store value."""
+        ...
+    
+    async def delete(
+        self,
+        tenant_id: str,
+        key: str,
+    ) -> None:
+        """Invalidate value."""
+        ...
+
+
+class IdempotencyStore(Protocol):
+    """
+    Protocol for remembering results of idempotent operations.
+    
+    User implements with Redis (SET with EX), a database table, etc.
+    Keys are scoped by tenant_id and operation name; stored values are
+    JSON-compatible dicts.
+    """
+    
+    async def get(
+        self,
+        tenant_id: str,
+        operation: str,
+        key: str,
+    ) -> Optional[Dict[str, Any]]:
+        """Get stored result, None if unknown or expired."""
+        ...
+    
+    async def set(
+        self,
+        tenant_id: str,
+        operation: str,
+        key: str,
+        value: Dict[str, Any],
+        ttl: float,
+    ) -> None:
+        """Store result for ttl seconds."""
+        ...
 
 
 class PDFTemplateProvider(Protocol):
@@ -174,7 +581,8 @@ class SerialNumberProvider(Protocol):
     """
     Protocol for invoice numbering/sequencing.
     
-    Generates unique invoice numbers per tenant.
+    Generates unique invoice numbers per tenant. Methods marked
+    (optional) are only used when the implementation defines them.
     """
     
     async def generate_number(
@@ -198,6 +606,72 @@ class SerialNumberProvider(Protocol):
         """
         ...
     
+    async def generate_numbers(
+        self,
+        tenant_id: str,
+        documents: List[Tuple[str, datetime]],
+        series: Optional[str] = None,
+    ) -> List[str]:
+        """
+        Generate a contiguous block of invoice numbers (optional).
+        
+        Args:
+            tenant_id: Tenant identifier
+            documents: (invoice_type, date) pairs, in numbering order
+            series: Optional series identifier
+            
+        Returns:
+            Invoice numbers, one per document
+        """
+        ...
+    
+    async def reserve_numbers(
+        self,
+        tenant_id: str,
+        documents: List[Tuple[str, datetime]],
+        series: Optional[str] = None,
+    ) -> Any:
+        """
+        Reserve a block of invoice numbers for two-phase allocation (optional).
+        
+        Documents all fall in the same year. Used by bulk creation in
+        place of generate_numbers, so numbers are only consumed once the
+        invoices carrying them have been stored.
+        
+        Returns:
+            Reservation exposing invoice_numbers (one per document),
+            later passed to commit_numbers
+        """
+        ...
+    
+    async def commit_numbers(self, reservation: Any, count: int) -> None:
+        """Confirm the first count reserved numbers, give back the rest (optional)."""
+        ...
+    
+    async def reserve_number(
+        self,
+        tenant_id: str,
+        invoice_type: str,
+        date: datetime,
+        series: Optional[str] = None,
+    ) -> Any:
+        """
+        Reserve next invoice number for two-phase allocation (optional).
+        
+        Returns:
+            Reservation object exposing invoice_number, later passed to
+            commit_number or rollback_number
+        """
+        ...
+    
+    async def commit_number(self, reservation: Any) -> None:
+        """Confirm reserved number once the invoice is stored (optional)."""
+        ...
+    
+    async def rollback_number(self, reservation: Any) -> None:
+        """Give back reserved number when storing failed (optional)."""
+        ...
+    
     async def validate_number(
         self,
         tenant_id: str,
@@ -256,6 +730,31 @@ class VIESValidator(Protocol):
         ...
 
 
+class FXRateProvider(Protocol):
+    """
+    Protocol for exchange rate sources.
+    
+    User implements (e.g. ECB reference rates, bank feed). Rates are
+    usually not published every day: FXRateCache uses the latest rate
+    on or before the requested date.
+    """
+    
+    async def get_rates(
+        self,
+        currency: str,
+        quote_currency: str,
+        start: date,
+        end: date,
+    ) -> Dict[date, Decimal]:
+        """
+        Get rates published between start and end (inclusive).
+        
+        Returns:
+            Dict date -> units of quote_currency per unit of currency
+        """
+        ...
+
+
 class I18nProvider(Protocol):
     """
     Protocol for internationalization.
@@ -285,3 +784,30 @@ class I18nProvider(Protocol):
     def get_supported_languages(self) -> List[str]:
         """Get list of supported language codes."""
         ...
+
+
+def optional_method(implementation: Any, name: str) -> Optional[Callable[..., Any]]:
+    """
+    Get an optional protocol method if the implementation provides it.
+    
+    Methods marked (optional) are declared as stubs in the protocol
+    bodies, so classes subclassing a protocol explicitly (class
+    PostgresInvoiceStorage(InvoiceStorage)) inherit them. Inherited stubs
+    do not count: None is returned unless the method is defined by a
+    class that is not a Protocol, or set on the instance.
+    
+    Args:
+        implementation: Object implementing a protocol
+        name: Method name
+        
+    Returns:
+        Bound method, or None if not implemented
+    """
+    method: Optional[Callable[..., Any]] = getattr(implementation, name, None)
+    if method is None or name in getattr(implementation, "__dict__", ()):
+        return method
+    
+    for klass in type(implementation).__mro__:
+        if name in vars(klass):
+            return None if getattr(klass, "_is_protocol", False) else method
+    return method
@@ -2,12 +2,12 @@
 FastAPI router factory for billing endpoints.
 """
 
-from typing import Optional
-from fastapi import APIRouter, HTTPException, status
+from typing import Any, Dict, Optional
+from fastapi import APIRouter, HTTPException, Query, status
 from datetime import date
-from ..services import InvoiceManager, ReportingService
-from ..providers import Jinja2PDFProvider, FatturaPAProvider, SimpleEmailProvider
-from ..schemas import (
+from .services import InvoiceManager, ReportingService
+from .providers import Jinja2PDFProvider, FatturaPAProvider, SimpleEmailProvider
+from .schemas import (
     InvoiceCreate,
     InvoiceUpdate,
     InvoiceResponse,
@@ -22,7 +22,7 @@ from ..schemas import (
     VATReport,
     OutstandingReport,
 )
-from ..exceptions import BillingError
+from .exceptions import BillingError
 
 
 def create_billing_router(
@@ -93,17 +93,31 @@ def create_billing_router(
     @router.get("/{tenant_id}/invoices", response_model=InvoiceListResponse)
     async def list_invoices(
         tenant_id: str,
-        skip: int = 0,
-        limit: int = 100,
+        skip: int = Query(0, ge=0),
+        limit: int = Query(100, ge=1, le=1000),
+        cursor: Optional[str] = None,
     ):
-        """List invoices."""
-        invoices = await invoice_manager.list_invoices(tenant_id, skip, limit)
-        return InvoiceListResponse(
-            invoices=invoices,
-            total=len(invoices),
-            skip=skip,
-            limit=limit,
-        )
+        """
+        List invoices.
+        
+        Without skip, pages are cursor-based: pass next_cursor of the
+        previous response as cursor to fetch the following page.
+        """
+        if skip and not cursor:
+            invoices = await invoice_manager.list_invoices(tenant_id, skip, limit)
+            return InvoiceListResponse(
+                invoices=invoices,
+                total=len(invoices),
+                skip=skip,
+                limit=limit,
+            )
+        
+        try:
+            return await invoice_manager.list_invoices_page(
+                tenant_id, limit=limit, cursor=cursor
+            )
+        except BillingError as e:
+            raise HTTPException(status_code=400, detail=str(e)) from e
     
     @router.put("/{tenant_id}/invoices/{invoice_id}", response_model=InvoiceResponse)
     async def update_invoice(
@@ -202,7 +216,7 @@ def create_billing_router(
                 invoice.model_dump(), format=request.format
             )
             
-            validation = {"valid": True, "errors": []}
+            validation: Dict[str, Any] = {"valid": True, "errors": []}
             if request.validate:
                 validation = await einvoice_provider.validate_xml(
                     result["xml"], format=request.format
@@ -4,10 +4,10 @@ Pydantic schemas for billing system.
 All DTOs for invoice creation, tax calculations, reports, etc.
 """
 
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime, date
 from decimal import Decimal
-from pydantic import BaseModel, Field, EmailStr, field_validator
+from pydantic import BaseModel, Field, EmailStr, PrivateAttr, computed_field, field_validator
 
 
 # Base entities
@@ -126,22 +126,80 @@ class InvoiceRow(BaseModel):
     discount_percent: Decimal = Field(default=Decimal("0"), ge=0, le=100)
     unit: Optional[str] = "unit"
     product_code: Optional[str] = None
+    vat_nature: Optional[str] = None  # Exemption nature of zero-rated rows (e.g. IT "N2.2")
+    
+    # Field values the amounts were computed from, then (subtotal, vat, total)
+    _amounts: Optional[Tuple[Any, ...]] = PrivateAttr(default=None)
+    
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def subtotal(self) -> Decimal:
+        """Row subtotal before VAT."""
+        return self._calculate()[0]
+    
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def vat_amount(self) -> Decimal:
+        """VAT amount of row."""
+        return self._calculate()[1]
+    
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def total(self) -> Decimal:
+        """Row total with VAT."""
+        return self._calculate()[2]
     
     def calculate_subtotal(self) -> Decimal:
         """Calculate row subtotal before VAT."""
-        subtotal = self.quantity * self.unit_price
-        if self.discount_percent > 0:
-            subtotal = subtotal * (1 - self.discount_percent / 100)
-        return subtotal.quantize(Decimal("0.01"))
+        return self._calculate()[0]
     
     def calculate_vat(self) -> Decimal:
         """Calculate VAT amount for row."""
-        subtotal = self.calculate_subtotal()
-        return (subtotal * self.vat_rate / 100).quantize(Decimal("0.01"))
+        return self._calculate()[1]
     
     def calculate_total(self) -> Decimal:
         """Calculate row total with VAT."""
-        return (self.calculate_subtotal() + self.calculate_vat()).quantize(Decimal("0.01"))
+        return self._calculate()[2]
+    
+    def _calculate(self) -> Tuple[Decimal, Decimal, Decimal]:
+        """
+        Compute row amounts once.
+        
+        The result is kept with the field values it was computed from
+        and reused while they are the same objects, so assigning a field
+        (or model_copy with update) recomputes it.
+        """
+        # Private storage is read directly: attribute access to private
+        # attributes goes through BaseModel.__getattr__, which costs more
+        # than the arithmetic it would save. It is never None: the model
+        # declares a private attribute
+        private: Dict[str, Any] = self.__pydantic_private__  # type: ignore[assignment]
+        cached = private["_amounts"]
+        if (
+            cached is not None
+            and cached[0] is self.quantity
+            and cached[1] is self.unit_price
+            and cached[2] is self.discount_percent
+            and cached[3] is self.vat_rate
+        ):
+            amounts: Tuple[Decimal, Decimal, Decimal] = cached[4]
+            return amounts
+        
+        subtotal = self.quantity * self.unit_price
+        if self.discount_percent > 0:
+            subtotal = subtotal * (1 - self.discount_percent / 100)
+        subtotal = subtotal.quantize(Decimal("0.01"))
+        vat = (subtotal * self.vat_rate / 100).quantize(Decimal("0.01"))
+        amounts = (subtotal, vat, (subtotal + vat).quantize(Decimal("0.01")))
+        
+        private["_amounts"] = (
+            self.quantity,
+            self.unit_price,
+            self.discount_percent,
+            self.vat_rate,
+            amounts,
+        )
+        return amounts
     
     class Config:
         json_schema_extra = {
@@ -232,6 +290,7 @@ class InvoiceCreate(BaseModel):
     reverse_charge: bool = False
     series: Optional[str] = None
     metadata: Optional[Dict[str, Any]] = None
+    idempotency_key: Optional[str] = Field(default=None, max_length=255)  # Not stored
 
 
 class InvoiceUpdate(BaseModel):
@@ -262,10 +321,16 @@ class InvoiceResponse(BaseModel):
     total_vat: Decimal
     total: Decimal
     net_to_pay: Decimal  # After retention
+    amount_paid: Decimal = Decimal("0")  # Running total of payments
+    credited_total: Decimal = Decimal("0")  # Total of credit notes issued against it
+    vat_summaries: Optional[List["VATSummary"]] = None
+    version: int = 1  # Incremented by storage on every update
     
     # Optional
     retention: Optional[RetentionInfo] = None
+    social_security_rate: Optional[Decimal] = None
     social_security_amount: Optional[Decimal] = None
+    stamp_duty: bool = False  # Requested; applied only under the threshold
     stamp_duty_amount: Optional[Decimal] = None
     split_payment: bool = False
     reverse_charge: bool = False
@@ -275,12 +340,71 @@ class InvoiceResponse(BaseModel):
     language: str = "en"
     series: Optional[str] = None
     metadata: Optional[Dict[str, Any]] = None
+    original_invoice_id: Optional[str] = None  # Credited invoice (credit notes)
     
     # Timestamps
     created_at: datetime
     updated_at: datetime
     sent_at: Optional[datetime] = None
     paid_at: Optional[datetime] = None
+    
+    @classmethod
+    def from_trusted(cls, data: Dict[str, Any]) -> "InvoiceResponse":
+        """
+        Build response from trusted storage data without validation.
+        
+        Nested models are assembled with model_construct: no type
+        coercion or validation takes place, so data must already have
+        native types (Decimal, date, datetime) as written by
+        InvoiceManager. Use only with storages that return what was
+        stored. Nested containers (e.g. metadata) are shared with data,
+        not copied.
+        """
+        values = dict(data)
+        values["company"] = _construct_party(Company, values["company"])
+        values["customer"] = _construct_party(Customer, values["customer"])
+        values["rows"] = [
+            row if isinstance(row, InvoiceRow) else _construct_row(row)
+            for row in values["rows"]
+        ]
+        if isinstance(values["payment_info"], dict):
+            values["payment_info"] = PaymentInfo.model_construct(
+                **values["payment_info"]
+            )
+        if isinstance(values.get("retention"), dict):
+            values["retention"] = RetentionInfo.model_construct(**values["retention"])
+        if values.get("vat_summaries"):
+            values["vat_summaries"] = [
+                summary if isinstance(summary, VATSummary) else VATSummary.model_construct(**summary)
+                for summary in values["vat_summaries"]
+            ]
+        return cls.model_construct(**values)
+
+
+def _construct_row(data: Dict[str, Any]) -> InvoiceRow:
+    """Construct InvoiceRow, reusing the amounts stored with it."""
+    row = InvoiceRow.model_construct(**data)
+    if "subtotal" in data and "vat_amount" in data and "total" in data:
+        row._amounts = (
+            row.quantity,
+            row.unit_price,
+            row.discount_percent,
+            row.vat_rate,
+            (data["subtotal"], data["vat_amount"], data["total"]),
+        )
+    return row
+
+
+def _construct_party(model: Any, data: Any) -> Any:
+    """Construct Company/Customer with nested address and tax info."""
+    if not isinstance(data, dict):
+        return data
+    values = dict(data)
+    if isinstance(values.get("address"), dict):
+        values["address"] = Address.model_construct(**values["address"])
+    if isinstance(values.get("tax_info"), dict):
+        values["tax_info"] = TaxInfo.model_construct(**values["tax_info"])
+    return model.model_construct(**values)
 
 
 class InvoiceListResponse(BaseModel):
@@ -290,6 +414,64 @@ class InvoiceListResponse(BaseModel):
     total: int
     skip: int
     limit: int
+    next_cursor: Optional[str] = None  # Opaque cursor of the next page
+
+
+class BulkInvoiceResult(BaseModel):
+    """Outcome of a single item in a bulk invoice creation."""
+    
+    index: int  # Position in the submitted batch
+    invoice: Optional[InvoiceResponse] = None
+    error: Optional[str] = None
+
+
+class BulkInvoiceResponse(BaseModel):
+    """Bulk invoice creation response."""
+    
+    results: List[BulkInvoiceResult]
+    created: int
+    failed: int
+
+
+class BatchUpdateResult(BaseModel):
+    """Outcome of a single invoice in a batch status change."""
+    
+    invoice_id: str
+    invoice: Optional[InvoiceResponse] = None
+    error: Optional[str] = None
+
+
+class BatchUpdateResponse(BaseModel):
+    """Batch status change response."""
+    
+    results: List[BatchUpdateResult]
+    updated: int
+    failed: int
+
+
+class OverdueSweepResult(BaseModel):
+    """Outcome of an overdue sweep for one tenant."""
+    
+    tenant_id: str
+    as_of: date
+    scanned: int  # Past-due candidates read from storage
+    marked: int  # Invoices moved to overdue
+    failed: int = 0
+    batches: int = 0  # Bulk update round trips
+    duration_ms: float
+    error: Optional[str] = None  # Set when the sweep was aborted
+
+
+class OverdueSweepReport(BaseModel):
+    """Overdue sweep across several tenants."""
+    
+    as_of: date
+    tenants: int
+    scanned: int
+    marked: int
+    failed: int
+    duration_ms: float
+    results: List[OverdueSweepResult]
 
 
 class CreditNoteCreate(BaseModel):
@@ -298,6 +480,7 @@ class CreditNoteCreate(BaseModel):
     original_invoice_id: str
     reason: str
     rows: Optional[List[InvoiceRow]] = None  # If None, credit full invoice
+    row_indices: Optional[List[int]] = None  # Credit selected rows of the original
     issue_date: date
     notes: Optional[str] = None
 
@@ -335,6 +518,7 @@ class PaymentRecordCreate(BaseModel):
     payment_method: str
     transaction_id: Optional[str] = None
     notes: Optional[str] = None
+    idempotency_key: Optional[str] = Field(default=None, max_length=255)  # Not stored
 
 
 class PaymentRecord(BaseModel):
@@ -350,6 +534,62 @@ class PaymentRecord(BaseModel):
     created_at: datetime
 
 
+# Bank reconciliation
+
+class StatementEntry(BaseModel):
+    """Bank statement credit/debit line."""
+    
+    line: int  # Position in the statement
+    amount: Decimal  # Positive for credits, negative for debits
+    booking_date: date
+    currency: str = "EUR"
+    reference: Optional[str] = None  # Remittance information
+    counterparty_name: Optional[str] = None
+    transaction_id: Optional[str] = None
+
+
+class ReconciliationLine(BaseModel):
+    """Statement line that could not be applied automatically."""
+    
+    entry: StatementEntry
+    status: str  # ambiguous, unmatched, failed
+    reason: str
+    candidate_invoice_ids: List[str] = []
+
+
+class ReconciliationReport(BaseModel):
+    """Bank statement reconciliation result."""
+    
+    tenant_id: str
+    total_lines: int
+    matched: int
+    ambiguous: int
+    unmatched: int
+    skipped: int  # Debits and zero amounts
+    failed: int  # Matched but payment could not be recorded
+    matched_amount: Decimal
+    lines: List[ReconciliationLine]  # Non-matched lines (capped)
+    dry_run: bool = False
+    generated_at: datetime
+
+
+# Change feed
+
+class InvoiceEvent(BaseModel):
+    """Immutable invoice change event."""
+    
+    id: str
+    tenant_id: str
+    invoice_id: str
+    event_type: str
+    occurred_at: datetime
+    payload: Dict[str, Any]  # Invoice (or payment) record after the change
+    position: Optional[int] = None  # Assigned by the change feed
+    
+    class Config:
+        frozen = True
+
+
 # Reports
 
 class VATReport(BaseModel):
@@ -364,6 +604,7 @@ class VATReport(BaseModel):
     total_gross: Decimal
     vat_by_rate: List[VATSummary]
     generated_at: datetime
+    currency: Optional[str] = None  # Reporting currency amounts were converted to
 
 
 class CustomerBalance(BaseModel):
@@ -3,11 +3,44 @@
 from .invoice_manager import InvoiceManager
 from .vat_calculator import VATCalculator
 from .serial_generator import SerialNumberGenerator
+from .serial_allocator import SerialAllocator, SerialReservation, FileSerialLock
+from .invoice_cache import LocalInvoiceCache
+from .tax_cache import TaxResultCache
+from .tax_rules import TaxRuleEngine, TaxRuleSet
+from .fx import FXRateCache, FXRateTable
+from .vies import CachedVIESValidator
+from .vat_numbers import check_vat_number, check_vat_numbers, check_tax_code
+from .idempotency import InMemoryIdempotencyStore
+from .change_feed import InMemoryChangeFeed, FileChangeFeed, ChangeFeedConsumer
+from .vat_aggregates import InMemoryVATAggregateStore
+from .invoice_state import INVOICE_TRANSITIONS, can_transition
 from .reporting import ReportingService
+from .reconciliation import ReconciliationService
 
 __all__ = [
     "InvoiceManager",
     "VATCalculator",
     "SerialNumberGenerator",
+    "SerialAllocator",
+    "SerialReservation",
+    "FileSerialLock",
+    "LocalInvoiceCache",
+    "TaxResultCache",
+    "TaxRuleEngine",
+    "TaxRuleSet",
+    "FXRateCache",
+    "FXRateTable",
+    "CachedVIESValidator",
+    "check_vat_number",
+    "check_vat_numbers",
+    "check_tax_code",
+    "InMemoryIdempotencyStore",
+    "InMemoryChangeFeed",
+    "FileChangeFeed",
+    "ChangeFeedConsumer",
+    "InMemoryVATAggregateStore",
+    "INVOICE_TRANSITIONS",
+    "can_transition",
     "ReportingService",
+    "ReconciliationService",
 ]
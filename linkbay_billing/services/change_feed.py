@@ -0,0 +1,249 @@
+"""
+Invoice change feed.
+
+Local change feed implementations and an at-least-once consumer. In
+production the feed is usually the outbox table written by
+InvoiceStorage.append_events in the same transaction as each change.
+"""
+
+import asyncio
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from ..protocols import ChangeFeed
+from ..schemas import InvoiceEvent
+
+
+class InMemoryChangeFeed:
+    """
+    In-process change feed.
+    
+    Suitable for tests and single-process deployments: events and
+    checkpoints are lost when the process exits.
+    """
+    
+    def __init__(self) -> None:
+        """Initialize empty feed."""
+        self._events: List[Dict[str, Any]] = []
+        self._checkpoints: Dict[str, int] = {}
+    
+    async def append_events(
+        self,
+        tenant_id: str,
+        events: List[Dict[str, Any]],
+    ) -> None:
+        """Append events, assigning consecutive positions."""
+        for event in events:
+            self._events.append({**event, "position": len(self._events) + 1})
+    
+    async def read_events(
+        self,
+        after: int,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """Read up to limit events with position greater than after."""
+        return self._events[after:after + limit]
+    
+    async def load_checkpoint(self, consumer: str) -> int:
+        """Get last processed position of consumer (0 if none)."""
+        return self._checkpoints.get(consumer, 0)
+    
+    async def save_checkpoint(self, consumer: str, position: int) -> None:
+        """Store last processed position of consumer."""
+        self._checkpoints[consumer] = position
+
+
+class FileChangeFeed:
+    """
+    Change feed stored as JSON lines in a local directory.
+    
+    Events are appended to events.jsonl (position = line number) and
+    consumer checkpoints are kept in checkpoints.json, replaced
+    atomically. Meant for a single writer process; decimals, dates and
+    datetimes are stored as strings. A trailing line without newline,
+    left by a writer that crashed mid-append, is ignored and overwritten
+    by the next append.
+    """
+    
+    def __init__(self, directory: str, fsync: bool = False) -> None:
+        """
+        Initialize file feed.
+        
+        Args:
+            directory: Directory holding the feed files
+            fsync: Flush every append to disk before returning
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.fsync = fsync
+        self._events_path = os.path.join(directory, "events.jsonl")
+        self._checkpoints_path = os.path.join(directory, "checkpoints.json")
+        self._lock = asyncio.Lock()
+        
+        # Byte offset of every line, so reads can seek to a position
+        self._offsets: List[int] = []
+        self._size = 0
+        if os.path.exists(self._events_path):
+            with open(self._events_path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    self._offsets.append(self._size)
+                    self._size += len(line)
+    
+    async def append_events(
+        self,
+        tenant_id: str,
+        events: List[Dict[str, Any]],
+    ) -> None:
+        """Append events, assigning consecutive positions."""
+        async with self._lock:
+            lines: List[bytes] = []
+            for event in events:
+                position = len(self._offsets) + len(lines) + 1
+                record = json.dumps(
+                    {**event, "position": position},
+                    default=_json_default,
+                    separators=(",", ":"),
+                )
+                lines.append((record + "\n").encode("utf-8"))
+            
+            with open(self._events_path, "ab") as f:
+                # Drop a torn line of a crashed append
+                f.truncate(self._size)
+                for line in lines:
+                    f.write(line)
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            
+            for line in lines:
+                self._offsets.append(self._size)
+                self._size += len(line)
+    
+    async def read_events(
+        self,
+        after: int,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """Read up to limit events with position greater than after."""
+        if after >= len(self._offsets):
+            return []
+        
+        events = []
+        with open(self._events_path, "rb") as f:
+            f.seek(self._offsets[after])
+            for _ in range(min(limit, len(self._offsets) - after)):
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    break
+                events.append(json.loads(line))
+        return events
+    
+    async def load_checkpoint(self, consumer: str) -> int:
+        """Get last processed position of consumer (0 if none)."""
+        return self._read_checkpoints().get(consumer, 0)
+    
+    async def save_checkpoint(self, consumer: str, position: int) -> None:
+        """Store last processed position of consumer."""
+        async with self._lock:
+            checkpoints = self._read_checkpoints()
+            checkpoints[consumer] = position
+            
+            tmp_path = f"{self._checkpoints_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(checkpoints, f)
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, self._checkpoints_path)
+    
+    def _read_checkpoints(self) -> Dict[str, int]:
+        """Load checkpoints file."""
+        if not os.path.exists(self._checkpoints_path):
+            return {}
+        with open(self._checkpoints_path) as f:
+            checkpoints: Dict[str, int] = json.load(f)
+        return checkpoints
+
+
+class ChangeFeedConsumer:
+    """
+    At-least-once consumer of the invoice change feed.
+    
+    Events are handed to handler in batches, in position order. The
+    checkpoint is saved only after the handler returns, so a batch is
+    delivered again if the handler fails or the process dies: handlers
+    must be idempotent (e.g. skip event ids already applied).
+    """
+    
+    def __init__(
+        self,
+        feed: ChangeFeed,
+        name: str,
+        handler: Callable[[List[InvoiceEvent]], Awaitable[None]],
+        batch_size: int = 100,
+        poll_interval: float = 1.0,
+    ):
+        """
+        Initialize consumer.
+        
+        Args:
+            feed: Change feed to read
+            name: Consumer name, key of its checkpoint
+            handler: Async callable processing a batch of events
+            batch_size: Maximum events per handler call
+            poll_interval: Seconds to wait when the feed is drained
+        """
+        self.feed = feed
+        self.name = name
+        self.handler = handler
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+    
+    async def poll(self) -> int:
+        """
+        Process the next batch of events.
+        
+        Returns:
+            Number of events processed (0 when the feed is drained)
+        """
+        position = await self.feed.load_checkpoint(self.name)
+        records = await self.feed.read_events(position, self.batch_size)
+        if not records:
+            return 0
+        
+        events = [InvoiceEvent(**record) for record in records]
+        await self.handler(events)
+        await self.feed.save_checkpoint(self.name, records[-1]["position"])
+        return len(events)
+    
+    async def run(self, stop: Optional[asyncio.Event] = None) -> None:
+        """
+        Process events until stop is set.
+        
+        Handler errors propagate: restarting the consumer resumes from
+        the last checkpoint.
+        """
+        stop = stop or asyncio.Event()
+        while not stop.is_set():
+            processed = await self.poll()
+            if processed < self.batch_size:
+                try:
+                    await asyncio.wait_for(stop.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+
+def _json_default(value: Any) -> Any:
+    """Serialize values json does not handle natively."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,172 @@
+"""
+Exchange rates and currency conversion.
+"""
+
+import asyncio
+from bisect import bisect_right
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from ..constants import CURRENCY_MINOR_UNITS
+from ..exceptions import ExchangeRateNotFoundError
+from ..protocols import FXRateProvider
+
+
+def currency_quantum(currency: Optional[str]) -> Decimal:
+    """Smallest unit of currency (Decimal("0.01") by default)."""
+    minor_units = CURRENCY_MINOR_UNITS.get(currency, 2) if currency else 2
+    return Decimal(1).scaleb(-minor_units)
+
+
+class FXRateTable:
+    """
+    Rates of one currency pair indexed by date.
+    
+    Lookups bisect the sorted publication dates and return the latest
+    rate on or before the requested date.
+    """
+    
+    def __init__(self) -> None:
+        """Initialize empty table."""
+        self.dates: List[date] = []
+        self.rates: List[Decimal] = []
+    
+    def add(self, rates: Mapping[date, Decimal]) -> None:
+        """Merge published rates into the table."""
+        merged = dict(zip(self.dates, self.rates))
+        merged.update(rates)
+        self.dates = sorted(merged)
+        self.rates = [merged[day] for day in self.dates]
+    
+    def lookup(self, on: date, max_age: timedelta) -> Optional[Decimal]:
+        """Get latest rate published at most max_age before on."""
+        index = bisect_right(self.dates, on) - 1
+        if index < 0 or on - self.dates[index] > max_age:
+            return None
+        return self.rates[index]
+
+
+class FXRateCache:
+    """
+    In-memory, date-indexed exchange rate cache over an FXRateProvider.
+    
+    Each currency pair keeps one rate table covering a contiguous date
+    range, extended on demand by fetching only the missing days. Resolved
+    rates are memoised per (currency, quote currency, date), so the
+    provider and the table are consulted once per distinct date.
+    """
+    
+    def __init__(
+        self,
+        provider: FXRateProvider,
+        lookback_days: int = 7,
+    ):
+        """
+        Initialize rate cache.
+        
+        Args:
+            provider: Exchange rate source
+            lookback_days: Maximum age of the rate used for a date
+                without publication (weekends, holidays)
+        """
+        self.provider = provider
+        self.lookback = timedelta(days=lookback_days)
+        self.provider_calls = 0
+        self._tables: Dict[Tuple[str, str], FXRateTable] = {}
+        self._coverage: Dict[Tuple[str, str], Tuple[date, date]] = {}
+        self._resolved: Dict[Tuple[str, str, date], Decimal] = {}
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+    
+    async def preload(
+        self,
+        currency: str,
+        quote_currency: str,
+        start: date,
+        end: date,
+    ) -> None:
+        """Load rates needed for dates between start and end in one call."""
+        if currency != quote_currency:
+            await self._cover((currency, quote_currency), start - self.lookback, end)
+    
+    async def get_rate(
+        self,
+        currency: str,
+        quote_currency: str,
+        on: date,
+    ) -> Decimal:
+        """
+        Get rate converting currency to quote_currency on a date.
+        
+        Raises:
+            ExchangeRateNotFoundError: If no rate was published within
+                lookback_days before on
+        """
+        if currency == quote_currency:
+            return Decimal("1")
+        
+        key = (currency, quote_currency, on)
+        rate = self._resolved.get(key)
+        if rate is not None:
+            return rate
+        
+        pair = (currency, quote_currency)
+        await self._cover(pair, on - self.lookback, on)
+        rate = self._tables[pair].lookup(on, self.lookback)
+        if rate is None:
+            raise ExchangeRateNotFoundError(currency, quote_currency, on)
+        
+        self._resolved[key] = rate
+        return rate
+    
+    async def convert(
+        self,
+        amount: Decimal,
+        currency: str,
+        quote_currency: str,
+        on: date,
+    ) -> Decimal:
+        """Convert amount, rounded to quote_currency's minor unit."""
+        if currency == quote_currency:
+            return amount
+        rate = await self.get_rate(currency, quote_currency, on)
+        return (amount * rate).quantize(currency_quantum(quote_currency))
+    
+    def clear(self) -> None:
+        """Drop all loaded rates."""
+        self._tables.clear()
+        self._coverage.clear()
+        self._resolved.clear()
+    
+    async def _cover(self, pair: Tuple[str, str], start: date, end: date) -> None:
+        """Make sure the table of pair covers start..end."""
+        coverage = self._coverage.get(pair)
+        if coverage is not None and coverage[0] <= start and end <= coverage[1]:
+            return
+        
+        lock = self._locks.get(pair)
+        if lock is None:
+            lock = self._locks[pair] = asyncio.Lock()
+        
+        async with lock:
+            coverage = self._coverage.get(pair)
+            table = self._tables.setdefault(pair, FXRateTable())
+            
+            if coverage is None:
+                gaps = [(start, end)]
+                coverage = (start, end)
+            else:
+                # Fetch only the days outside the covered range
+                gaps = []
+                if start < coverage[0]:
+                    gaps.append((start, coverage[0] - timedelta(days=1)))
+                if end > coverage[1]:
+                    gaps.append((coverage[1] + timedelta(days=1), end))
+                coverage = (min(start, coverage[0]), max(end, coverage[1]))
+            
+            for gap_start, gap_end in gaps:
+                self.provider_calls += 1
+                table.add(
+                    await self.provider.get_rates(*pair, gap_start, gap_end)
+                )
+            self._coverage[pair] = coverage
@@ -0,0 +1,64 @@
+"""
+In-process idempotency store.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class InMemoryIdempotencyStore:
+    """
+    In-process idempotency store with TTL.
+    
+    Default idempotency backend of InvoiceManager. Results only survive
+    as long as the process: use a shared store (Redis, database) when
+    retries may reach another worker.
+    """
+    
+    def __init__(self, max_entries: int = 100000):
+        """
+        Initialize idempotency store.
+        
+        Args:
+            max_entries: Maximum remembered keys, oldest dropped first
+        """
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Tuple[str, str, str], Tuple[float, Dict[str, Any]]] = (
+            OrderedDict()
+        )
+    
+    async def get(
+        self,
+        tenant_id: str,
+        operation: str,
+        key: str,
+    ) -> Optional[Dict[str, Any]]:
+        """Get stored result, None if unknown or expired."""
+        entry = self._entries.get((tenant_id, operation, key))
+        
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._entries[(tenant_id, operation, key)]
+            return None
+        return entry[1]
+    
+    async def set(
+        self,
+        tenant_id: str,
+        operation: str,
+        key: str,
+        value: Dict[str, Any],
+        ttl: float,
+    ) -> None:
+        """Store result for ttl seconds."""
+        self._entries[(tenant_id, operation, key)] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end((tenant_id, operation, key))
+        
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def __len__(self) -> int:
+        """Number of remembered keys."""
+        return len(self._entries)
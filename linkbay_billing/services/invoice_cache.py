@@ -0,0 +1,123 @@
+"""
+In-process invoice cache.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class LocalInvoiceCache:
+    """
+    In-process LRU cache with TTL for invoice records.
+    
+    Default cache backend of InvoiceManager. Entries are scoped by
+    tenant_id and expire after ttl seconds even without writes. Writes
+    of other processes are not seen: their changes are read stale for
+    up to ttl seconds. With several writing processes, use a shared
+    InvoiceCache or disable this one (max_entries=0).
+    Records are copied on set and get, so callers mutating a record
+    (or a response built from it with from_trusted) never alter the
+    cached entry.
+    """
+    
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttl: float = 30.0,
+    ):
+        """
+        Initialize local cache.
+        
+        Args:
+            max_entries: Maximum cached entries (0 disables caching)
+            ttl: Entry time-to-live in seconds
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[Tuple[str, str], Tuple[float, Dict[str, Any]]] = (
+            OrderedDict()
+        )
+    
+    async def get(
+        self,
+        tenant_id: str,
+        key: str,
+    ) -> Optional[Dict[str, Any]]:
+        """Get cached value, None on miss or expiry."""
+        entry = self._entries.get((tenant_id, key))
+        
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[(tenant_id, key)]
+            self.misses += 1
+            return None
+        
+        self._entries.move_to_end((tenant_id, key))
+        self.hits += 1
+        return _copy_record(entry[1])
+    
+    async def set(
+        self,
+        tenant_id: str,
+        key: str,
+        value: Dict[str, Any],
+    ) -> None:
+        """Store value, evicting least recently used entries."""
+        if self.max_entries <= 0:
+            return
+        
+        self._entries[(tenant_id, key)] = (
+            time.monotonic() + self.ttl,
+            _copy_record(value),
+        )
+        self._entries.move_to_end((tenant_id, key))
+        
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    async def delete(
+        self,
+        tenant_id: str,
+        key: str,
+    ) -> None:
+        """Remove cached value."""
+        self._entries.pop((tenant_id, key), None)
+    
+    async def clear(self, tenant_id: Optional[str] = None) -> None:
+        """Drop all entries, or only those of tenant_id."""
+        if tenant_id is None:
+            self._entries.clear()
+            return
+        
+        for entry_key in [k for k in self._entries if k[0] == tenant_id]:
+            del self._entries[entry_key]
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def _copy_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy the dicts and lists of a record; leaf values are immutable."""
+    return {key: _copy_value(item) for key, item in record.items()}
+
+
+def _copy_value(value: Any) -> Any:
+    """Copy a nested dict or list value."""
+    if isinstance(value, dict):
+        return _copy_record(value)
+    if isinstance(value, list):
+        return [_copy_value(item) for item in value]
+    return value
@@ -4,26 +4,84 @@ Invoice management service.
 Core service for creating, updating, and managing invoices.
 """
 
-from typing import Dict, Any, List, Optional
+import asyncio
+import collections
+import functools
+import hashlib
+import logging
+import time
+import uuid
+from typing import Dict, Any, AsyncIterator, Awaitable, Callable, Iterable, List, Optional, Tuple, TypeVar, Deque
 from datetime import datetime, date
 from decimal import Decimal
-from ..protocols import InvoiceStorage, SerialNumberProvider, I18nProvider
+from pydantic import BaseModel
+from ..protocols import (
+    InvoiceStorage,
+    SerialNumberProvider,
+    I18nProvider,
+    InvoiceCache,
+    IdempotencyStore,
+    ChangeFeed,
+    VIESValidator,
+    VATAggregateStore,
+    optional_method,
+)
 from ..schemas import (
+    InvoiceRow,
     InvoiceCreate,
     InvoiceUpdate,
     InvoiceResponse,
+    InvoiceListResponse,
     CreditNoteCreate,
     PaymentRecordCreate,
     PaymentRecord,
+    TaxCalculationResult,
+    BulkInvoiceResult,
+    BulkInvoiceResponse,
+    BatchUpdateResult,
+    BatchUpdateResponse,
+    OverdueSweepResult,
+    OverdueSweepReport,
+)
+from ..constants import (
+    InvoiceType,
+    InvoiceStatus,
+    PaymentStatus,
+    InvoiceEventType,
+    EU_COUNTRIES,
 )
-from ..constants import InvoiceType, InvoiceStatus, PaymentStatus
 from ..exceptions import (
+    BillingError,
     InvoiceNotFoundError,
     InvalidInvoiceDataError,
+    InvalidVATNumberError,
     InvoiceCanceledError,
     PaymentAmountError,
+    IdempotencyKeyReusedError,
+    InvalidStatusTransitionError,
+    InvoiceConflictError,
 )
 from .vat_calculator import VATCalculator
+from .invoice_cache import LocalInvoiceCache
+from .idempotency import InMemoryIdempotencyStore
+from .pagination import encode_cursor, decode_cursor, iter_storage_invoices
+from .invoice_state import can_transition, check_transition
+from .vat_aggregates import invoice_vat_buckets
+from .vat_numbers import check_tax_code
+
+logger = logging.getLogger(__name__)
+
+# Response model returned by an idempotent operation
+ResultT = TypeVar("ResultT", bound=BaseModel)
+# Result of a storage write
+WriteT = TypeVar("WriteT")
+
+# Statuses that turn overdue once the due date has passed
+OVERDUE_CANDIDATE_STATUSES = [
+    InvoiceStatus.ISSUED.value,
+    InvoiceStatus.SENT.value,
+    InvoiceStatus.PARTIALLY_PAID.value,
+]
 
 
 class InvoiceManager:
@@ -40,6 +98,14 @@ class InvoiceManager:
         serial_provider: SerialNumberProvider,
         vat_calculator: Optional[VATCalculator] = None,
         i18n_provider: Optional[I18nProvider] = None,
+        cache: Optional[InvoiceCache] = None,
+        trusted_storage: bool = False,
+        idempotency_store: Optional[IdempotencyStore] = None,
+        idempotency_ttl: float = 86400.0,
+        max_write_attempts: int = 3,
+        change_feed: Optional[ChangeFeed] = None,
+        vies_validator: Optional[VIESValidator] = None,
+        vat_aggregates: Optional[VATAggregateStore] = None,
     ):
         """
         Initialize invoice manager.
@@ -49,11 +115,46 @@ class InvoiceManager:
             serial_provider: Serial number generator
             vat_calculator: VAT calculation service
             i18n_provider: Internationalization provider
+            cache: Read-through invoice cache (default: LocalInvoiceCache,
+                which does not see writes of other processes: reads may
+                be stale for its ttl; pass LocalInvoiceCache(max_entries=0)
+                or a shared cache when several processes write)
+            trusted_storage: Skip re-validation of stored invoices when
+                building responses (storage must return native types)
+            idempotency_store: Results of requests carrying an
+                idempotency_key (default: InMemoryIdempotencyStore)
+            idempotency_ttl: Seconds an idempotency key is remembered
+            max_write_attempts: Read-modify-write attempts before raising
+                InvoiceConflictError on concurrent updates
+            change_feed: Feed receiving invoice/payment change events
+                (ignored when the storage implements append_events)
+            vies_validator: Checks buyer VAT numbers of intra-EU B2B and
+                reverse-charge invoices (wrap it in CachedVIESValidator)
+            vat_aggregates: Daily VAT totals kept up to date on create and
+                cancel (ignored when the storage implements add_vat_buckets)
         """
         self.storage = storage
         self.serial_provider = serial_provider
         self.vat_calculator = vat_calculator or VATCalculator()
         self.i18n_provider = i18n_provider
+        self.cache = cache if cache is not None else LocalInvoiceCache()
+        self.trusted_storage = trusted_storage
+        self.idempotency_store = (
+            idempotency_store if idempotency_store is not None else InMemoryIdempotencyStore()
+        )
+        self.idempotency_ttl = idempotency_ttl
+        self.max_write_attempts = max_write_attempts
+        self.change_feed = change_feed
+        self.vies_validator = vies_validator
+        self.vat_aggregates = vat_aggregates
+        # Cache invalidations per tenant: a read-through load overlapping
+        # one must not cache its possibly stale record
+        self._cache_epochs: Dict[str, int] = {}
+        # Event appends and aggregate updates that failed after their write
+        # committed, retried in order by publish_pending_events
+        self._unpublished: Deque[Callable[[], Awaitable[None]]] = collections.deque()
+        # Idempotent requests currently executing, for single-flight
+        self._inflight: Dict[Tuple[str, str, str], asyncio.Future[Optional[Dict[str, Any]]]] = {}
     
     async def create_invoice(
         self,
@@ -63,6 +164,9 @@ class InvoiceManager:
         """
         Create and issue new invoice.
         
+        Retrying with the same invoice_data.idempotency_key returns the
+        invoice created by the first call without consuming a new number.
+        
         Args:
             tenant_id: Tenant identifier
             invoice_data: Invoice creation data
@@ -94,25 +198,358 @@ class InvoiceManager:
             )
             ```
         """
-        # Generate invoice number
-        invoice_number = await self.serial_provider.generate_number(
-            tenant_id=tenant_id,
-            invoice_type=invoice_data.invoice_type,
-            date=datetime.combine(invoice_data.issue_date, datetime.min.time()),
-            series=invoice_data.series,
+        return await self._run_idempotent(
+            tenant_id,
+            "create_invoice",
+            invoice_data.idempotency_key,
+            _fingerprint(invoice_data),
+            lambda: self._create_invoice(tenant_id, invoice_data),
+            lambda result: InvoiceResponse(**result),
         )
+    
+    async def _create_invoice(
+        self,
+        tenant_id: str,
+        invoice_data: InvoiceCreate,
+    ) -> InvoiceResponse:
+        """Create invoice without idempotency handling."""
+        await self._check_parties(invoice_data)
         
         # Calculate taxes
-        tax_result = self.vat_calculator.calculate(
+        tax_result = self._calculate_taxes(invoice_data)
+        
+        created = await self._store_numbered(
+            tenant_id,
+            invoice_data.invoice_type,
+            invoice_data.issue_date,
+            invoice_data.series,
+            lambda invoice_number: self._build_invoice_dict(
+                invoice_number, invoice_data, tax_result
+            ),
+        )
+        return self._to_response(created)
+    
+    async def _store_numbered(
+        self,
+        tenant_id: str,
+        invoice_type: str,
+        issue_date: date,
+        series: Optional[str],
+        build: Callable[[str], Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """
+        Number and store a new document.
+        
+        build turns the invoice number into the storage payload. With a
+        provider supporting reservations the number is only consumed once
+        the document has been stored.
+        """
+        issue_datetime = datetime.combine(issue_date, datetime.min.time())
+        reserve_number = optional_method(self.serial_provider, "reserve_number")
+        
+        if reserve_number is None:
+            # Generate invoice number
+            invoice_number = await self.serial_provider.generate_number(
+                tenant_id=tenant_id,
+                invoice_type=invoice_type,
+                date=issue_datetime,
+                series=series,
+            )
+            
+            # Store invoice
+            return await self._create_record(tenant_id, build(invoice_number))
+        
+        # Reserve number, commit it only once the invoice is stored
+        reservation = await reserve_number(
+            tenant_id=tenant_id,
+            invoice_type=invoice_type,
+            date=issue_datetime,
+            series=series,
+        )
+        try:
+            created = await self._create_record(
+                tenant_id, build(reservation.invoice_number)
+            )
+        except BaseException:
+            await self.serial_provider.rollback_number(reservation)
+            raise
+        await self.serial_provider.commit_number(reservation)
+        
+        return created
+    
+    async def create_invoices_bulk(
+        self,
+        tenant_id: str,
+        invoices: Iterable[InvoiceCreate],
+        batch_size: int = 500,
+    ) -> BulkInvoiceResponse:
+        """
+        Create many invoices for a tenant in one pass.
+        
+        Taxes are computed for all items up front in one calculate_many
+        pass, serial numbers are reserved as one contiguous block per
+        series and year (in issue date order) and invoices are persisted
+        in batches via storage.create_invoices when available. Items are
+        processed independently: a failing item is reported in its
+        result and does not abort the batch.
+        
+        With a provider supporting reserve_numbers, numbers are committed
+        only once stored: a failed write gives back the numbers from the
+        failed item on and the following items are numbered again, so
+        the sequence stays gapless. With generate_numbers alone, failed
+        writes consume their numbers.
+        
+        Items with an idempotency_key are created one at a time through
+        create_invoice, so resubmitting the bulk replays them instead of
+        creating duplicates; give every item a key to make the whole
+        request safe to retry.
+        
+        Args:
+            tenant_id: Tenant identifier
+            invoices: Invoice creation data
+            batch_size: Maximum invoices per storage write
+            
+        Returns:
+            Per-item results, in submission order
+        """
+        items = list(invoices)
+        results: List[BulkInvoiceResult] = [
+            BulkInvoiceResult(index=index) for index in range(len(items))
+        ]
+        
+        # Keyed items go through the idempotent single-invoice path
+        unkeyed = []
+        for index, invoice_data in enumerate(items):
+            if invoice_data.idempotency_key is None:
+                unkeyed.append((index, invoice_data))
+                continue
+            try:
+                results[index].invoice = await self.create_invoice(
+                    tenant_id, invoice_data
+                )
+            except Exception as e:
+                results[index].error = str(e)
+        
+        # Tax codes and buyer VAT numbers are checked concurrently
+        checks = await asyncio.gather(
+            *(self._check_parties(invoice_data) for _, invoice_data in unkeyed),
+            return_exceptions=True,
+        )
+        
+        # Check rates per item; invalid items never consume a serial number
+        valid = []
+        for (index, invoice_data), check in zip(unkeyed, checks):
+            if isinstance(check, BaseException):
+                results[index].error = str(check)
+                continue
+            try:
+                self.vat_calculator.check_rates(
+                    invoice_data.rows,
+                    invoice_data.company.address.country,
+                    invoice_data.issue_date,
+                )
+            except (BillingError, ValueError) as e:
+                results[index].error = str(e)
+                continue
+            valid.append((index, invoice_data))
+        
+        # Calculate taxes of all valid items in one columnar pass
+        tax_results = self.vat_calculator.calculate_many(
+            [invoice_data for _, invoice_data in valid], check_rates=False
+        )
+        prepared = [
+            (index, invoice_data, tax_result)
+            for (index, invoice_data), tax_result in zip(valid, tax_results)
+        ]
+        
+        reserve_numbers = optional_method(self.serial_provider, "reserve_numbers")
+        generate_numbers = optional_method(self.serial_provider, "generate_numbers")
+        if reserve_numbers is None and generate_numbers is None:
+            # Provider can only number one invoice at a time
+            for index, invoice_data, tax_result in prepared:
+                try:
+                    created = await self._store_numbered(
+                        tenant_id,
+                        invoice_data.invoice_type,
+                        invoice_data.issue_date,
+                        invoice_data.series,
+                        functools.partial(
+                            self._build_invoice_dict,
+                            invoice_data=invoice_data,
+                            tax_result=tax_result,
+                        ),
+                    )
+                    results[index].invoice = self._to_response(created)
+                except Exception as e:
+                    results[index].error = str(e)
+            return self._bulk_response(results)
+        
+        # Number each series and year as one block, in issue date order
+        groups: Dict[Tuple[Optional[str], int], List[Tuple[int, InvoiceCreate, Any]]] = {}
+        for entry in sorted(prepared, key=lambda entry: entry[1].issue_date):
+            groups.setdefault(
+                (entry[1].series, entry[1].issue_date.year), []
+            ).append(entry)
+        
+        create_many = optional_method(self.storage, "create_invoices")
+        step = batch_size if create_many is not None else 1
+        for (series, _), entries in groups.items():
+            while entries:
+                documents = [
+                    (
+                        invoice_data.invoice_type,
+                        datetime.combine(invoice_data.issue_date, datetime.min.time()),
+                    )
+                    for _, invoice_data, _ in entries
+                ]
+                reservation = None
+                try:
+                    if reserve_numbers is not None:
+                        reservation = await reserve_numbers(tenant_id, documents, series)
+                        numbers = reservation.invoice_numbers
+                    elif generate_numbers is not None:
+                        numbers = await generate_numbers(tenant_id, documents, series)
+                except Exception as e:
+                    for index, _, _ in entries:
+                        results[index].error = str(e)
+                    break
+                
+                # Persist in batches; with a reservation, stop at the first
+                # failure and number the remaining items again, so that
+                # failed items never consume a number
+                stored = failed = 0
+                try:
+                    while stored + failed < len(entries):
+                        start = stored + failed
+                        batch = entries[start:start + step]
+                        invoice_dicts = [
+                            self._build_invoice_dict(number, invoice_data, tax_result)
+                            for (_, invoice_data, tax_result), number in zip(
+                                batch, numbers[start:start + step]
+                            )
+                        ]
+                        try:
+                            if create_many is not None:
+                                created_batch = await self._tracked(
+                                    tenant_id,
+                                    functools.partial(create_many, tenant_id, invoice_dicts),
+                                    lambda records: [
+                                        _event(tenant_id, InvoiceEventType.CREATED, record)
+                                        for record in records
+                                    ],
+                                )
+                            else:
+                                created_batch = [
+                                    await self._create_record(tenant_id, invoice_dicts[0])
+                                ]
+                        except Exception as e:
+                            for index, _, _ in batch:
+                                results[index].error = str(e)
+                            failed += len(batch)
+                            if reservation is not None:
+                                break
+                            continue
+                        
+                        stored += len(batch)
+                        for (index, _, _), created in zip(batch, created_batch):
+                            try:
+                                results[index].invoice = self._to_response(created)
+                            except ValueError as e:
+                                results[index].error = str(e)
+                finally:
+                    if reservation is not None:
+                        await self.serial_provider.commit_numbers(reservation, stored)
+                
+                entries = entries[stored + failed:]
+        
+        return self._bulk_response(results)
+    
+    async def _check_parties(self, invoice_data: InvoiceCreate) -> None:
+        """Check tax codes and buyer VAT number of a new invoice."""
+        for field, party in (
+            ("company", invoice_data.company),
+            ("customer", invoice_data.customer),
+        ):
+            # Only Italian parties have a codice fiscale; foreign tax IDs
+            # (e.g. a Spanish NIF) are stored as given
+            tax_info = party.tax_info
+            if (
+                party.address.country == "IT"
+                and tax_info is not None
+                and tax_info.tax_code
+                and not check_tax_code(tax_info.tax_code)
+            ):
+                raise InvalidInvoiceDataError(
+                    f"{field}.tax_info.tax_code", "invalid codice fiscale"
+                )
+        
+        await self._check_customer_vat(invoice_data)
+    
+    async def _check_customer_vat(self, invoice_data: InvoiceCreate) -> None:
+        """
+        Validate buyer VAT number via VIES when the invoice relies on it.
+        
+        Applies to reverse-charge invoices and to B2B supplies between two
+        EU countries. Numbers VIES could not check (valid None, e.g.
+        service unavailable) are accepted. Offline format checks are left
+        to the validator (CachedVIESValidator).
+        
+        Raises:
+            InvalidInvoiceDataError: If the buyer has no VAT number
+            InvalidVATNumberError: If VIES reports the number as invalid
+        """
+        if self.vies_validator is None:
+            return
+        
+        customer = invoice_data.customer
+        seller_country = invoice_data.company.address.country
+        buyer_country = customer.address.country
+        vat_number = customer.tax_info.vat_number if customer.tax_info else None
+        
+        intra_eu = (
+            buyer_country != seller_country
+            and buyer_country in EU_COUNTRIES
+            and seller_country in EU_COUNTRIES
+        )
+        if not invoice_data.reverse_charge and not (
+            intra_eu and (customer.is_company or vat_number)
+        ):
+            return
+        
+        if not vat_number:
+            raise InvalidInvoiceDataError(
+                "customer.tax_info.vat_number",
+                "required for intra-EU B2B and reverse-charge invoices",
+            )
+        
+        result = await self.vies_validator.validate_vat_number(vat_number, buyer_country)
+        if result.get("valid") is False:
+            raise InvalidVATNumberError(vat_number, buyer_country)
+    
+    def _calculate_taxes(
+        self,
+        invoice_data: InvoiceCreate,
+    ) -> TaxCalculationResult:
+        """Run tax calculation for invoice data."""
+        return self.vat_calculator.calculate(
             rows=invoice_data.rows,
             retention=invoice_data.retention,
             social_security_rate=invoice_data.social_security_rate,
             stamp_duty=invoice_data.stamp_duty,
             split_payment=invoice_data.split_payment,
+            currency=invoice_data.currency,
+            country=invoice_data.company.address.country,
+            on=invoice_data.issue_date,
         )
-        
-        # Prepare invoice data
-        invoice_dict = {
+    
+    def _build_invoice_dict(
+        self,
+        invoice_number: str,
+        invoice_data: InvoiceCreate,
+        tax_result: TaxCalculationResult,
+    ) -> Dict[str, Any]:
+        """Prepare storage payload for a new invoice."""
+        return {
             "invoice_number": invoice_number,
             "invoice_type": invoice_data.invoice_type,
             "status": InvoiceStatus.ISSUED.value,
@@ -126,7 +563,9 @@ class InvoiceManager:
             "total": tax_result.total,
             "net_to_pay": tax_result.net_to_pay,
             "retention": invoice_data.retention.model_dump() if invoice_data.retention else None,
+            "social_security_rate": invoice_data.social_security_rate,
             "social_security_amount": tax_result.social_security_amount,
+            "stamp_duty": invoice_data.stamp_duty,
             "stamp_duty_amount": tax_result.stamp_duty_amount,
             "split_payment": invoice_data.split_payment,
             "reverse_charge": invoice_data.reverse_charge,
@@ -135,14 +574,27 @@ class InvoiceManager:
             "language": invoice_data.language,
             "series": invoice_data.series,
             "metadata": invoice_data.metadata or {},
+            "vat_summaries": [
+                summary.model_dump() for summary in tax_result.vat_summaries
+            ],
+            "amount_paid": Decimal("0"),
+            "credited_total": Decimal("0"),
+            "version": 1,
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow(),
         }
-        
-        # Store invoice
-        created = await self.storage.create_invoice(tenant_id, invoice_dict)
-        
-        return InvoiceResponse(**created)
+    
+    def _bulk_response(
+        self,
+        results: List[BulkInvoiceResult],
+    ) -> BulkInvoiceResponse:
+        """Summarize bulk creation results."""
+        created = sum(1 for result in results if result.invoice is not None)
+        return BulkInvoiceResponse(
+            results=results,
+            created=created,
+            failed=len(results) - created,
+        )
     
     async def get_invoice(
         self,
@@ -150,12 +602,18 @@ class InvoiceManager:
         invoice_id: str,
     ) -> InvoiceResponse:
         """Get invoice by ID."""
-        invoice = await self.storage.get_invoice(tenant_id, invoice_id)
+        invoice = await self.cache.get(tenant_id, f"id:{invoice_id}")
         
-        if not invoice:
-            raise InvoiceNotFoundError(tenant_id, invoice_id)
+        if invoice is None:
+            epoch = self._cache_epochs.get(tenant_id, 0)
+            invoice = await self.storage.get_invoice(tenant_id, invoice_id)
+            
+            if not invoice:
+                raise InvoiceNotFoundError(tenant_id, invoice_id)
+            
+            await self._cache_loaded(tenant_id, epoch, invoice)
         
-        return InvoiceResponse(**invoice)
+        return self._to_response(invoice)
     
     async def get_invoice_by_number(
         self,
@@ -163,30 +621,95 @@ class InvoiceManager:
         invoice_number: str,
     ) -> InvoiceResponse:
         """Get invoice by unique number."""
+        # Numbers never change: cache number -> id, then read through by id
+        cached_id = await self.cache.get(tenant_id, f"number:{invoice_number}")
+        if cached_id is not None:
+            invoice = await self.cache.get(tenant_id, f"id:{cached_id['id']}")
+            if invoice is not None:
+                return self._to_response(invoice)
+        
+        epoch = self._cache_epochs.get(tenant_id, 0)
         invoice = await self.storage.get_invoice_by_number(tenant_id, invoice_number)
         
         if not invoice:
             raise InvoiceNotFoundError(tenant_id, invoice_number)
         
-        return InvoiceResponse(**invoice)
+        await self.cache.set(
+            tenant_id, f"number:{invoice_number}", {"id": invoice["id"]}
+        )
+        await self._cache_loaded(tenant_id, epoch, invoice)
+        
+        return self._to_response(invoice)
+    
+    async def _cache_loaded(
+        self,
+        tenant_id: str,
+        epoch: int,
+        invoice: Dict[str, Any],
+    ) -> None:
+        """
+        Cache a record read from storage.
+        
+        Skipped when an invoice of the tenant was invalidated since the
+        read started (epoch): the record may predate that write, and
+        caching it would serve the old version until the ttl expires.
+        """
+        if self._cache_epochs.get(tenant_id, 0) == epoch:
+            await self.cache.set(tenant_id, f"id:{invoice['id']}", invoice)
+    
+    async def _invalidate_cached(self, tenant_id: str, invoice_id: str) -> None:
+        """Drop a cached record after a write and void overlapping loads."""
+        self._cache_epochs[tenant_id] = self._cache_epochs.get(tenant_id, 0) + 1
+        await self.cache.delete(tenant_id, f"id:{invoice_id}")
     
     async def update_invoice(
         self,
         tenant_id: str,
         invoice_id: str,
         updates: InvoiceUpdate,
+        expected_status: Optional[str] = None,
+        expected_version: Optional[int] = None,
     ) -> InvoiceResponse:
-        """Update invoice fields."""
-        invoice = await self.get_invoice(tenant_id, invoice_id)
+        """
+        Update invoice fields.
         
-        if invoice.status == InvoiceStatus.CANCELED.value:
+        A status change must be allowed by the invoice state machine.
+        When expected_status is given the invoice is not read first: the
+        change is validated in memory and only written if the invoice
+        still has that status. With expected_version (e.g. from an
+        If-Match header) the update fails with InvoiceConflictError
+        instead of being retried when the invoice has changed.
+        """
+        updated: Optional[Dict[str, Any]]
+        if expected_status is not None:
+            updated = await self._update_expected(
+                tenant_id,
+                invoice_id,
+                expected_status,
+                self._field_updates(invoice_id, expected_status, updates),
+            )
+        else:
+            updated = await self._update_checked(
+                tenant_id,
+                invoice_id,
+                lambda invoice: self._field_updates(invoice.id, invoice.status, updates),
+                expected_version=expected_version,
+            )
+        return await self._checked_response(tenant_id, invoice_id, updated)
+    
+    def _field_updates(
+        self,
+        invoice_id: str,
+        status: str,
+        updates: InvoiceUpdate,
+    ) -> Dict[str, Any]:
+        """Validate and prepare field updates."""
+        if status == InvoiceStatus.CANCELED.value:
             raise InvoiceCanceledError(invoice_id)
         
         update_dict = updates.model_dump(exclude_unset=True)
         update_dict["updated_at"] = datetime.utcnow()
-        
-        updated = await self.storage.update_invoice(tenant_id, invoice_id, update_dict)
-        return InvoiceResponse(**updated)
+        return update_dict
     
     async def list_invoices(
         self,
@@ -199,13 +722,97 @@ class InvoiceManager:
         invoices = await self.storage.list_invoices(
             tenant_id, skip, limit, filters
         )
-        return [InvoiceResponse(**inv) for inv in invoices]
+        return [self._to_response(inv) for inv in invoices]
+    
+    async def iter_invoices(
+        self,
+        tenant_id: str,
+        filters: Optional[Dict[str, Any]] = None,
+        page_size: int = 1000,
+    ) -> AsyncIterator[InvoiceResponse]:
+        """
+        Iterate over all matching invoices in bounded memory.
+        
+        Streams through storage.stream_invoices when available, otherwise
+        pages through keyset or offset listing.
+        
+        Example:
+            ```python
+            async for invoice in manager.iter_invoices(
+                "agency123", filters={"status": "issued"}
+            ):
+                export(invoice)
+            ```
+        """
+        async for invoice in iter_storage_invoices(
+            self.storage, tenant_id, filters, page_size
+        ):
+            yield self._to_response(invoice)
+    
+    async def list_invoices_page(
+        self,
+        tenant_id: str,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> InvoiceListResponse:
+        """
+        List invoices with cursor pagination.
+        
+        Uses storage.list_invoices_after (keyset on issue_date, id) when
+        available, otherwise falls back to offset paging. Pass the
+        returned next_cursor to fetch the following page; it is None on
+        the last page.
+        
+        Args:
+            tenant_id: Tenant identifier
+            limit: Page size
+            cursor: Cursor from a previous page (None for first page)
+            filters: Storage filters
+            
+        Returns:
+            Page of invoices with next_cursor
+            
+        Raises:
+            InvalidInvoiceDataError: If limit is not positive or the
+                cursor is malformed
+        """
+        if limit < 1:
+            raise InvalidInvoiceDataError("limit", "must be at least 1")
+        
+        position = decode_cursor(cursor) if cursor else {}
+        list_after = optional_method(self.storage, "list_invoices_after")
+        
+        if list_after is not None and "offset" not in position:
+            records = await list_after(tenant_id, position or None, limit, filters)
+            invoices = [self._to_response(inv) for inv in records]
+            next_cursor = None
+            if len(invoices) == limit:
+                next_cursor = encode_cursor(
+                    issue_date=invoices[-1].issue_date, invoice_id=invoices[-1].id
+                )
+            skip = 0
+        else:
+            skip = position.get("offset", 0)
+            invoices = await self.list_invoices(tenant_id, skip, limit, filters)
+            next_cursor = None
+            if len(invoices) == limit:
+                next_cursor = encode_cursor(offset=skip + limit)
+        
+        return InvoiceListResponse(
+            invoices=invoices,
+            total=len(invoices),
+            skip=skip,
+            limit=limit,
+            next_cursor=next_cursor,
+        )
     
     async def cancel_invoice(
         self,
         tenant_id: str,
         invoice_id: str,
         reason: Optional[str] = None,
+        expected_version: Optional[int] = None,
     ) -> InvoiceResponse:
         """
         Cancel invoice.
@@ -214,16 +821,32 @@ class InvoiceManager:
             tenant_id: Tenant identifier
             invoice_id: Invoice ID
             reason: Cancellation reason
+            expected_version: Fail instead of retrying if the invoice
+                version differs
         """
-        invoice = await self.get_invoice(tenant_id, invoice_id)
-        
+        updated = await self._update_checked(
+            tenant_id,
+            invoice_id,
+            lambda invoice: self._cancel_updates(invoice, reason),
+            expected_version=expected_version,
+        )
+        return await self._checked_response(tenant_id, invoice_id, updated)
+    
+    def _cancel_updates(
+        self,
+        invoice: InvoiceResponse,
+        reason: Optional[str],
+    ) -> Dict[str, Any]:
+        """Validate and prepare cancellation updates."""
         if invoice.status == InvoiceStatus.PAID.value:
-            raise InvalidInvoiceDataError(
-                "status", "Cannot cancel paid invoice. Issue credit note instead."
+            raise InvalidStatusTransitionError(
+                invoice.id,
+                invoice.status,
+                InvoiceStatus.CANCELED.value,
+                "Cannot cancel paid invoice. Issue credit note instead.",
             )
         
         updates = {
-            "status": InvoiceStatus.CANCELED.value,
             "metadata": {
                 **invoice.metadata,
                 "cancellation_reason": reason,
@@ -231,9 +854,11 @@ class InvoiceManager:
             },
             "updated_at": datetime.utcnow(),
         }
-        
-        updated = await self.storage.update_invoice(tenant_id, invoice_id, updates)
-        return InvoiceResponse(**updated)
+        if invoice.status != InvoiceStatus.CANCELED.value:
+            # Canceling again only refreshes the reason: no second
+            # canceled event, so VAT aggregates are not reduced twice
+            updates["status"] = InvoiceStatus.CANCELED.value
+        return updates
     
     async def create_credit_note(
         self,
@@ -243,6 +868,17 @@ class InvoiceManager:
         """
         Create credit note for original invoice.
         
+        Credit notes carry positive amounts and are identified by
+        invoice_type. Without rows, the full credit copies the totals and
+        VAT summaries stored on the original; row_indices credits the
+        selected original rows, recalculating only those. Explicit rows
+        are priced like a new invoice.
+        
+        The credited amount is added to the original's credited_total
+        (conditional on its version) before the credit note is stored,
+        so crediting more than the original total is rejected even under
+        concurrency.
+        
         Args:
             tenant_id: Tenant identifier
             credit_note_data: Credit note creation data
@@ -254,32 +890,217 @@ class InvoiceManager:
         original = await self.get_invoice(
             tenant_id, credit_note_data.original_invoice_id
         )
+        if original.status == InvoiceStatus.CANCELED.value:
+            raise InvoiceCanceledError(original.id)
+        
+        if credit_note_data.rows:
+            rows = credit_note_data.rows
+            tax_result = self.vat_calculator.calculate(
+                rows=rows,
+                retention=original.retention,
+                split_payment=original.split_payment,
+                currency=original.currency,
+                country=original.company.address.country,
+                on=original.issue_date,
+            )
+        elif credit_note_data.row_indices is not None:
+            rows = self._credited_rows(original, credit_note_data.row_indices)
+            tax_result = self._partial_credit_taxes(original, rows)
+        else:
+            rows = original.rows
+            tax_result = self._full_credit_taxes(original)
+        
+        # Reserve the credited amount on the original
+        reserved = await self._add_credited_total(tenant_id, original, tax_result.total)
+        try:
+            created = await self._store_numbered(
+                tenant_id,
+                InvoiceType.CREDIT_NOTE.value,
+                credit_note_data.issue_date,
+                None,
+                lambda invoice_number: self._credit_note_dict(
+                    invoice_number, original, credit_note_data, rows, tax_result
+                ),
+            )
+        except BaseException:
+            # Start from the reserved version, not the snapshot read above
+            await self._add_credited_total(tenant_id, reserved, -tax_result.total)
+            raise
+        
+        return self._to_response(created)
+    
+    async def get_credited_total(
+        self,
+        tenant_id: str,
+        invoice_id: str,
+    ) -> Decimal:
+        """Get total of credit notes issued against invoice."""
+        invoice = await self.get_invoice(tenant_id, invoice_id)
+        return invoice.credited_total
+    
+    def _full_credit_taxes(self, original: InvoiceResponse) -> TaxCalculationResult:
+        """Take credit note amounts from the stored original."""
+        if original.vat_summaries is None:
+            # Stored before VAT summaries were persisted
+            vat_summaries = self.vat_calculator.calculate(
+                rows=original.rows,
+                split_payment=original.split_payment,
+                currency=original.currency,
+            ).vat_summaries
+        else:
+            vat_summaries = original.vat_summaries
+        
+        return TaxCalculationResult(
+            subtotal=original.subtotal,
+            vat_summaries=vat_summaries,
+            total_vat=original.total_vat,
+            retention_amount=original.retention.amount if original.retention else None,
+            social_security_amount=original.social_security_amount,
+            stamp_duty_amount=original.stamp_duty_amount,
+            total=original.total,
+            net_to_pay=original.net_to_pay,
+        )
+    
+    def _partial_credit_taxes(
+        self,
+        original: InvoiceResponse,
+        rows: List[InvoiceRow],
+    ) -> TaxCalculationResult:
+        """
+        Recalculate amounts of credited rows with the original's options.
+        
+        Stamp duty is decided on the credited amount, which may fall on
+        the other side of the threshold than the original's total.
+        """
+        social_security_rate = original.social_security_rate
+        if social_security_rate is None and original.social_security_amount:
+            # Stored before the rate was persisted: derive it from the amounts
+            base = original.subtotal - original.social_security_amount
+            if base:
+                social_security_rate = original.social_security_amount * 100 / base
         
-        # Use original rows or provided rows
-        rows = credit_note_data.rows if credit_note_data.rows else original.rows
+        retention = None
+        if original.retention:
+            taxable = sum((row.calculate_subtotal() for row in rows), Decimal("0"))
+            retention = original.retention.model_copy(
+                update={
+                    "amount": self.vat_calculator.calculate_retention(
+                        taxable, original.retention.rate
+                    ),
+                }
+            )
         
-        # Create credit note as negative invoice
-        credit_note = InvoiceCreate(
-            invoice_type=InvoiceType.CREDIT_NOTE.value,
-            company=original.company,
-            customer=original.customer,
+        return self.vat_calculator.calculate(
             rows=rows,
-            issue_date=credit_note_data.issue_date,
-            payment_info=original.payment_info,
-            notes=credit_note_data.notes,
-            currency=original.currency,
-            language=original.language,
-            retention=original.retention,
+            retention=retention,
+            social_security_rate=social_security_rate,
+            stamp_duty=original.stamp_duty or original.stamp_duty_amount is not None,
             split_payment=original.split_payment,
-            reverse_charge=original.reverse_charge,
-            metadata={
+            currency=original.currency,
+        )
+    
+    def _credited_rows(
+        self,
+        original: InvoiceResponse,
+        row_indices: List[int],
+    ) -> List[InvoiceRow]:
+        """Select original rows by index."""
+        if not row_indices:
+            raise InvalidInvoiceDataError("row_indices", "at least one row is required")
+        if len(set(row_indices)) != len(row_indices):
+            raise InvalidInvoiceDataError("row_indices", "duplicate row index")
+        
+        rows = []
+        for index in row_indices:
+            if not 0 <= index < len(original.rows):
+                raise InvalidInvoiceDataError(
+                    "row_indices", f"row {index} does not exist on invoice {original.id}"
+                )
+            rows.append(original.rows[index])
+        return rows
+    
+    async def _add_credited_total(
+        self,
+        tenant_id: str,
+        original: InvoiceResponse,
+        amount: Decimal,
+    ) -> InvoiceResponse:
+        """
+        Add amount to credited_total, rejecting over-crediting.
+        
+        Returns:
+            Original invoice as written
+        """
+        def credited(invoice: InvoiceResponse) -> Dict[str, Any]:
+            credited_total = invoice.credited_total + amount
+            if amount > 0 and credited_total > invoice.total:
+                raise InvalidInvoiceDataError(
+                    "rows",
+                    f"credit of {amount} exceeds remaining creditable amount "
+                    f"{invoice.total - invoice.credited_total} of invoice {invoice.id}",
+                )
+            return {"credited_total": credited_total, "updated_at": datetime.utcnow()}
+        
+        updated = await self._update_checked(
+            tenant_id, original.id, credited, invoice=original
+        )
+        return self._to_response(updated) if updated is not None else original
+    
+    def _credit_note_dict(
+        self,
+        invoice_number: str,
+        original: InvoiceResponse,
+        credit_note_data: CreditNoteCreate,
+        rows: List[InvoiceRow],
+        tax_result: TaxCalculationResult,
+    ) -> Dict[str, Any]:
+        """Prepare storage payload for a credit note."""
+        retention = None
+        if original.retention:
+            retention = {
+                **original.retention.model_dump(),
+                "amount": tax_result.retention_amount,
+            }
+        
+        return {
+            "invoice_number": invoice_number,
+            "invoice_type": InvoiceType.CREDIT_NOTE.value,
+            "status": InvoiceStatus.ISSUED.value,
+            "company": original.company.model_dump(),
+            "customer": original.customer.model_dump(),
+            "rows": [row.model_dump() for row in rows],
+            "issue_date": credit_note_data.issue_date,
+            "payment_info": original.payment_info.model_dump(),
+            "subtotal": tax_result.subtotal,
+            "total_vat": tax_result.total_vat,
+            "total": tax_result.total,
+            "net_to_pay": tax_result.net_to_pay,
+            "retention": retention,
+            "social_security_rate": original.social_security_rate,
+            "social_security_amount": tax_result.social_security_amount,
+            "stamp_duty": original.stamp_duty,
+            "stamp_duty_amount": tax_result.stamp_duty_amount,
+            "split_payment": original.split_payment,
+            "reverse_charge": original.reverse_charge,
+            "notes": credit_note_data.notes,
+            "currency": original.currency,
+            "language": original.language,
+            "series": None,
+            "metadata": {
                 "original_invoice_id": original.id,
                 "original_invoice_number": original.invoice_number,
                 "credit_reason": credit_note_data.reason,
             },
-        )
-        
-        return await self.create_invoice(tenant_id, credit_note)
+            "original_invoice_id": original.id,
+            "vat_summaries": [
+                summary.model_dump() for summary in tax_result.vat_summaries
+            ],
+            "amount_paid": Decimal("0"),
+            "credited_total": Decimal("0"),
+            "version": 1,
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow(),
+        }
     
     async def record_payment(
         self,
@@ -290,10 +1111,37 @@ class InvoiceManager:
         """
         Record payment for invoice.
         
-        Updates invoice status based on total paid amount.
+        Updates invoice status based on total paid amount. When the
+        storage implements apply_payment, the payment insert and the
+        amount_paid increment happen in one atomic call and the status is
+        derived from the running total; otherwise payments are re-scanned
+        via recalculate_amount_paid.
+        
+        Retrying with the same payment_data.idempotency_key returns the
+        payment recorded by the first call.
         """
+        return await self._run_idempotent(
+            tenant_id,
+            "record_payment",
+            payment_data.idempotency_key,
+            _fingerprint(payment_data, invoice_id),
+            lambda: self._record_payment(tenant_id, invoice_id, payment_data),
+            lambda result: PaymentRecord(**result),
+        )
+    
+    async def _record_payment(
+        self,
+        tenant_id: str,
+        invoice_id: str,
+        payment_data: PaymentRecordCreate,
+    ) -> PaymentRecord:
+        """Record payment without idempotency handling."""
         invoice = await self.get_invoice(tenant_id, invoice_id)
         
+        if invoice.status == InvoiceStatus.CANCELED.value:
+            raise InvoiceCanceledError(invoice_id)
+        check_transition(invoice_id, invoice.status, InvoiceStatus.PAID.value)
+        
         if payment_data.amount > invoice.net_to_pay:
             raise PaymentAmountError(
                 f"Payment amount {payment_data.amount} exceeds invoice total {invoice.net_to_pay}"
@@ -301,53 +1149,1000 @@ class InvoiceManager:
         
         # Record payment
         payment_dict = {
-            **payment_data.model_dump(),
+            **payment_data.model_dump(exclude={"idempotency_key"}),
             "invoice_id": invoice_id,
             "created_at": datetime.utcnow(),
         }
         
-        payment = await self.storage.record_payment(
-            tenant_id, invoice_id, payment_dict
+        apply_payment = optional_method(self.storage, "apply_payment")
+        if apply_payment is None:
+            try:
+                payment = await self._tracked(
+                    tenant_id,
+                    lambda: self.storage.record_payment(
+                        tenant_id, invoice_id, payment_dict
+                    ),
+                    lambda payment: [
+                        _event(
+                            tenant_id,
+                            InvoiceEventType.PAYMENT_RECORDED,
+                            payment,
+                            invoice_id,
+                        )
+                    ],
+                )
+            finally:
+                await self._invalidate_cached(tenant_id, invoice_id)
+            await self._recalculate_amount_paid(tenant_id, invoice)
+            return PaymentRecord(**payment)
+        
+        # Insert payment and bump amount_paid atomically
+        try:
+            result = await self._tracked(
+                tenant_id,
+                lambda: apply_payment(tenant_id, invoice_id, payment_dict),
+                lambda result: [
+                    _event(
+                        tenant_id,
+                        InvoiceEventType.PAYMENT_RECORDED,
+                        result["payment"],
+                        invoice_id,
+                    )
+                ],
+            )
+        finally:
+            await self._invalidate_cached(tenant_id, invoice_id)
+        payment = result["payment"]
+        amount_paid = Decimal(str(result["invoice"]["amount_paid"]))
+        
+        # Update invoice status only when it changes
+        await self._update_checked(
+            tenant_id,
+            invoice_id,
+            self._payment_updates,
+            invoice=invoice.model_copy(
+                update={
+                    "amount_paid": amount_paid,
+                    "version": result["invoice"].get("version", invoice.version),
+                }
+            ),
         )
         
+        return PaymentRecord(**payment)
+    
+    async def recalculate_amount_paid(
+        self,
+        tenant_id: str,
+        invoice_id: str,
+    ) -> InvoiceResponse:
+        """
+        Rebuild amount_paid and status from the stored payments.
+        
+        Full re-scan of storage.get_payments: used when the storage does
+        not implement apply_payment, and as verification/repair path for
+        the running total.
+        
+        Args:
+            tenant_id: Tenant identifier
+            invoice_id: Invoice ID
+            
+        Returns:
+            Updated invoice
+        """
+        invoice = await self.get_invoice(tenant_id, invoice_id)
+        return await self._recalculate_amount_paid(tenant_id, invoice)
+    
+    async def _recalculate_amount_paid(
+        self,
+        tenant_id: str,
+        invoice: InvoiceResponse,
+    ) -> InvoiceResponse:
+        """Re-scan payments of an already loaded invoice."""
+        invoice_id = invoice.id
+        
         # Get all payments
         payments = await self.storage.get_payments(tenant_id, invoice_id)
-        total_paid = sum(Decimal(p["amount"]) for p in payments)
+        total_paid = sum(
+            (Decimal(str(p["amount"])) for p in payments), Decimal("0")
+        )
         
         # Update invoice status
-        if total_paid >= invoice.net_to_pay:
-            status = InvoiceStatus.PAID.value
-            paid_at = datetime.utcnow()
-        elif total_paid > 0:
-            status = InvoiceStatus.PARTIALLY_PAID.value
-            paid_at = None
-        else:
-            status = invoice.status
-            paid_at = None
-        
-        await self.storage.update_invoice(
-            tenant_id,
-            invoice_id,
-            {
+        def recalculated(current: InvoiceResponse) -> Dict[str, Any]:
+            status, paid_at = self._payment_status(current, total_paid)
+            return {
+                "amount_paid": total_paid,
                 "status": status,
                 "paid_at": paid_at,
                 "updated_at": datetime.utcnow(),
-            },
+            }
+        
+        updated = await self._update_checked(
+            tenant_id, invoice_id, recalculated, invoice=invoice
+        )
+        return await self._checked_response(tenant_id, invoice_id, updated)
+    
+    def _to_response(self, record: Dict[str, Any]) -> InvoiceResponse:
+        """Build invoice response from storage record."""
+        if self.trusted_storage:
+            return InvoiceResponse.from_trusted(record)
+        return InvoiceResponse(**record)
+    
+    async def _checked_response(
+        self,
+        tenant_id: str,
+        invoice_id: str,
+        updated: Optional[Dict[str, Any]],
+    ) -> InvoiceResponse:
+        """Build response of a checked update (None: nothing was written)."""
+        if updated is None:
+            return await self.get_invoice(tenant_id, invoice_id)
+        return self._to_response(updated)
+    
+    async def _create_record(
+        self,
+        tenant_id: str,
+        invoice_dict: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """Store a new invoice."""
+        return await self._tracked(
+            tenant_id,
+            lambda: self.storage.create_invoice(tenant_id, invoice_dict),
+            lambda record: [_event(tenant_id, InvoiceEventType.CREATED, record)],
         )
+    
+    async def _tracked(
+        self,
+        tenant_id: str,
+        write: Callable[[], Awaitable[WriteT]],
+        events: Callable[[WriteT], List[Dict[str, Any]]],
+    ) -> WriteT:
+        """
+        Run a storage write and publish the change events it produced.
         
-        return PaymentRecord(**payment)
+        events builds the event records from the write result. When the
+        storage implements append_events they are written to its outbox,
+        inside unit_of_work if available, so the change and its events
+        commit together; otherwise they go to change_feed right after
+        the write. VAT aggregates are updated from the same events, in
+        the storage (add_vat_buckets) or in vat_aggregates.
+        
+        Publishing after the write never raises: the write has committed
+        (and may hold an invoice number), so a failed append or aggregate
+        update is queued for publish_pending_events instead.
+        """
+        outbox = optional_method(self.storage, "append_events")
+        feed = None if outbox else getattr(self.change_feed, "append_events", None)
+        storage_buckets = optional_method(self.storage, "add_vat_buckets")
+        external_buckets = None if storage_buckets else optional_method(
+            self.vat_aggregates, "add_vat_buckets"
+        )
+        if not (outbox or feed or storage_buckets or external_buckets):
+            return await write()
+        
+        unit_of_work = optional_method(self.storage, "unit_of_work")
+        if unit_of_work is None or not (outbox or storage_buckets):
+            result = await write()
+            await self._publish_committed(
+                tenant_id,
+                events(result),
+                outbox or feed,
+                storage_buckets or external_buckets,
+            )
+            return result
+        
+        async with unit_of_work(tenant_id):
+            result = await write()
+            records = events(result)
+            for step in self._publish_steps(tenant_id, records, outbox, storage_buckets):
+                await step()
+        await self._publish_committed(tenant_id, records, feed, external_buckets)
+        return result
+    
+    def _publish_steps(
+        self,
+        tenant_id: str,
+        records: List[Dict[str, Any]],
+        append: Optional[Callable[..., Awaitable[None]]],
+        add_buckets: Optional[Callable[..., Awaitable[None]]],
+    ) -> List[Callable[[], Awaitable[None]]]:
+        """Build the calls appending change events and their VAT deltas."""
+        steps: List[Callable[[], Awaitable[None]]] = []
+        if not records:
+            return steps
+        if append is not None:
+            steps.append(functools.partial(append, tenant_id, records))
+        if add_buckets is not None:
+            buckets = _vat_bucket_deltas(records)
+            if buckets:
+                steps.append(functools.partial(add_buckets, tenant_id, buckets))
+        return steps
+    
+    async def _publish_committed(
+        self,
+        tenant_id: str,
+        records: List[Dict[str, Any]],
+        append: Optional[Callable[..., Awaitable[None]]],
+        add_buckets: Optional[Callable[..., Awaitable[None]]],
+    ) -> None:
+        """Publish events of a committed write, queueing them on failure."""
+        steps = self._publish_steps(tenant_id, records, append, add_buckets)
+        if steps:
+            self._unpublished.extend(steps)
+            await self.publish_pending_events()
+    
+    async def publish_pending_events(self) -> int:
+        """
+        Retry change events and VAT aggregate updates not yet published.
+        
+        Pending steps run in write order; the first failure is logged and
+        stops the retry. Called after every tracked write, and callable
+        periodically while the feed is down. Pending steps are kept in
+        memory only: storages implementing append_events with
+        unit_of_work commit events with the change instead.
+        
+        Returns:
+            Number of steps still pending
+        """
+        while self._unpublished:
+            step = self._unpublished.popleft()
+            try:
+                await step()
+            except Exception:
+                self._unpublished.appendleft(step)
+                logger.warning(
+                    "publishing invoice change events failed, %d steps pending",
+                    len(self._unpublished),
+                    exc_info=True,
+                )
+                break
+            except BaseException:
+                self._unpublished.appendleft(step)
+                raise
+        return len(self._unpublished)
+    
+    async def _update_record(
+        self,
+        tenant_id: str,
+        invoice_id: str,
+        updates: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """Write invoice updates to storage and invalidate cache."""
+        try:
+            return await self._tracked(
+                tenant_id,
+                lambda: self.storage.update_invoice(tenant_id, invoice_id, updates),
+                lambda record: [
+                    _event(tenant_id, _update_event_type(updates), record)
+                ],
+            )
+        finally:
+            await self._invalidate_cached(tenant_id, invoice_id)
+    
+    async def _conditional_update(
+        self,
+        tenant_id: str,
+        invoice_id: str,
+        expected: Dict[str, List[Any]],
+        updates: Dict[str, Any],
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Write updates only if the invoice still matches expected.
+        
+        Uses storage.compare_and_set_invoice; storages without it get an
+        unconditional update_invoice.
+        
+        Returns:
+            Updated invoice, or None if it no longer matches
+        """
+        compare_and_set = optional_method(self.storage, "compare_and_set_invoice")
+        if compare_and_set is None:
+            return await self._update_record(tenant_id, invoice_id, updates)
+        
+        try:
+            return await self._tracked(
+                tenant_id,
+                lambda: compare_and_set(tenant_id, invoice_id, expected, updates),
+                lambda record: [
+                    _event(tenant_id, _update_event_type(updates), record)
+                ] if record is not None else [],
+            )
+        finally:
+            await self._invalidate_cached(tenant_id, invoice_id)
+    
+    async def _update_checked(
+        self,
+        tenant_id: str,
+        invoice_id: str,
+        prepare: Callable[[InvoiceResponse], Dict[str, Any]],
+        invoice: Optional[InvoiceResponse] = None,
+        expected_version: Optional[int] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Read, validate and write an invoice with optimistic concurrency.
+        
+        prepare builds the updates from the current invoice and raises
+        BillingError to reject it; the status change is checked against
+        the state machine. The write is conditional on the version that
+        was read: if the invoice changed meanwhile (or the read came from
+        a stale cache entry) it is read again from storage and the
+        updates are rebuilt, up to max_write_attempts times. With
+        expected_version there is no retry.
+        
+        Returns:
+            Updated invoice, or None if prepare returned no updates
+            
+        Raises:
+            InvoiceConflictError: If the invoice kept changing, or does
+                not have expected_version
+        """
+        if invoice is None:
+            invoice = await self.get_invoice(tenant_id, invoice_id)
+        
+        attempts = 1 if expected_version is not None else self.max_write_attempts
+        for _ in range(attempts):
+            if expected_version is not None and invoice.version != expected_version:
+                break
+            
+            updates = prepare(invoice)
+            if not updates:
+                return None
+            self._check_updates(invoice_id, invoice.status, updates)
+            
+            updated = await self._conditional_update(
+                tenant_id, invoice_id, {"version": [invoice.version]}, updates
+            )
+            if updated is not None:
+                return updated
+            
+            # Cache entry was dropped by the failed write
+            invoice = await self.get_invoice(tenant_id, invoice_id)
+        
+        raise InvoiceConflictError(invoice_id)
+    
+    async def _update_expected(
+        self,
+        tenant_id: str,
+        invoice_id: str,
+        expected_status: str,
+        updates: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """
+        Validate against a caller-supplied status and write conditionally.
+        
+        No read is needed when storage implements compare_and_set_invoice;
+        the invoice is only fetched to report a mismatch.
+        """
+        self._check_updates(invoice_id, expected_status, updates)
+        
+        if optional_method(self.storage, "compare_and_set_invoice") is None:
+            # Storage cannot check the status on write: check it here
+            invoice = await self.get_invoice(tenant_id, invoice_id)
+            if invoice.status == expected_status:
+                return await self._update_record(tenant_id, invoice_id, updates)
+        else:
+            updated = await self._conditional_update(
+                tenant_id, invoice_id, {"status": [expected_status]}, updates
+            )
+            if updated is not None:
+                return updated
+            invoice = await self.get_invoice(tenant_id, invoice_id)
+        
+        raise InvalidStatusTransitionError(
+            invoice_id,
+            invoice.status,
+            updates.get("status", invoice.status),
+            f"Invoice {invoice_id} has status {invoice.status}, expected {expected_status}",
+        )
+    
+    def _check_updates(
+        self,
+        invoice_id: str,
+        current_status: str,
+        updates: Dict[str, Any],
+    ) -> None:
+        """Validate the status change carried by updates, if any."""
+        if "status" in updates:
+            check_transition(invoice_id, current_status, updates["status"])
+    
+    def _conditional_writes(self) -> bool:
+        """Whether storage can check expected fields on write."""
+        return (
+            optional_method(self.storage, "update_invoices") is not None
+            or optional_method(self.storage, "compare_and_set_invoice") is not None
+        )
+    
+    async def _update_records(
+        self,
+        tenant_id: str,
+        updates: Dict[str, Dict[str, Any]],
+        expected: Optional[Dict[str, Dict[str, List[Any]]]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Update several invoices (id -> updates) and invalidate cache.
+        
+        Uses storage.update_invoices when available, otherwise one write
+        per invoice; invoices that fail to update are left out of the
+        result. expected maps invoice id to the conditions of
+        compare_and_set_invoice.
+        """
+        update_many = optional_method(self.storage, "update_invoices")
+        try:
+            if update_many is not None:
+                return await self._tracked(
+                    tenant_id,
+                    lambda: (
+                        update_many(tenant_id, updates)
+                        if expected is None
+                        else update_many(tenant_id, updates, expected)
+                    ),
+                    lambda records: [
+                        _event(
+                            tenant_id,
+                            _update_event_type(updates[record["id"]]),
+                            record,
+                        )
+                        for record in records
+                    ],
+                )
+            
+            updated = await asyncio.gather(
+                *(
+                    self._conditional_update(
+                        tenant_id, invoice_id, expected[invoice_id], invoice_updates
+                    )
+                    if expected is not None
+                    else self._update_record(tenant_id, invoice_id, invoice_updates)
+                    for invoice_id, invoice_updates in updates.items()
+                ),
+                return_exceptions=True,
+            )
+            return [record for record in updated if isinstance(record, dict)]
+        finally:
+            for invoice_id in updates:
+                await self._invalidate_cached(tenant_id, invoice_id)
+    
+    def _payment_status(
+        self,
+        invoice: InvoiceResponse,
+        amount_paid: Decimal,
+    ) -> Tuple[str, Optional[datetime]]:
+        """Derive invoice status and paid_at from amount paid."""
+        if amount_paid >= invoice.net_to_pay:
+            status = InvoiceStatus.PAID.value
+        elif amount_paid > 0:
+            status = InvoiceStatus.PARTIALLY_PAID.value
+        else:
+            return invoice.status, None
+        
+        # Canceled or refunded invoices keep their status
+        if not can_transition(invoice.status, status):
+            return invoice.status, invoice.paid_at
+        if status == InvoiceStatus.PAID.value:
+            return status, invoice.paid_at or datetime.utcnow()
+        return status, None
+    
+    def _payment_updates(self, invoice: InvoiceResponse) -> Dict[str, Any]:
+        """Status updates for the amount_paid of invoice, if it changes."""
+        status, paid_at = self._payment_status(invoice, invoice.amount_paid)
+        if status == invoice.status:
+            return {}
+        return {
+            "status": status,
+            "paid_at": paid_at,
+            "updated_at": datetime.utcnow(),
+        }
     
     async def mark_as_sent(
         self,
         tenant_id: str,
         invoice_id: str,
+        expected_status: Optional[str] = None,
     ) -> InvoiceResponse:
-        """Mark invoice as sent to customer."""
-        updates = {
+        """
+        Mark invoice as sent to customer.
+        
+        Pass expected_status (e.g. "issued") to skip reading the invoice:
+        the transition is validated in memory and written conditionally.
+        """
+        updated: Optional[Dict[str, Any]]
+        if expected_status is not None:
+            updated = await self._update_expected(
+                tenant_id, invoice_id, expected_status, self._sent_updates()
+            )
+        else:
+            updated = await self._update_checked(
+                tenant_id, invoice_id, lambda invoice: self._sent_updates()
+            )
+        return await self._checked_response(tenant_id, invoice_id, updated)
+    
+    def _sent_updates(self) -> Dict[str, Any]:
+        """Prepare mark-as-sent updates."""
+        return {
             "status": InvoiceStatus.SENT.value,
             "sent_at": datetime.utcnow(),
             "updated_at": datetime.utcnow(),
         }
+    
+    async def update_invoices(
+        self,
+        tenant_id: str,
+        invoice_ids: Iterable[str],
+        updates: InvoiceUpdate,
+        batch_size: int = 500,
+        expected_status: Optional[str] = None,
+    ) -> BatchUpdateResponse:
+        """
+        Apply the same field updates to many invoices.
+        
+        Args:
+            tenant_id: Tenant identifier
+            invoice_ids: Invoice IDs
+            updates: Fields to update
+            batch_size: Invoices per storage round trip
+            expected_status: Current status of all invoices; skips the
+                batch read when storage supports conditional writes
+                
+        Returns:
+            Per-invoice outcomes, in submission order
+        """
+        return await self._batch_update(
+            tenant_id,
+            invoice_ids,
+            lambda invoice_id, status: self._field_updates(invoice_id, status, updates),
+            batch_size,
+            expected_status,
+        )
+    
+    async def cancel_invoices(
+        self,
+        tenant_id: str,
+        invoice_ids: Iterable[str],
+        reason: Optional[str] = None,
+        batch_size: int = 500,
+    ) -> BatchUpdateResponse:
+        """
+        Cancel many invoices.
+        
+        Paid invoices are reported as failed, as in cancel_invoice.
+        
+        Args:
+            tenant_id: Tenant identifier
+            invoice_ids: Invoice IDs
+            reason: Cancellation reason
+            batch_size: Invoices per storage round trip
+            
+        Returns:
+            Per-invoice outcomes, in submission order
+        """
+        return await self._batch_update(
+            tenant_id,
+            invoice_ids,
+            lambda invoice: self._cancel_updates(invoice, reason),
+            batch_size,
+            with_invoice=True,
+        )
+    
+    async def mark_invoices_as_sent(
+        self,
+        tenant_id: str,
+        invoice_ids: Iterable[str],
+        batch_size: int = 500,
+        expected_status: Optional[str] = None,
+    ) -> BatchUpdateResponse:
+        """
+        Mark many invoices as sent.
+        
+        Invoices whose status does not allow it (canceled, paid, ...) are
+        reported as failed.
+        
+        Args:
+            tenant_id: Tenant identifier
+            invoice_ids: Invoice IDs
+            batch_size: Invoices per storage round trip
+            expected_status: Current status of all invoices; skips the
+                batch read when storage supports conditional writes
+                
+        Returns:
+            Per-invoice outcomes, in submission order
+        """
+        return await self._batch_update(
+            tenant_id,
+            invoice_ids,
+            lambda invoice_id, status: self._sent_updates(),
+            batch_size,
+            expected_status,
+        )
+    
+    async def _batch_update(
+        self,
+        tenant_id: str,
+        invoice_ids: Iterable[str],
+        prepare: Callable[..., Dict[str, Any]],
+        batch_size: int,
+        expected_status: Optional[str] = None,
+        with_invoice: bool = False,
+    ) -> BatchUpdateResponse:
+        """
+        Validate and update invoices batch by batch.
+        
+        prepare returns the updates of one invoice and raises BillingError
+        to reject it; it receives the loaded invoice when with_invoice is
+        set, otherwise (invoice_id, current_status). Status changes are
+        checked against the state machine in memory and written
+        conditionally on the version that was read (or on expected_status
+        when the read is skipped).
+        
+        Each batch costs one storage.get_invoices and one
+        storage.update_invoices call. With expected_status the read is
+        skipped when storage can check the status on write.
+        """
+        ids = list(dict.fromkeys(invoice_ids))
+        results = {
+            invoice_id: BatchUpdateResult(invoice_id=invoice_id) for invoice_id in ids
+        }
+        conditional_writes = self._conditional_writes()
+        
+        for offset in range(0, len(ids), batch_size):
+            batch = ids[offset:offset + batch_size]
+            
+            if expected_status is not None and not with_invoice and conditional_writes:
+                statuses = dict.fromkeys(batch, expected_status)
+                invoices: Dict[str, InvoiceResponse] = {}
+                conditions: Dict[str, Dict[str, List[Any]]] = {
+                    invoice_id: {"status": [expected_status]} for invoice_id in batch
+                }
+            else:
+                try:
+                    records = await self._load_records(tenant_id, batch)
+                except Exception as e:
+                    for invoice_id in batch:
+                        results[invoice_id].error = str(e)
+                    continue
+                invoices = {
+                    invoice_id: self._to_response(record)
+                    for invoice_id, record in records.items()
+                }
+                statuses = {
+                    invoice_id: invoice.status for invoice_id, invoice in invoices.items()
+                }
+                conditions = {
+                    invoice_id: {"version": [invoice.version]}
+                    for invoice_id, invoice in invoices.items()
+                }
+            
+            # Validate transitions in memory
+            updates: Dict[str, Dict[str, Any]] = {}
+            for invoice_id in batch:
+                status = statuses.get(invoice_id)
+                try:
+                    if status is None:
+                        raise InvoiceNotFoundError(tenant_id, invoice_id)
+                    if expected_status is not None and status != expected_status:
+                        raise InvalidStatusTransitionError(
+                            invoice_id,
+                            status,
+                            expected_status,
+                            f"Invoice {invoice_id} has status {status}, expected {expected_status}",
+                        )
+                    if with_invoice:
+                        invoice_updates = prepare(invoices[invoice_id])
+                    else:
+                        invoice_updates = prepare(invoice_id, status)
+                    self._check_updates(invoice_id, status, invoice_updates)
+                    updates[invoice_id] = invoice_updates
+                except (BillingError, ValueError) as e:
+                    results[invoice_id].error = str(e)
+            
+            if not updates:
+                continue
+            
+            try:
+                updated = await self._update_records(tenant_id, updates, conditions)
+            except Exception as e:
+                for invoice_id in updates:
+                    results[invoice_id].error = str(e)
+                continue
+            
+            for record in updated:
+                results[record["id"]].invoice = self._to_response(record)
+            for invoice_id in updates:
+                if results[invoice_id].invoice is None:
+                    results[invoice_id].error = (
+                        f"Invoice {invoice_id} not found or modified concurrently"
+                    )
+        
+        ordered = [results[invoice_id] for invoice_id in ids]
+        updated_count = sum(1 for result in ordered if result.invoice is not None)
+        return BatchUpdateResponse(
+            results=ordered,
+            updated=updated_count,
+            failed=len(ordered) - updated_count,
+        )
+    
+    async def _load_records(
+        self,
+        tenant_id: str,
+        invoice_ids: List[str],
+    ) -> Dict[str, Dict[str, Any]]:
+        """Fetch raw invoices by ID, via storage.get_invoices when available."""
+        get_many = optional_method(self.storage, "get_invoices")
+        if get_many is not None:
+            records = await get_many(tenant_id, invoice_ids)
+        else:
+            records = await asyncio.gather(
+                *(
+                    self.storage.get_invoice(tenant_id, invoice_id)
+                    for invoice_id in invoice_ids
+                )
+            )
+        return {record["id"]: record for record in records if record}
+    
+    async def mark_overdue(
+        self,
+        tenant_id: str,
+        as_of: Optional[date] = None,
+        batch_size: int = 500,
+    ) -> OverdueSweepResult:
+        """
+        Move past-due open invoices to overdue.
+        
+        Candidates are read with the status_in and due_date_before
+        filters, so storage can answer from a due-date index instead of
+        scanning every invoice, and are updated in batches through
+        storage.update_invoices when available. Each write is checked
+        against the state machine and conditional on the status that
+        was read; storages without conditional writes get the batch
+        re-read first, so invoices paid or canceled since the scan are
+        skipped.
+        
+        Args:
+            tenant_id: Tenant identifier
+            as_of: Invoices due before this date are overdue (default: today)
+            batch_size: Invoices per bulk update
+            
+        Returns:
+            Sweep counters and timing
+        """
+        as_of = as_of or date.today()
+        started = time.perf_counter()
+        
+        # Collect ids first: updating while paging would shift offset pages
+        scanned = 0
+        due: Dict[str, str] = {}
+        async for invoice in iter_storage_invoices(
+            self.storage,
+            tenant_id,
+            filters={
+                "status_in": OVERDUE_CANDIDATE_STATUSES,
+                "due_date_before": as_of,
+            },
+            page_size=batch_size,
+        ):
+            scanned += 1
+            # Storages may ignore filters they do not support
+            if invoice["status"] in OVERDUE_CANDIDATE_STATUSES and _is_past_due(
+                invoice, as_of
+            ):
+                due[invoice["id"]] = invoice["status"]
+        
+        updates = {
+            "status": InvoiceStatus.OVERDUE.value,
+            "updated_at": datetime.utcnow(),
+        }
+        due_ids = list(due)
+        conditional_writes = self._conditional_writes()
+        marked = failed = batches = 0
+        error = None
+        for offset in range(0, len(due_ids), batch_size):
+            batch = due_ids[offset:offset + batch_size]
+            batches += 1
+            try:
+                if conditional_writes:
+                    statuses = {invoice_id: due[invoice_id] for invoice_id in batch}
+                else:
+                    # Storage cannot check the status on write: read it again
+                    records = await self._load_records(tenant_id, batch)
+                    statuses = {
+                        invoice_id: record["status"]
+                        for invoice_id, record in records.items()
+                    }
+                
+                # Skip invoices paid or canceled since the scan
+                batch_updates = {}
+                for invoice_id, status in statuses.items():
+                    if status not in OVERDUE_CANDIDATE_STATUSES:
+                        continue
+                    try:
+                        self._check_updates(invoice_id, status, updates)
+                    except InvalidStatusTransitionError:
+                        continue
+                    batch_updates[invoice_id] = updates
+                
+                updated = await self._update_records(
+                    tenant_id,
+                    batch_updates,
+                    {
+                        invoice_id: {"status": [statuses[invoice_id]]}
+                        for invoice_id in batch_updates
+                    },
+                ) if batch_updates else []
+            except Exception as e:
+                failed += len(batch)
+                error = str(e)
+                continue
+            marked += len(updated)
+            failed += len(batch) - len(updated)
+        
+        return OverdueSweepResult(
+            tenant_id=tenant_id,
+            as_of=as_of,
+            scanned=scanned,
+            marked=marked,
+            failed=failed,
+            batches=batches,
+            duration_ms=(time.perf_counter() - started) * 1000,
+            error=error,
+        )
+    
+    async def mark_overdue_all(
+        self,
+        tenant_ids: Iterable[str],
+        as_of: Optional[date] = None,
+        batch_size: int = 500,
+        concurrency: int = 4,
+    ) -> OverdueSweepReport:
+        """
+        Run the overdue sweep for several tenants.
         
-        updated = await self.storage.update_invoice(tenant_id, invoice_id, updates)
-        return InvoiceResponse(**updated)
+        At most concurrency tenants are swept at the same time. A tenant
+        whose sweep fails is reported with its error and does not stop
+        the others.
+        
+        Args:
+            tenant_ids: Tenants to sweep
+            as_of: Invoices due before this date are overdue (default: today)
+            batch_size: Invoices per bulk update
+            concurrency: Maximum tenants swept in parallel
+            
+        Returns:
+            Per-tenant results and totals
+        """
+        as_of = as_of or date.today()
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def sweep(tenant_id: str) -> OverdueSweepResult:
+            async with semaphore:
+                tenant_started = time.perf_counter()
+                try:
+                    return await self.mark_overdue(tenant_id, as_of, batch_size)
+                except Exception as e:
+                    return OverdueSweepResult(
+                        tenant_id=tenant_id,
+                        as_of=as_of,
+                        scanned=0,
+                        marked=0,
+                        duration_ms=(time.perf_counter() - tenant_started) * 1000,
+                        error=str(e),
+                    )
+        
+        results = await asyncio.gather(*(sweep(t) for t in tenant_ids))
+        
+        return OverdueSweepReport(
+            as_of=as_of,
+            tenants=len(results),
+            scanned=sum(result.scanned for result in results),
+            marked=sum(result.marked for result in results),
+            failed=sum(result.failed for result in results),
+            duration_ms=(time.perf_counter() - started) * 1000,
+            results=list(results),
+        )
+    
+    async def _run_idempotent(
+        self,
+        tenant_id: str,
+        operation: str,
+        idempotency_key: Optional[str],
+        fingerprint: str,
+        execute: Callable[[], Awaitable[ResultT]],
+        load: Callable[[Dict[str, Any]], ResultT],
+    ) -> ResultT:
+        """
+        Execute operation at most once per idempotency key.
+        
+        A stored result is returned as is. Concurrent calls with the same
+        key wait for the one in flight instead of executing again; if it
+        fails nothing is stored and the next waiter executes.
+        """
+        if idempotency_key is None:
+            return await execute()
+        
+        flight_key = (tenant_id, operation, idempotency_key)
+        while True:
+            stored = await self.idempotency_store.get(*flight_key)
+            if stored is None:
+                pending = self._inflight.get(flight_key)
+                if pending is None:
+                    break
+                stored = await asyncio.shield(pending)
+                if stored is None:
+                    continue
+            
+            if stored["fingerprint"] != fingerprint:
+                raise IdempotencyKeyReusedError(idempotency_key)
+            return load(stored["result"])
+        
+        future: asyncio.Future[Optional[Dict[str, Any]]] = (
+            asyncio.get_running_loop().create_future()
+        )
+        self._inflight[flight_key] = future
+        stored = None
+        try:
+            result = await execute()
+            stored = {
+                "fingerprint": fingerprint,
+                "result": result.model_dump(mode="json"),
+            }
+            await self.idempotency_store.set(
+                *flight_key, stored, self.idempotency_ttl
+            )
+            return result
+        finally:
+            del self._inflight[flight_key]
+            future.set_result(stored)
+
+
+def _event(
+    tenant_id: str,
+    event_type: InvoiceEventType,
+    payload: Dict[str, Any],
+    invoice_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Build change event record."""
+    return {
+        "id": uuid.uuid4().hex,
+        "tenant_id": tenant_id,
+        "invoice_id": invoice_id or payload["id"],
+        "event_type": event_type.value,
+        "occurred_at": datetime.utcnow(),
+        "payload": payload,
+    }
+
+
+def _vat_bucket_deltas(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """VAT aggregate changes of change events (created adds, canceled removes)."""
+    buckets: List[Dict[str, Any]] = []
+    for record in records:
+        if record["event_type"] == InvoiceEventType.CREATED.value:
+            buckets.extend(invoice_vat_buckets(record["payload"]))
+        elif record["event_type"] == InvoiceEventType.CANCELED.value:
+            buckets.extend(invoice_vat_buckets(record["payload"], sign=-1))
+    return buckets
+
+
+def _update_event_type(updates: Dict[str, Any]) -> InvoiceEventType:
+    """Event type of an invoice update."""
+    status = updates.get("status")
+    if status == InvoiceStatus.CANCELED.value:
+        return InvoiceEventType.CANCELED
+    if status == InvoiceStatus.SENT.value:
+        return InvoiceEventType.SENT
+    return InvoiceEventType.UPDATED
+
+
+def _is_past_due(invoice: Dict[str, Any], as_of: date) -> bool:
+    """Check payment_info.due_date of a raw invoice record."""
+    due_date = (invoice.get("payment_info") or {}).get("due_date")
+    if due_date is None:
+        return False
+    if isinstance(due_date, str):
+        due_date = date.fromisoformat(due_date)
+    elif isinstance(due_date, datetime):
+        due_date = due_date.date()
+    return due_date < as_of
+
+
+def _fingerprint(request: Any, *scope: str) -> str:
+    """Hash request payload, ignoring its idempotency key."""
+    payload = request.model_dump_json(exclude={"idempotency_key"})
+    return hashlib.sha256("|".join((*scope, payload)).encode("utf-8")).hexdigest()
@@ -0,0 +1,66 @@
+"""
+Invoice status state machine.
+
+The transition table is computed once at import and frozen, so every
+check is a dict lookup plus a frozenset membership test.
+"""
+
+from types import MappingProxyType
+from typing import FrozenSet, Mapping, Optional
+
+from ..constants import InvoiceStatus
+from ..exceptions import InvalidStatusTransitionError
+
+_S = InvoiceStatus
+
+# Allowed target statuses per current status (self-transitions are no-ops)
+INVOICE_TRANSITIONS: Mapping[str, FrozenSet[str]] = MappingProxyType({
+    current.value: frozenset(target.value for target in targets)
+    for current, targets in {
+        _S.DRAFT: (_S.ISSUED, _S.CANCELED),
+        _S.ISSUED: (
+            _S.SENT, _S.VIEWED, _S.PARTIALLY_PAID, _S.PAID, _S.OVERDUE, _S.CANCELED,
+        ),
+        _S.SENT: (_S.VIEWED, _S.PARTIALLY_PAID, _S.PAID, _S.OVERDUE, _S.CANCELED),
+        _S.VIEWED: (_S.SENT, _S.PARTIALLY_PAID, _S.PAID, _S.OVERDUE, _S.CANCELED),
+        _S.PARTIALLY_PAID: (_S.PAID, _S.OVERDUE, _S.CANCELED),
+        _S.OVERDUE: (_S.PARTIALLY_PAID, _S.PAID, _S.CANCELED),
+        _S.PAID: (_S.REFUNDED,),
+        _S.CANCELED: (),
+        _S.REFUNDED: (),
+    }.items()
+})
+
+# Statuses from which each target status can be reached
+INVOICE_TRANSITION_SOURCES: Mapping[str, FrozenSet[str]] = MappingProxyType({
+    target.value: frozenset(
+        current for current, targets in INVOICE_TRANSITIONS.items()
+        if target.value in targets
+    )
+    for target in InvoiceStatus
+})
+
+_NO_TRANSITIONS: FrozenSet[str] = frozenset()
+
+
+def can_transition(current: str, target: str) -> bool:
+    """Check whether an invoice may move from current to target status."""
+    if current == target:
+        return True
+    return target in INVOICE_TRANSITIONS.get(current, _NO_TRANSITIONS)
+
+
+def check_transition(
+    invoice_id: str,
+    current: str,
+    target: str,
+    message: Optional[str] = None,
+) -> None:
+    """
+    Validate status transition.
+    
+    Raises:
+        InvalidStatusTransitionError: If the transition is not allowed
+    """
+    if not can_transition(current, target):
+        raise InvalidStatusTransitionError(invoice_id, current, target, message)
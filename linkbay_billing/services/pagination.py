@@ -0,0 +1,104 @@
+"""
+Cursor helpers for invoice pagination.
+"""
+
+import base64
+import binascii
+import json
+from datetime import date
+from typing import Any, AsyncIterator, Dict, Optional
+
+from ..exceptions import InvalidInvoiceDataError
+from ..protocols import InvoiceStorage, optional_method
+
+
+def encode_cursor(
+    issue_date: Optional[date] = None,
+    invoice_id: Optional[str] = None,
+    offset: Optional[int] = None,
+) -> str:
+    """
+    Build opaque pagination cursor.
+    
+    Keyset cursors carry the (issue_date, id) of the last returned
+    invoice; offset cursors are used for storages without keyset support.
+    """
+    if offset is not None:
+        payload: Dict[str, Any] = {"o": offset}
+    elif issue_date is not None and invoice_id is not None:
+        payload = {"k": [issue_date.isoformat(), invoice_id]}
+    else:
+        raise ValueError("keyset cursor needs issue_date and invoice_id")
+    
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Decode opaque pagination cursor.
+    
+    Returns:
+        Dict with either keys issue_date and id (keyset), or offset
+        
+    Raises:
+        InvalidInvoiceDataError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        
+        if "o" in payload:
+            offset = int(payload["o"])
+            if offset < 0:
+                raise ValueError("negative offset")
+            return {"offset": offset}
+        
+        issue_date, invoice_id = payload["k"]
+        return {"issue_date": date.fromisoformat(issue_date), "id": str(invoice_id)}
+    except (binascii.Error, UnicodeError, KeyError, TypeError, ValueError) as e:
+        raise InvalidInvoiceDataError("cursor", f"malformed cursor ({e})") from e
+
+
+async def iter_storage_invoices(
+    storage: InvoiceStorage,
+    tenant_id: str,
+    filters: Optional[Dict[str, Any]] = None,
+    page_size: int = 1000,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Iterate over all matching invoices in bounded memory.
+    
+    Prefers storage.stream_invoices (server-side cursor), then keyset
+    pages via storage.list_invoices_after, then offset pages via
+    storage.list_invoices. At most one page is held in memory.
+    
+    Yields:
+        Raw invoice records
+    """
+    stream = optional_method(storage, "stream_invoices")
+    if stream is not None:
+        async for invoice in stream(tenant_id, filters, page_size):
+            yield invoice
+        return
+    
+    list_after = optional_method(storage, "list_invoices_after")
+    if list_after is not None:
+        after = None
+        while True:
+            page = await list_after(tenant_id, after, page_size, filters)
+            for invoice in page:
+                yield invoice
+            if len(page) < page_size:
+                return
+            last = page[-1]
+            after = {"issue_date": last["issue_date"], "id": last["id"]}
+    
+    skip = 0
+    while True:
+        page = await storage.list_invoices(tenant_id, skip, page_size, filters)
+        for invoice in page:
+            yield invoice
+        if len(page) < page_size:
+            return
+        skip += page_size
@@ -0,0 +1,600 @@
+"""
+Bank statement reconciliation service.
+"""
+
+import asyncio
+import csv
+import io
+import re
+import xml.etree.ElementTree as ET
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    TextIO,
+    Tuple,
+    Union,
+)
+
+from ..constants import InvoiceStatus, PaymentMethod
+from ..exceptions import BillingError, InvalidInvoiceDataError
+from ..schemas import (
+    PaymentRecordCreate,
+    ReconciliationLine,
+    ReconciliationReport,
+    StatementEntry,
+)
+from .invoice_manager import InvoiceManager
+from .pagination import iter_storage_invoices
+
+_TOKEN_SPLIT = re.compile(r"[\s,;:()\[\]]+")
+_NON_ALNUM = re.compile(r"[^0-9A-Z]")
+
+OPEN_STATUSES = [
+    InvoiceStatus.ISSUED.value,
+    InvoiceStatus.SENT.value,
+    InvoiceStatus.PARTIALLY_PAID.value,
+    InvoiceStatus.OVERDUE.value,
+]
+
+DEFAULT_CSV_COLUMNS = {
+    "booking_date": "date",
+    "amount": "amount",
+    "currency": "currency",
+    "reference": "reference",
+    "counterparty_name": "counterparty",
+    "transaction_id": "transaction_id",
+}
+
+
+def iter_csv_statement(
+    source: Union[str, TextIO],
+    columns: Optional[Dict[str, str]] = None,
+    delimiter: str = ",",
+    decimal_separator: str = ".",
+    date_format: str = "%Y-%m-%d",
+    encoding: str = "utf-8",
+) -> Iterator[StatementEntry]:
+    """
+    Stream entries from a CSV bank statement.
+    
+    Rows are read one at a time, so memory use does not depend on the
+    file size.
+    
+    Args:
+        source: File path or open text stream
+        columns: Mapping of StatementEntry field -> CSV header
+        delimiter: CSV delimiter
+        decimal_separator: Decimal separator used in amounts
+        date_format: strptime format of booking dates
+        encoding: File encoding (when source is a path)
+        
+    Yields:
+        Statement entries
+    """
+    columns = {**DEFAULT_CSV_COLUMNS, **(columns or {})}
+    
+    if isinstance(source, str):
+        with open(source, newline="", encoding=encoding) as handle:
+            yield from iter_csv_statement(
+                handle, columns, delimiter, decimal_separator, date_format
+            )
+        return
+    
+    reader = csv.DictReader(source, delimiter=delimiter)
+    for line, row in enumerate(reader, start=1):
+        raw_amount = (row.get(columns["amount"]) or "").strip()
+        if decimal_separator != ".":
+            raw_amount = raw_amount.replace(".", "").replace(decimal_separator, ".")
+        
+        try:
+            amount = Decimal(raw_amount)
+            booking_date = datetime.strptime(
+                row[columns["booking_date"]].strip(), date_format
+            ).date()
+        except (InvalidOperation, KeyError, ValueError) as e:
+            raise InvalidInvoiceDataError(
+                "statement", f"invalid CSV row {line}: {e}"
+            ) from e
+        
+        yield StatementEntry(
+            line=line,
+            amount=amount,
+            booking_date=booking_date,
+            currency=(row.get(columns["currency"]) or "EUR").strip() or "EUR",
+            reference=row.get(columns["reference"]) or None,
+            counterparty_name=row.get(columns["counterparty_name"]) or None,
+            transaction_id=row.get(columns["transaction_id"]) or None,
+        )
+
+
+def iter_camt053_statement(
+    source: Union[str, bytes, Any],
+) -> Iterator[StatementEntry]:
+    """
+    Stream entries from an ISO 20022 CAMT.053 statement.
+    
+    Uses incremental parsing and drops every <Ntry> element once it has
+    been converted, so memory stays constant on large statements.
+    
+    Args:
+        source: File path or binary stream
+        
+    Yields:
+        Statement entries (debits have negative amounts)
+    """
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    
+    stack: List[ET.Element] = []
+    line = 0
+    
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            stack.append(elem)
+            continue
+        
+        stack.pop()
+        if _local(elem.tag) != "Ntry":
+            continue
+        
+        line += 1
+        yield _camt_entry(elem, line)
+        
+        # Free the processed entry
+        if stack:
+            stack[-1].remove(elem)
+        elem.clear()
+
+
+def _local(tag: str) -> str:
+    """Strip XML namespace from tag."""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _find(elem: ET.Element, path: str) -> Optional[ET.Element]:
+    """Namespace-agnostic find of a '/'-separated path."""
+    current = elem
+    for name in path.split("/"):
+        found = next(
+            (child for child in current if _local(child.tag) == name), None
+        )
+        if found is None:
+            return None
+        current = found
+    return current
+
+
+def _text(elem: ET.Element, path: str) -> Optional[str]:
+    """Text of the element at path, if any."""
+    found = _find(elem, path)
+    if found is None or found.text is None:
+        return None
+    return found.text.strip() or None
+
+
+def _camt_entry(ntry: ET.Element, line: int) -> StatementEntry:
+    """Convert a CAMT.053 <Ntry> element into a statement entry."""
+    amount_elem = _find(ntry, "Amt")
+    if amount_elem is None or not amount_elem.text:
+        raise InvalidInvoiceDataError("statement", f"entry {line} has no amount")
+    
+    amount = Decimal(amount_elem.text.strip())
+    if _text(ntry, "CdtDbtInd") == "DBIT":
+        amount = -amount
+    
+    raw_date = _text(ntry, "BookgDt/Dt") or _text(ntry, "BookgDt/DtTm")
+    raw_date = raw_date or _text(ntry, "ValDt/Dt") or _text(ntry, "ValDt/DtTm")
+    if not raw_date:
+        raise InvalidInvoiceDataError("statement", f"entry {line} has no date")
+    
+    details = _find(ntry, "NtryDtls/TxDtls")
+    reference_parts: List[str] = []
+    counterparty_name = None
+    transaction_id = _text(ntry, "AcctSvcrRef") or _text(ntry, "NtryRef")
+    
+    if details is not None:
+        remittance = _find(details, "RmtInf")
+        if remittance is not None:
+            reference_parts.extend(
+                child.text.strip()
+                for child in remittance.iter()
+                if _local(child.tag) in ("Ustrd", "Ref") and child.text
+            )
+        counterparty_name = _text(details, "RltdPties/Dbtr/Nm") or _text(
+            details, "RltdPties/Dbtr/Pty/Nm"
+        )
+        transaction_id = _text(details, "Refs/EndToEndId") or transaction_id
+    
+    additional_info = _text(ntry, "AddtlNtryInf")
+    if not reference_parts and additional_info:
+        reference_parts.append(additional_info)
+    
+    return StatementEntry(
+        line=line,
+        amount=amount,
+        booking_date=date.fromisoformat(raw_date[:10]),
+        currency=amount_elem.get("Ccy", "EUR"),
+        reference=" ".join(reference_parts) or None,
+        counterparty_name=counterparty_name,
+        transaction_id=transaction_id,
+    )
+
+
+def _normalize(value: str) -> str:
+    """Normalize invoice numbers and names for lookups."""
+    return _NON_ALNUM.sub("", value.upper())
+
+
+class _OpenInvoice:
+    """Index entry for an open invoice."""
+    
+    __slots__ = ("id", "invoice_number", "customer_key", "currency", "outstanding")
+    
+    def __init__(
+        self,
+        id: str,
+        invoice_number: str,
+        customer_key: str,
+        currency: str,
+        outstanding: Decimal,
+    ):
+        self.id = id
+        self.invoice_number = invoice_number
+        self.customer_key = customer_key
+        self.currency = currency
+        self.outstanding = outstanding
+
+
+class OpenInvoiceIndex:
+    """
+    In-memory index of a tenant's open invoices.
+    
+    Keyed on normalized invoice number, outstanding amount and
+    normalized customer name. Outstanding amounts are decremented as
+    payments are matched, so one statement can settle an invoice in
+    several lines.
+    """
+    
+    def __init__(self) -> None:
+        self._by_number: Dict[str, _OpenInvoice] = {}
+        self._by_amount: Dict[Decimal, Dict[str, _OpenInvoice]] = {}
+    
+    def __len__(self) -> int:
+        return len(self._by_number)
+    
+    def add(
+        self,
+        invoice: Dict[str, Any],
+        amount_paid: Optional[Decimal] = None,
+    ) -> None:
+        """Add an open invoice (storage dict)."""
+        if amount_paid is None:
+            amount_paid = Decimal(str(invoice.get("amount_paid") or 0))
+        
+        outstanding = Decimal(str(invoice.get("net_to_pay", 0))) - amount_paid
+        if outstanding <= 0:
+            return
+        
+        customer = invoice.get("customer") or {}
+        entry = _OpenInvoice(
+            id=invoice["id"],
+            invoice_number=invoice["invoice_number"],
+            customer_key=_normalize(
+                customer.get("legal_name") or customer.get("name") or ""
+            ),
+            currency=invoice.get("currency", "EUR"),
+            outstanding=outstanding,
+        )
+        self._by_number[_normalize(entry.invoice_number)] = entry
+        self._by_amount.setdefault(outstanding, {})[entry.id] = entry
+    
+    def by_reference(self, reference: Optional[str]) -> List[_OpenInvoice]:
+        """Open invoices whose number appears in remittance text."""
+        if not reference:
+            return []
+        
+        found: Dict[str, _OpenInvoice] = {}
+        for token in _TOKEN_SPLIT.split(reference):
+            entry = self._by_number.get(_normalize(token))
+            if entry is not None:
+                found[entry.id] = entry
+        return list(found.values())
+    
+    def by_amount(self, amount: Decimal) -> List[_OpenInvoice]:
+        """Open invoices with exactly this outstanding amount."""
+        return list(self._by_amount.get(amount, {}).values())
+    
+    def settle(self, entry: _OpenInvoice, amount: Decimal) -> None:
+        """Decrement outstanding amount after a matched payment."""
+        bucket = self._by_amount.get(entry.outstanding)
+        if bucket is not None:
+            bucket.pop(entry.id, None)
+            if not bucket:
+                del self._by_amount[entry.outstanding]
+        
+        entry.outstanding -= amount
+        if entry.outstanding <= 0:
+            self._by_number.pop(_normalize(entry.invoice_number), None)
+            return
+        self._by_amount.setdefault(entry.outstanding, {})[entry.id] = entry
+
+
+class ReconciliationService:
+    """
+    Service for matching bank statements to open invoices.
+    
+    Supports:
+    - Streaming CSV and CAMT.053 statements (constant memory)
+    - Matching on invoice number, or on amount and customer name
+    - Batched payment recording through InvoiceManager.record_payment
+    - Report of matched, ambiguous and unmatched lines
+    """
+    
+    def __init__(
+        self,
+        invoice_manager: InvoiceManager,
+        batch_size: int = 200,
+        page_size: int = 1000,
+        max_report_lines: int = 10000,
+        payment_method: str = PaymentMethod.BANK_TRANSFER.value,
+    ):
+        """
+        Initialize reconciliation service.
+        
+        Args:
+            invoice_manager: InvoiceManager used to record payments
+            batch_size: Payments applied concurrently per batch
+            page_size: Invoices fetched per page when building the index
+            max_report_lines: Cap of non-matched lines kept in the report
+            payment_method: Method stored on recorded payments
+        """
+        self.invoice_manager = invoice_manager
+        self.storage = invoice_manager.storage
+        self.batch_size = batch_size
+        self.page_size = page_size
+        self.max_report_lines = max_report_lines
+        self.payment_method = payment_method
+    
+    async def build_index(self, tenant_id: str) -> OpenInvoiceIndex:
+        """Load all open invoices of tenant into an index."""
+        index = OpenInvoiceIndex()
+        
+        async for invoice in iter_storage_invoices(
+            self.storage,
+            tenant_id,
+            {"status_in": OPEN_STATUSES},
+            self.page_size,
+        ):
+            amount_paid = None
+            if invoice.get("amount_paid") is None:
+                payments = await self.storage.get_payments(tenant_id, invoice["id"])
+                amount_paid = sum(
+                    (Decimal(str(p["amount"])) for p in payments), Decimal("0")
+                )
+            index.add(invoice, amount_paid)
+        
+        return index
+    
+    async def reconcile_csv(
+        self,
+        tenant_id: str,
+        source: Union[str, TextIO],
+        dry_run: bool = False,
+        **csv_options: Any,
+    ) -> ReconciliationReport:
+        """
+        Reconcile a CSV bank statement.
+        
+        Args:
+            tenant_id: Tenant identifier
+            source: File path or text stream
+            dry_run: Match only, do not record payments
+            **csv_options: Options for iter_csv_statement
+        """
+        return await self.reconcile(
+            tenant_id, iter_csv_statement(source, **csv_options), dry_run
+        )
+    
+    async def reconcile_camt053(
+        self,
+        tenant_id: str,
+        source: Union[str, bytes, Any],
+        dry_run: bool = False,
+    ) -> ReconciliationReport:
+        """
+        Reconcile an ISO 20022 CAMT.053 statement.
+        
+        Args:
+            tenant_id: Tenant identifier
+            source: File path, bytes or binary stream
+            dry_run: Match only, do not record payments
+        """
+        return await self.reconcile(
+            tenant_id, iter_camt053_statement(source), dry_run
+        )
+    
+    async def reconcile(
+        self,
+        tenant_id: str,
+        entries: Iterable[StatementEntry],
+        dry_run: bool = False,
+        index: Optional[OpenInvoiceIndex] = None,
+    ) -> ReconciliationReport:
+        """
+        Match statement entries to open invoices and record payments.
+        
+        Entries are consumed in a single pass. Matched payments are
+        applied in batches of batch_size; within a batch each invoice
+        receives at most one payment at a time.
+        
+        Args:
+            tenant_id: Tenant identifier
+            entries: Statement entries (any iterable, e.g. a parser)
+            dry_run: Match only, do not record payments
+            index: Prebuilt open invoice index (default: built now)
+            
+        Returns:
+            Reconciliation report
+            
+        Example:
+            ```python
+            reconciliation = ReconciliationService(invoice_manager)
+            
+            report = await reconciliation.reconcile_camt053(
+                tenant_id="agency123",
+                source="/path/to/statement.xml",
+            )
+            print(report.matched, report.ambiguous, report.unmatched)
+            ```
+        """
+        if index is None:
+            index = await self.build_index(tenant_id)
+        
+        counters = {
+            "total_lines": 0,
+            "matched": 0,
+            "ambiguous": 0,
+            "unmatched": 0,
+            "skipped": 0,
+            "failed": 0,
+        }
+        matched_amount = Decimal("0")
+        lines: List[ReconciliationLine] = []
+        batch: Dict[str, Any] = {}
+        
+        def report_line(
+            entry: StatementEntry,
+            status: str,
+            reason: str,
+            candidates: Sequence[_OpenInvoice] = (),
+        ) -> None:
+            counters[status] += 1
+            if len(lines) < self.max_report_lines:
+                lines.append(
+                    ReconciliationLine(
+                        entry=entry,
+                        status=status,
+                        reason=reason,
+                        candidate_invoice_ids=[c.id for c in candidates],
+                    )
+                )
+        
+        async def flush() -> None:
+            nonlocal matched_amount
+            if not batch or dry_run:
+                batch.clear()
+                return
+            pending = list(batch.values())
+            batch.clear()
+            outcomes = await asyncio.gather(
+                *(
+                    self.invoice_manager.record_payment(
+                        tenant_id, invoice_id, payment
+                    )
+                    for invoice_id, payment, _ in pending
+                ),
+                return_exceptions=True,
+            )
+            for (_, _, entry), outcome in zip(pending, outcomes):
+                if isinstance(outcome, BillingError):
+                    counters["matched"] -= 1
+                    matched_amount -= entry.amount
+                    report_line(entry, "failed", str(outcome))
+                elif isinstance(outcome, BaseException):
+                    raise outcome
+        
+        for entry in entries:
+            counters["total_lines"] += 1
+            
+            if entry.amount <= 0:
+                counters["skipped"] += 1
+                continue
+            
+            status, reason, candidates = self._match(index, entry)
+            if status != "matched":
+                report_line(entry, status, reason, candidates)
+                continue
+            
+            invoice = candidates[0]
+            if invoice.id in batch or len(batch) >= self.batch_size:
+                await flush()
+            
+            index.settle(invoice, entry.amount)
+            counters["matched"] += 1
+            matched_amount += entry.amount
+            batch[invoice.id] = (
+                invoice.id,
+                PaymentRecordCreate(
+                    amount=entry.amount,
+                    payment_date=entry.booking_date,
+                    payment_method=self.payment_method,
+                    transaction_id=entry.transaction_id,
+                    notes=entry.reference,
+                ),
+                entry,
+            )
+        
+        await flush()
+        
+        return ReconciliationReport(
+            tenant_id=tenant_id,
+            matched_amount=matched_amount,
+            lines=lines,
+            dry_run=dry_run,
+            generated_at=datetime.utcnow(),
+            **counters,
+        )
+    
+    def _match(
+        self,
+        index: OpenInvoiceIndex,
+        entry: StatementEntry,
+    ) -> Tuple[str, str, List[_OpenInvoice]]:
+        """
+        Find the invoice an entry pays: (status, reason, candidates).
+        
+        Only an invoice number in the reference, or the outstanding
+        amount together with the customer name as counterparty, is
+        enough to apply a payment; an amount alone goes to review.
+        """
+        candidates = [
+            c for c in index.by_reference(entry.reference)
+            if c.currency == entry.currency
+        ]
+        
+        if len(candidates) > 1:
+            return "ambiguous", "several invoice numbers in reference", candidates
+        
+        if len(candidates) == 1:
+            if entry.amount > candidates[0].outstanding:
+                return (
+                    "ambiguous",
+                    f"amount exceeds outstanding {candidates[0].outstanding}",
+                    candidates,
+                )
+            return "matched", "invoice number", candidates
+        
+        # No reference: fall back to amount, confirmed by customer name
+        candidates = [
+            c for c in index.by_amount(entry.amount)
+            if c.currency == entry.currency
+        ]
+        if not candidates:
+            return "unmatched", "no open invoice found", []
+        
+        customer_key = _normalize(entry.counterparty_name or "")
+        by_customer = [
+            c for c in candidates if customer_key and c.customer_key == customer_key
+        ]
+        if len(by_customer) == 1:
+            return "matched", "amount and counterparty", by_customer
+        if by_customer:
+            return "ambiguous", "several invoices with same amount", by_customer
+        return "ambiguous", "amount only, counterparty is not the customer", candidates
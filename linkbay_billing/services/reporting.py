@@ -2,12 +2,15 @@
 Reporting service for VAT and financial reports.
 """
 
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import date, datetime
 from decimal import Decimal
-from ..protocols import InvoiceStorage
+from ..protocols import InvoiceStorage, VATAggregateStore, optional_method
 from ..schemas import VATReport, OutstandingReport, CustomerBalance, VATSummary
 from ..constants import InvoiceStatus
+from .pagination import iter_storage_invoices
+from .fx import FXRateCache, currency_quantum
+from .vat_aggregates import BucketKey, invoice_vat_buckets, merge_vat_buckets
 
 
 class ReportingService:
@@ -20,29 +23,60 @@ class ReportingService:
     - Customer balance report
     """
     
-    def __init__(self, storage: InvoiceStorage):
+    def __init__(
+        self,
+        storage: InvoiceStorage,
+        page_size: int = 1000,
+        fx_rates: Optional[FXRateCache] = None,
+        vat_aggregates: Optional[VATAggregateStore] = None,
+    ):
         """
         Initialize reporting service.
         
         Args:
             storage: Invoice storage implementation
+            page_size: Invoices fetched per storage round trip
+            fx_rates: Exchange rates for reports in a reporting currency
+            vat_aggregates: Daily VAT totals answering VAT reports (default:
+                the storage if it implements get_vat_buckets)
         """
         self.storage = storage
+        self.page_size = page_size
+        self.fx_rates = fx_rates
+        if vat_aggregates is None and optional_method(storage, "get_vat_buckets"):
+            vat_aggregates = storage  # type: ignore[assignment]
+        self.vat_aggregates = vat_aggregates
     
     async def generate_vat_report(
         self,
         tenant_id: str,
         period_start: date,
         period_end: date,
+        reporting_currency: Optional[str] = None,
     ) -> VATReport:
         """
         Generate VAT report for period.
         
+        With reporting_currency, the amounts of every invoice in another
+        currency are converted at the rate of its issue date (fx_rates),
+        rounded to the reporting currency's minor unit. Rates are looked
+        up once per distinct (currency, date).
+        
+        Amounts are the output VAT of the invoices as issued (stored VAT
+        summaries); credit notes are subtracted and reverse-charge VAT,
+        due by the buyer, is left out.
+        
+        With vat_aggregates the report is built from daily buckets (one
+        per day, rate and currency) instead of scanning the invoices;
+        conversion is then rounded per bucket rather than per invoice.
+        
         Args:
             tenant_id: Tenant identifier
             period_start: Report period start
             period_end: Report period end
-            
+            reporting_currency: Currency to convert amounts to (default:
+                amounts are added as stored)
+                
         Returns:
             VAT report with totals by rate
             
@@ -57,49 +91,71 @@ class ReportingService:
             )
             ```
         """
-        # Get all invoices in period
-        invoices = await self.storage.list_invoices(
+        if self.vat_aggregates is not None:
+            return await self._report_from_buckets(
+                self.vat_aggregates,
+                tenant_id,
+                period_start,
+                period_end,
+                reporting_currency,
+            )
+        
+        # Stream all invoices in period
+        invoices = iter_storage_invoices(
+            self.storage,
             tenant_id,
             filters={
                 "issue_date_from": period_start,
                 "issue_date_to": period_end,
                 "status_not": InvoiceStatus.CANCELED.value,
             },
+            page_size=self.page_size,
         )
         
         # Calculate totals
-        total_invoices = len(invoices)
+        total_invoices = 0
         total_taxable = Decimal("0")
         total_vat = Decimal("0")
         total_gross = Decimal("0")
         vat_by_rate = {}
+        rates: Dict[Tuple[str, date], Decimal] = {}
         
-        for invoice in invoices:
-            subtotal = Decimal(str(invoice.get("subtotal", 0)))
-            vat = Decimal(str(invoice.get("total_vat", 0)))
-            total = Decimal(str(invoice.get("total", 0)))
+        async for invoice in invoices:
+            total_invoices += 1
+            fx_rate = None
+            if reporting_currency is not None:
+                fx_rate = await self._fx_rate(
+                    invoice, reporting_currency, period_start, period_end, rates
+                )
+                quantum = currency_quantum(reporting_currency)
+            
+            # Same amounts and signs as the aggregates, converted per invoice
+            totals, *by_rate = invoice_vat_buckets(invoice)
+            subtotal, vat, total = totals["taxable"], totals["vat"], totals["gross"]
+            if fx_rate is not None:
+                subtotal = (subtotal * fx_rate).quantize(quantum)
+                vat = (vat * fx_rate).quantize(quantum)
+                total = (total * fx_rate).quantize(quantum)
             
             total_taxable += subtotal
             total_vat += vat
             total_gross += total
             
             # Group by VAT rate
-            for row in invoice.get("rows", []):
-                rate = Decimal(str(row.get("vat_rate", 0)))
-                row_subtotal = Decimal(str(row.get("quantity", 1))) * Decimal(
-                    str(row.get("unit_price", 0))
-                )
-                
+            for bucket in by_rate:
+                rate = bucket["vat_rate"]
                 if rate not in vat_by_rate:
                     vat_by_rate[rate] = {
                         "taxable": Decimal("0"),
                         "vat": Decimal("0"),
                     }
                 
-                vat_by_rate[rate]["taxable"] += row_subtotal
-                vat_by_rate[rate]["vat"] += (row_subtotal * rate / 100).quantize(
-                    Decimal("0.01")
-                )
+                taxable, rate_vat = bucket["taxable"], bucket["vat"]
+                if fx_rate is not None:
+                    taxable = (taxable * fx_rate).quantize(quantum)
+                    rate_vat = (rate_vat * fx_rate).quantize(quantum)
+                vat_by_rate[rate]["taxable"] += taxable
+                vat_by_rate[rate]["vat"] += rate_vat
         
         # Build VAT summaries
         vat_summaries = [
@@ -121,7 +177,216 @@ class ReportingService:
             total_gross=total_gross,
             vat_by_rate=vat_summaries,
             generated_at=datetime.utcnow(),
+            currency=reporting_currency,
+        )
+    
+    async def _report_from_buckets(
+        self,
+        aggregates: VATAggregateStore,
+        tenant_id: str,
+        period_start: date,
+        period_end: date,
+        reporting_currency: Optional[str],
+    ) -> VATReport:
+        """Build VAT report from daily aggregates."""
+        buckets = await aggregates.get_vat_buckets(
+            tenant_id, period_start, period_end
+        )
+        
+        total_invoices = 0
+        total_taxable = Decimal("0")
+        total_vat = Decimal("0")
+        total_gross = Decimal("0")
+        vat_by_rate = {}
+        rates: Dict[Tuple[str, date], Decimal] = {}
+        
+        for bucket in buckets:
+            taxable = Decimal(str(bucket["taxable"]))
+            vat = Decimal(str(bucket["vat"]))
+            gross = Decimal(str(bucket["gross"]))
+            
+            if reporting_currency is not None:
+                fx_rate = await self._fx_rate(
+                    {"currency": bucket["currency"], "issue_date": bucket["day"]},
+                    reporting_currency,
+                    period_start,
+                    period_end,
+                    rates,
+                )
+                if fx_rate is not None:
+                    quantum = currency_quantum(reporting_currency)
+                    taxable = (taxable * fx_rate).quantize(quantum)
+                    vat = (vat * fx_rate).quantize(quantum)
+                    gross = (gross * fx_rate).quantize(quantum)
+            
+            if bucket["vat_rate"] is None:
+                total_invoices += bucket["invoices"]
+                total_taxable += taxable
+                total_vat += vat
+                total_gross += gross
+                continue
+            
+            rate = Decimal(str(bucket["vat_rate"]))
+            if rate not in vat_by_rate:
+                vat_by_rate[rate] = {
+                    "taxable": Decimal("0"),
+                    "vat": Decimal("0"),
+                }
+            vat_by_rate[rate]["taxable"] += taxable
+            vat_by_rate[rate]["vat"] += vat
+        
+        return VATReport(
+            tenant_id=tenant_id,
+            period_start=period_start,
+            period_end=period_end,
+            total_invoices=total_invoices,
+            total_taxable=total_taxable,
+            total_vat=total_vat,
+            total_gross=total_gross,
+            vat_by_rate=[
+                VATSummary(
+                    vat_rate=rate,
+                    taxable_amount=data["taxable"],
+                    vat_amount=data["vat"],
+                )
+                for rate, data in vat_by_rate.items()
+            ],
+            generated_at=datetime.utcnow(),
+            currency=reporting_currency,
+        )
+    
+    async def rebuild_vat_aggregates(
+        self,
+        tenant_id: str,
+        period_start: date,
+        period_end: date,
+    ) -> int:
+        """
+        Recompute VAT aggregates of a period from the invoices.
+        
+        Used to backfill aggregates of invoices created before they were
+        enabled, or to repair them. Buckets of the period are replaced:
+        run it while no invoices of the period are being written.
+        
+        Returns:
+            Number of invoices aggregated
+        """
+        aggregates = self._aggregate_store()
+        buckets, count = await self._scan_vat_buckets(
+            tenant_id, period_start, period_end
+        )
+        await aggregates.clear_vat_buckets(tenant_id, period_start, period_end)
+        if buckets:
+            await aggregates.add_vat_buckets(tenant_id, list(buckets.values()))
+        return count
+    
+    async def check_vat_aggregates(
+        self,
+        tenant_id: str,
+        period_start: date,
+        period_end: date,
+    ) -> List[Dict[str, Any]]:
+        """
+        Compare VAT aggregates of a period with the invoices.
+        
+        Returns:
+            Differing buckets as dicts with keys day, vat_rate, currency,
+            expected and stored (bucket or None); empty if consistent
+        """
+        aggregates = self._aggregate_store()
+        expected, _ = await self._scan_vat_buckets(tenant_id, period_start, period_end)
+        stored: Dict[BucketKey, Dict[str, Any]] = {}
+        merge_vat_buckets(
+            stored,
+            (
+                _native_bucket(bucket)
+                for bucket in await aggregates.get_vat_buckets(
+                    tenant_id, period_start, period_end
+                )
+            ),
         )
+        
+        mismatches = []
+        for key in sorted(
+            set(expected) | set(stored),
+            key=lambda key: (key[0], key[1] is not None, key[1] or 0, key[2] or ""),
+        ):
+            if expected.get(key) != stored.get(key):
+                mismatches.append({
+                    "day": key[0],
+                    "vat_rate": key[1],
+                    "currency": key[2],
+                    "expected": expected.get(key),
+                    "stored": stored.get(key),
+                })
+        return mismatches
+    
+    def _aggregate_store(self) -> VATAggregateStore:
+        """Get the configured VAT aggregate store."""
+        if self.vat_aggregates is None:
+            raise ValueError("vat_aggregates is not configured")
+        return self.vat_aggregates
+    
+    async def _scan_vat_buckets(
+        self,
+        tenant_id: str,
+        period_start: date,
+        period_end: date,
+    ) -> Tuple[Dict[BucketKey, Dict[str, Any]], int]:
+        """Aggregate non-canceled invoices of a period into buckets."""
+        buckets: Dict[BucketKey, Dict[str, Any]] = {}
+        count = 0
+        async for invoice in iter_storage_invoices(
+            self.storage,
+            tenant_id,
+            filters={
+                "issue_date_from": period_start,
+                "issue_date_to": period_end,
+                "status_not": InvoiceStatus.CANCELED.value,
+            },
+            page_size=self.page_size,
+        ):
+            count += 1
+            merge_vat_buckets(buckets, invoice_vat_buckets(invoice))
+        return buckets, count
+    
+    async def _fx_rate(
+        self,
+        invoice: Dict[str, Any],
+        reporting_currency: str,
+        period_start: date,
+        period_end: date,
+        rates: Dict[Tuple[str, date], Decimal],
+    ) -> Optional[Decimal]:
+        """
+        Get rate converting invoice amounts to reporting_currency.
+        
+        Returns:
+            Rate, None if the invoice is already in reporting_currency
+        """
+        currency = invoice.get("currency") or reporting_currency
+        if currency == reporting_currency:
+            return None
+        
+        issue_date = invoice["issue_date"]
+        if isinstance(issue_date, str):
+            issue_date = date.fromisoformat(issue_date[:10])
+        
+        rate = rates.get((currency, issue_date))
+        if rate is None:
+            if self.fx_rates is None:
+                raise ValueError(
+                    f"fx_rates is required to convert {currency} to {reporting_currency}"
+                )
+            if not any(key[0] == currency for key in rates):
+                # First invoice in this currency: load the whole period at once
+                await self.fx_rates.preload(
+                    currency, reporting_currency, period_start, period_end
+                )
+            rate = rates[(currency, issue_date)] = await self.fx_rates.get_rate(
+                currency, reporting_currency, issue_date
+            )
+        return rate
     
     async def generate_outstanding_report(
         self,
@@ -136,8 +401,9 @@ class ReportingService:
         Returns:
             Outstanding invoices by customer
         """
-        # Get unpaid and partially paid invoices
-        invoices = await self.storage.list_invoices(
+        # Stream unpaid and partially paid invoices
+        invoices = iter_storage_invoices(
+            self.storage,
             tenant_id,
             filters={
                 "status_in": [
@@ -147,6 +413,7 @@ class ReportingService:
                     InvoiceStatus.OVERDUE.value,
                 ],
             },
+            page_size=self.page_size,
         )
         
         # Group by customer
@@ -154,14 +421,19 @@ class ReportingService:
         total_outstanding = Decimal("0")
         total_overdue = Decimal("0")
         
-        for invoice in invoices:
+        async for invoice in invoices:
             customer_id = invoice["customer"]["id"]
             customer_name = invoice["customer"]["name"]
             net_to_pay = Decimal(str(invoice.get("net_to_pay", 0)))
             
-            # Get payments
-            payments = await self.storage.get_payments(tenant_id, invoice["id"])
-            total_paid = sum(Decimal(str(p["amount"])) for p in payments)
+            # Use running total when maintained, otherwise scan payments
+            if invoice.get("amount_paid") is not None:
+                total_paid = Decimal(str(invoice["amount_paid"]))
+            else:
+                payments = await self.storage.get_payments(tenant_id, invoice["id"])
+                total_paid = sum(
+                    (Decimal(str(p["amount"])) for p in payments), Decimal("0")
+                )
             outstanding = net_to_pay - total_paid
             
             if customer_id not in customer_balances:
@@ -199,3 +471,20 @@ class ReportingService:
             by_customer=by_customer,
             generated_at=datetime.utcnow(),
         )
+
+
+def _native_bucket(bucket: Dict[str, Any]) -> Dict[str, Any]:
+    """Bucket read from a store with dates and amounts as native types."""
+    day = bucket["day"]
+    if isinstance(day, str):
+        day = date.fromisoformat(day[:10])
+    vat_rate = bucket["vat_rate"]
+    return {
+        "day": day,
+        "vat_rate": None if vat_rate is None else Decimal(str(vat_rate)),
+        "currency": bucket["currency"],
+        "invoices": int(bucket["invoices"]),
+        "taxable": Decimal(str(bucket["taxable"])),
+        "vat": Decimal(str(bucket["vat"])),
+        "gross": Decimal(str(bucket["gross"])),
+    }
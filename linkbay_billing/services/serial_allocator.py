@@ -0,0 +1,315 @@
+"""
+Gapless serial number allocation.
+
+Serializes allocation per (tenant, year, series) and exposes a two-phase
+reserve -> commit/rollback API so that a number is only consumed once
+the invoice carrying it has been stored.
+"""
+
+import asyncio
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+from ..exceptions import SerialNumberError
+from ..protocols import InvoiceStorage, SerialLockBackend, optional_method
+
+SerialKey = Tuple[str, int, Optional[str]]
+
+
+class SerialReservation:
+    """
+    Serial numbers held between reserve and commit/rollback.
+    
+    Covers the contiguous range [seq, seq + count - 1], unless serials
+    lists them explicitly (hi-lo blocks may not be contiguous).
+    """
+    
+    def __init__(
+        self,
+        tenant_id: str,
+        year: int,
+        series: Optional[str],
+        seq: int,
+        count: int = 1,
+        serials: Optional[List[int]] = None,
+    ):
+        self.tenant_id = tenant_id
+        self.year = year
+        self.series = series
+        self.seq = seq
+        self.count = count
+        self.serials = serials if serials is not None else list(range(seq, seq + count))
+        self.invoice_number: Optional[str] = None
+        self.invoice_numbers: List[str] = []
+        self.closed = False
+    
+    @property
+    def key(self) -> SerialKey:
+        """Allocation key."""
+        return (self.tenant_id, self.year, self.series)
+    
+    @property
+    def last_seq(self) -> int:
+        """Last serial of the reserved range."""
+        return self.seq + self.count - 1
+
+
+class SerialAllocator:
+    """
+    Concurrency-safe, gapless serial allocator.
+    
+    Allocation for a (tenant, year, series) key is serialized by an
+    in-process asyncio lock held from reserve until commit or rollback,
+    so a rolled back number is handed to the next caller and no gap is
+    left behind. For deployments with several processes, pick one of:
+    
+    - lock_backend: a cross-process lock (e.g. FileSerialLock, or a
+      Redis/database advisory lock) held alongside the in-process lock.
+      The last serial is re-read from storage under the lock.
+    - use_compare_and_set: claims numbers with the optional
+      storage.compare_and_set_serial primitive. Rollback reverts the
+      counter when nobody claimed a later number, otherwise the number
+      is reported via storage.release_serial_block as voided.
+    """
+    
+    def __init__(
+        self,
+        storage: InvoiceStorage,
+        lock_backend: Optional[SerialLockBackend] = None,
+        use_compare_and_set: bool = False,
+        max_cas_attempts: int = 20,
+    ):
+        """
+        Initialize serial allocator.
+        
+        Args:
+            storage: Invoice storage for reading/claiming serials
+            lock_backend: Optional cross-process lock backend
+            use_compare_and_set: Claim serials via storage CAS primitive
+            max_cas_attempts: CAS retries before giving up
+        """
+        if lock_backend is not None and use_compare_and_set:
+            raise ValueError("lock_backend and use_compare_and_set are exclusive")
+        
+        self.storage = storage
+        self.lock_backend = lock_backend
+        self.use_compare_and_set = use_compare_and_set
+        self.max_cas_attempts = max_cas_attempts
+        
+        self._locks: Dict[SerialKey, asyncio.Lock] = {}
+        # Highest serial committed by this process per key
+        self._last: Dict[SerialKey, int] = {}
+    
+    async def reserve(
+        self,
+        tenant_id: str,
+        year: int,
+        series: Optional[str] = None,
+        count: int = 1,
+    ) -> SerialReservation:
+        """
+        Reserve the next count serials for tenant/year/series.
+        
+        The key stays locked until commit or rollback is called: callers
+        must always close the reservation (try/except/finally).
+        
+        Returns:
+            Reservation covering the next contiguous serials
+        """
+        if count < 1:
+            raise ValueError("count must be a positive integer")
+        
+        key = (tenant_id, year, series)
+        lock = self._lock(key)
+        await lock.acquire()
+        
+        try:
+            if self.lock_backend is not None:
+                await self.lock_backend.acquire(_lock_name(key))
+                try:
+                    last = await self._read_last(key)
+                except BaseException:
+                    await self.lock_backend.release(_lock_name(key))
+                    raise
+            elif self.use_compare_and_set:
+                last = await self._claim(key, count)
+            else:
+                last = await self._read_last(key)
+        except BaseException:
+            lock.release()
+            raise
+        
+        return SerialReservation(tenant_id, year, series, last + 1, count)
+    
+    async def commit(
+        self,
+        reservation: SerialReservation,
+        count: Optional[int] = None,
+    ) -> None:
+        """
+        Mark reserved serials as used and release the key.
+        
+        With count, only the first count serials are used and the others
+        are given back as by rollback.
+        """
+        if reservation.closed:
+            return
+        if count is not None and count <= 0:
+            await self.rollback(reservation)
+            return
+        
+        tail = None
+        if count is not None and count < reservation.count:
+            tail = SerialReservation(
+                *reservation.key, reservation.seq + count, reservation.count - count
+            )
+            reservation.count = count
+            del reservation.serials[count:]
+        
+        key = reservation.key
+        self._last[key] = max(self._last.get(key, 0), reservation.last_seq)
+        try:
+            if tail is not None and self.use_compare_and_set:
+                await self._unclaim(tail)
+        finally:
+            await self._close(reservation)
+    
+    async def rollback(self, reservation: SerialReservation) -> None:
+        """Give reserved serials back and release the key."""
+        if reservation.closed:
+            return
+        
+        try:
+            if self.use_compare_and_set:
+                await self._unclaim(reservation)
+        finally:
+            await self._close(reservation)
+    
+    async def allocate(
+        self,
+        tenant_id: str,
+        year: int,
+        series: Optional[str] = None,
+        count: int = 1,
+    ) -> SerialReservation:
+        """Reserve and immediately commit serials (single-phase)."""
+        reservation = await self.reserve(tenant_id, year, series, count)
+        await self.commit(reservation)
+        return reservation
+    
+    async def _read_last(self, key: SerialKey) -> int:
+        """Get last used serial, including numbers not yet stored."""
+        last_serial = await self.storage.get_last_serial_number(*key)
+        return max(last_serial or 0, self._last.get(key, 0))
+    
+    async def _claim(self, key: SerialKey, count: int) -> int:
+        """Advance the storage counter by count via compare-and-set."""
+        compare_and_set = optional_method(self.storage, "compare_and_set_serial")
+        if compare_and_set is None:
+            raise SerialNumberError(
+                key[0], "storage does not implement compare_and_set_serial"
+            )
+        
+        for _ in range(self.max_cas_attempts):
+            last = await self.storage.get_last_serial_number(*key)
+            if await compare_and_set(*key, last, (last or 0) + count):
+                return last or 0
+        
+        raise SerialNumberError(
+            key[0],
+            f"could not claim serial after {self.max_cas_attempts} attempts",
+        )
+    
+    async def _unclaim(self, reservation: SerialReservation) -> None:
+        """Revert a CAS claim, or record the numbers as voided."""
+        compare_and_set = optional_method(self.storage, "compare_and_set_serial")
+        if compare_and_set is None:
+            raise SerialNumberError(
+                reservation.key[0], "storage does not implement compare_and_set_serial"
+            )
+        
+        reverted = await compare_and_set(
+            *reservation.key, reservation.last_seq, reservation.seq - 1
+        )
+        if reverted:
+            return
+        
+        # A later number was claimed meanwhile: the gap must be documented
+        release = optional_method(self.storage, "release_serial_block")
+        if release is not None:
+            await release(*reservation.key, reservation.seq, reservation.last_seq)
+    
+    async def _close(self, reservation: SerialReservation) -> None:
+        """Release locks held by reservation."""
+        reservation.closed = True
+        try:
+            if self.lock_backend is not None:
+                await self.lock_backend.release(_lock_name(reservation.key))
+        finally:
+            self._lock(reservation.key).release()
+    
+    def _lock(self, key: SerialKey) -> asyncio.Lock:
+        """Get in-process lock for key."""
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        return lock
+
+
+class FileSerialLock:
+    """
+    Cross-process serial lock based on POSIX advisory file locks.
+    
+    Suitable for several worker processes on one host sharing a
+    directory. Use a distributed lock for multi-host deployments.
+    """
+    
+    def __init__(self, directory: str):
+        """
+        Initialize file lock backend.
+        
+        Args:
+            directory: Directory holding one lock file per key
+        """
+        try:
+            import fcntl  # noqa: F401
+        except ImportError:
+            raise RuntimeError("FileSerialLock requires a POSIX platform") from None
+        
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self._handles: Dict[str, int] = {}
+    
+    async def acquire(self, key: str) -> None:
+        """Block until the lock file for key is exclusively locked."""
+        import fcntl
+        
+        path = os.path.join(self.directory, f"{key}.lock")
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, fcntl.flock, fd, fcntl.LOCK_EX)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._handles[key] = fd
+    
+    async def release(self, key: str) -> None:
+        """Unlock the lock file for key."""
+        import fcntl
+        
+        fd = self._handles.pop(key, None)
+        if fd is None:
+            return
+        try:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+
+def _lock_name(key: SerialKey) -> str:
+    """Build filesystem/lock-safe name for key."""
+    tenant_id, year, series = key
+    raw = f"{tenant_id}-{year}-{series or 'default'}"
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", raw)
@@ -2,11 +2,13 @@
 Serial number generation service.
 """
 
-from typing import Optional
+import asyncio
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
 from datetime import datetime
-from ..protocols import InvoiceStorage
+from ..protocols import InvoiceStorage, optional_method
 from ..constants import INVOICE_NUMBER_PATTERNS, DOCUMENT_TYPE_ABBR
 from ..exceptions import SerialNumberError
+from .serial_allocator import SerialAllocator, SerialKey, SerialReservation
 
 
 class SerialNumberGenerator:
@@ -14,13 +16,28 @@ class SerialNumberGenerator:
     Service for generating unique invoice numbers.
     
     Supports customizable patterns per tenant.
+    
+    With block_size set, the generator works in hi-lo mode: it claims
+    blocks of serials from storage via reserve_serial_block and hands
+    them out from memory, so numbering does not hit storage on every
+    invoice. Unused serials can be inspected with unused_serials and
+    must be returned with release_unused_serials (e.g. on shutdown or
+    at year end) to keep fiscal numbering accountable.
+    
+    Otherwise numbers come from a SerialAllocator, which serializes
+    allocation per tenant/year/series. Use reserve_number followed by
+    commit_number/rollback_number (reserve_numbers and commit_numbers
+    for a block) to keep numbering gapless when the invoice may fail to
+    be stored.
     """
     
     def __init__(
         self,
         storage: InvoiceStorage,
         pattern: str = "standard",
-        tenant_abbr_resolver: Optional[callable] = None,
+        tenant_abbr_resolver: Optional[Callable[[str], str]] = None,
+        block_size: Optional[int] = None,
+        allocator: Optional[SerialAllocator] = None,
     ):
         """
         Initialize serial number generator.
@@ -29,10 +46,22 @@ class SerialNumberGenerator:
             storage: Invoice storage for retrieving last serial
             pattern: Pattern key from INVOICE_NUMBER_PATTERNS
             tenant_abbr_resolver: Function to get tenant abbreviation
+            block_size: Serials claimed per storage reservation
+                (enables hi-lo mode)
+            allocator: Serial allocator (default: in-process allocator)
         """
+        if block_size is not None and block_size < 1:
+            raise ValueError("block_size must be a positive integer")
+        
         self.storage = storage
         self.pattern = INVOICE_NUMBER_PATTERNS.get(pattern, pattern)
         self.tenant_abbr_resolver = tenant_abbr_resolver
+        self.block_size = block_size
+        self.allocator = allocator or SerialAllocator(storage)
+        
+        # (tenant_id, year, series) -> [next serial, end of block (exclusive)]
+        self._blocks: Dict[SerialKey, List[int]] = {}
+        self._block_locks: Dict[SerialKey, asyncio.Lock] = {}
     
     async def generate_number(
         self,
@@ -65,16 +94,307 @@ class SerialNumberGenerator:
             # Result: "ACME-2025-000001"
             ```
         """
-        year = date.year
-        month = date.month
+        if self.block_size:
+            seq = (await self._take_serials(tenant_id, date.year, series, 1))[0]
+        else:
+            reservation = await self.allocator.allocate(tenant_id, date.year, series)
+            seq = reservation.seq
         
-        # Get last serial number for this tenant/year/series
-        last_serial = await self.storage.get_last_serial_number(
-            tenant_id, year, series
-        )
+        return self._format_number(tenant_id, invoice_type, date, seq, series)
+    
+    async def reserve_number(
+        self,
+        tenant_id: str,
+        invoice_type: str,
+        date: datetime,
+        series: Optional[str] = None,
+    ) -> SerialReservation:
+        """
+        Reserve the next invoice number (two-phase).
+        
+        The number is in reservation.invoice_number. Call commit_number
+        once the invoice is stored, or rollback_number if it is not; the
+        tenant/year/series sequence stays locked in between.
+        
+        Example:
+            ```python
+            reservation = await generator.reserve_number(
+                tenant_id="agency123",
+                invoice_type="invoice",
+                date=datetime.now(),
+            )
+            try:
+                await storage.create_invoice(...)
+            except Exception:
+                await generator.rollback_number(reservation)
+                raise
+            await generator.commit_number(reservation)
+            ```
+        """
+        if self.block_size:
+            seq = (await self._take_serials(tenant_id, date.year, series, 1))[0]
+            reservation = SerialReservation(tenant_id, date.year, series, seq)
+        else:
+            reservation = await self.allocator.reserve(tenant_id, date.year, series)
+        
+        try:
+            reservation.invoice_number = self._format_number(
+                tenant_id, invoice_type, date, reservation.seq, series
+            )
+        except SerialNumberError:
+            await self.rollback_number(reservation)
+            raise
+        
+        return reservation
+    
+    async def commit_number(self, reservation: SerialReservation) -> None:
+        """Confirm a reserved number as used."""
+        if self.block_size:
+            reservation.closed = True
+            return
+        
+        await self.allocator.commit(reservation)
+    
+    async def rollback_number(self, reservation: SerialReservation) -> None:
+        """
+        Return a reserved number.
+        
+        In hi-lo mode the number goes back to the in-memory block when no
+        later number was handed out; otherwise it is reported to
+        storage.release_serial_block as an unused serial.
+        """
+        if not self.block_size:
+            await self.allocator.rollback(reservation)
+            return
+        
+        if reservation.closed:
+            return
+        reservation.closed = True
+        await self._give_back(reservation.key, reservation.serials)
+    
+    async def reserve_numbers(
+        self,
+        tenant_id: str,
+        documents: Sequence[Tuple[str, datetime]],
+        series: Optional[str] = None,
+    ) -> SerialReservation:
+        """
+        Reserve a block of invoice numbers (two-phase generate_numbers).
+        
+        The numbers are in reservation.invoice_numbers, in document
+        order. Call commit_numbers with the count of documents stored;
+        the tenant/year/series sequence stays locked in between.
+        
+        Args:
+            tenant_id: Tenant identifier
+            documents: (invoice_type, date) pairs of the same year
+            series: Optional series identifier
+            
+        Returns:
+            Reservation covering one serial per document
+        """
+        years = {date.year for _, date in documents}
+        if len(years) != 1:
+            raise ValueError("documents must be non-empty and of the same year")
+        year = years.pop()
+        
+        if self.block_size:
+            serials = await self._take_serials(tenant_id, year, series, len(documents))
+            reservation = SerialReservation(
+                tenant_id, year, series, serials[0], len(serials), serials
+            )
+        else:
+            reservation = await self.allocator.reserve(
+                tenant_id, year, series, len(documents)
+            )
+        
+        try:
+            reservation.invoice_numbers = [
+                self._format_number(tenant_id, invoice_type, date, seq, series)
+                for (invoice_type, date), seq in zip(documents, reservation.serials)
+            ]
+        except SerialNumberError:
+            await self.commit_numbers(reservation, 0)
+            raise
+        
+        return reservation
+    
+    async def commit_numbers(self, reservation: SerialReservation, count: int) -> None:
+        """
+        Confirm the first count numbers of a reserve_numbers block.
+        
+        The following numbers are given back, so documents that failed
+        to be stored leave no gap when they come last.
+        """
+        if not self.block_size:
+            await self.allocator.commit(reservation, count)
+            return
+        
+        if reservation.closed:
+            return
+        reservation.closed = True
+        await self._give_back(reservation.key, reservation.serials[max(count, 0):])
+    
+    async def generate_numbers(
+        self,
+        tenant_id: str,
+        documents: Sequence[Tuple[str, datetime]],
+        series: Optional[str] = None,
+    ) -> List[str]:
+        """
+        Generate a contiguous block of invoice numbers.
+        
+        Allocates the serials of each year at once and assigns them to
+        the documents in the given order.
+        
+        Args:
+            tenant_id: Tenant identifier
+            documents: (invoice_type, date) pairs to number
+            series: Optional series identifier
+            
+        Returns:
+            Invoice numbers, one per document
+        """
+        # Count documents per year so each year is allocated at once
+        counts: Dict[int, int] = {}
+        for _, date in documents:
+            counts[date.year] = counts.get(date.year, 0) + 1
+        
+        serials: Dict[int, Iterator[int]] = {}
+        for year, count in counts.items():
+            if self.block_size:
+                allocated = await self._take_serials(tenant_id, year, series, count)
+            else:
+                reservation = await self.allocator.allocate(
+                    tenant_id, year, series, count
+                )
+                allocated = list(range(reservation.seq, reservation.last_seq + 1))
+            serials[year] = iter(allocated)
+        
+        return [
+            self._format_number(
+                tenant_id, invoice_type, date, next(serials[date.year]), series
+            )
+            for invoice_type, date in documents
+        ]
+    
+    def unused_serials(self) -> Dict[SerialKey, Tuple[int, int]]:
+        """
+        Get reserved serials not yet handed out.
+        
+        Returns:
+            Inclusive (start, end) range per (tenant_id, year, series)
+        """
+        return {
+            key: (block[0], block[1] - 1)
+            for key, block in self._blocks.items()
+            if block[0] < block[1]
+        }
+    
+    async def release_unused_serials(
+        self,
+        tenant_id: Optional[str] = None,
+    ) -> Dict[SerialKey, Tuple[int, int]]:
+        """
+        Give back reserved serials that were never used.
         
-        next_serial = (last_serial or 0) + 1
+        Each leftover range is reported to storage.release_serial_block
+        (when implemented) and dropped from memory.
         
+        Args:
+            tenant_id: Only release blocks of this tenant (default: all)
+            
+        Returns:
+            Released inclusive (start, end) ranges
+        """
+        released = {}
+        release = optional_method(self.storage, "release_serial_block")
+        
+        for key, (start, end) in self.unused_serials().items():
+            if tenant_id is not None and key[0] != tenant_id:
+                continue
+            
+            async with self._block_lock(key):
+                block = self._blocks.pop(key, None)
+                if not block or block[0] >= block[1]:
+                    continue
+                start, end = block[0], block[1] - 1
+                if release is not None:
+                    await release(key[0], key[1], key[2], start, end)
+                released[key] = (start, end)
+        
+        return released
+    
+    async def _take_serials(
+        self,
+        tenant_id: str,
+        year: int,
+        series: Optional[str],
+        count: int,
+    ) -> List[int]:
+        """Hand out count serials from memory, claiming blocks as needed."""
+        key = (tenant_id, year, series)
+        
+        async with self._block_lock(key):
+            block = self._blocks.get(key)
+            taken: List[int] = []
+            
+            if block and block[0] < block[1]:
+                available = min(count, block[1] - block[0])
+                taken.extend(range(block[0], block[0] + available))
+                block[0] += available
+            
+            missing = count - len(taken)
+            if missing:
+                reserve = optional_method(self.storage, "reserve_serial_block")
+                if reserve is None:
+                    raise SerialNumberError(
+                        tenant_id,
+                        "storage does not implement reserve_serial_block",
+                    )
+                
+                size = max(self.block_size or 1, missing)
+                first = await reserve(tenant_id, year, series, size)
+                taken.extend(range(first, first + missing))
+                self._blocks[key] = [first + missing, first + size]
+            
+            return taken
+    
+    async def _give_back(self, key: SerialKey, serials: List[int]) -> None:
+        """
+        Return unused hi-lo serials.
+        
+        Serials at the head of the in-memory block go back to it; the
+        others are reported to storage.release_serial_block.
+        """
+        serials = list(serials)
+        async with self._block_lock(key):
+            block = self._blocks.get(key)
+            while serials and block and block[0] == serials[-1] + 1:
+                block[0] = serials.pop()
+        
+        release = optional_method(self.storage, "release_serial_block")
+        if release is None:
+            return
+        for start, end in _ranges(serials):
+            await release(*key, start, end)
+    
+    def _block_lock(self, key: SerialKey) -> asyncio.Lock:
+        """Get lock guarding the in-memory block for key."""
+        lock = self._block_locks.get(key)
+        if lock is None:
+            lock = self._block_locks[key] = asyncio.Lock()
+        return lock
+    
+    def _format_number(
+        self,
+        tenant_id: str,
+        invoice_type: str,
+        date: datetime,
+        seq: int,
+        series: Optional[str] = None,
+    ) -> str:
+        """Render invoice number from pattern."""
         # Get tenant abbreviation
         tenant_abbr = "TENANT"
         if self.tenant_abbr_resolver:
@@ -88,9 +408,9 @@ class SerialNumberGenerator:
             invoice_number = self.pattern.format(
                 tenant_abbr=tenant_abbr,
                 type_abbr=type_abbr,
-                year=year,
-                month=month,
-                seq=next_serial,
+                year=date.year,
+                month=date.month,
+                seq=seq,
                 series=series or "",
             )
         except KeyError as e:
@@ -111,3 +431,14 @@ class SerialNumberGenerator:
             tenant_id, invoice_number
         )
         return existing is None
+
+
+def _ranges(serials: List[int]) -> List[Tuple[int, int]]:
+    """Split sorted serials into inclusive (start, end) runs."""
+    ranges: List[Tuple[int, int]] = []
+    for seq in serials:
+        if ranges and ranges[-1][1] + 1 == seq:
+            ranges[-1] = (ranges[-1][0], seq)
+        else:
+            ranges.append((seq, seq))
+    return ranges
@@ -0,0 +1,153 @@
+"""
+In-process cache of tax calculation results.
+"""
+
+import sys
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from ..schemas import InvoiceRow, RetentionInfo, TaxCalculationResult
+
+TaxCacheKey = Tuple[Any, ...]
+
+
+class TaxResultCache:
+    """
+    Bounded LRU cache of VATCalculator results.
+    
+    Keyed by the tax-relevant content of a calculation (see
+    tax_cache_key), so invoices with the same rows, rates and options
+    share one result. Results are copied when stored and when returned,
+    so callers may modify them without affecting other invoices.
+    """
+    
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        max_bytes: int = 32 * 1024 * 1024,
+    ):
+        """
+        Initialize tax result cache.
+        
+        Args:
+            max_entries: Maximum cached results (0 disables caching)
+            max_bytes: Approximate memory cap of cached results
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size_bytes = 0
+        self._entries: OrderedDict[TaxCacheKey, Tuple[int, TaxCalculationResult]] = (
+            OrderedDict()
+        )
+    
+    def get(self, key: TaxCacheKey) -> Optional[TaxCalculationResult]:
+        """Get a copy of the cached result, None on miss."""
+        entry = self._entries.get(key)
+        
+        if entry is None:
+            self.misses += 1
+            return None
+        
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return copy_tax_result(entry[1])
+    
+    def set(self, key: TaxCacheKey, result: TaxCalculationResult) -> None:
+        """Store result, evicting least recently used entries."""
+        if self.max_entries <= 0:
+            return
+        
+        size = _approximate_size(result) + sys.getsizeof(key)
+        size += sum(sys.getsizeof(part) for part in key)
+        if size > self.max_bytes:
+            return
+        
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size_bytes -= previous[0]
+        self._entries[key] = (size, copy_tax_result(result))
+        self.size_bytes += size
+        
+        while len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes:
+            _, (evicted_size, _) = self._entries.popitem(last=False)
+            self.size_bytes -= evicted_size
+            self.evictions += 1
+    
+    def clear(self) -> None:
+        """Drop all entries."""
+        self._entries.clear()
+        self.size_bytes = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and memory usage."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self.size_bytes,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+    
+    def __len__(self) -> int:
+        """Number of cached results."""
+        return len(self._entries)
+
+
+def tax_cache_key(
+    rows: Iterable[InvoiceRow],
+    retention: Optional[RetentionInfo],
+    social_security_rate: Optional[Decimal],
+    stamp_duty: bool,
+    split_payment: bool,
+    minor_units: int,
+) -> TaxCacheKey:
+    """
+    Canonical key of the inputs of a tax calculation.
+    
+    Only fields affecting the result are included (descriptions, units
+    and product codes are not). Values echoed in the result (VAT rate,
+    retention amount) are taken as strings, since "22" and "22.0" are
+    equal but displayed differently; the others compare by value. The
+    key is a tuple, so equal hashes never mix up different inputs.
+    """
+    return (
+        minor_units,
+        bool(stamp_duty),
+        bool(split_payment),
+        social_security_rate,
+        str(retention.amount) if retention else None,
+        *(
+            (row.quantity, row.unit_price, row.discount_percent, str(row.vat_rate))
+            for row in rows
+        ),
+    )
+
+
+def copy_tax_result(result: TaxCalculationResult) -> TaxCalculationResult:
+    """
+    Copy a result and its VAT summaries.
+    
+    Amounts are Decimals, which are immutable, so this is enough to
+    isolate copies and cheaper than model_copy(deep=True).
+    """
+    return result.model_copy(
+        update={
+            "vat_summaries": [summary.model_copy() for summary in result.vat_summaries],
+        }
+    )
+
+
+def _approximate_size(result: TaxCalculationResult) -> int:
+    """Estimate memory held by a result and its VAT summaries."""
+    size = sys.getsizeof(result) + sys.getsizeof(result.__dict__)
+    size += sum(sys.getsizeof(value) for value in result.__dict__.values())
+    for summary in result.vat_summaries:
+        size += sys.getsizeof(summary) + sys.getsizeof(summary.__dict__)
+        size += sum(sys.getsizeof(value) for value in summary.__dict__.values())
+    return size
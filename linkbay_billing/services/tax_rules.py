@@ -0,0 +1,253 @@
+"""
+Per-country VAT rule tables.
+
+Rules (DEFAULT_VAT_RATES format) are compiled once into immutable
+lookup structures: validating or classifying a row is a dict lookup,
+plus a bisect over effective-date ranges for countries with several.
+"""
+
+from bisect import bisect_right
+from datetime import date
+from decimal import Decimal
+from types import MappingProxyType
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from ..constants import DEFAULT_VAT_RATES
+from ..exceptions import TaxCalculationError
+from ..schemas import InvoiceRow
+
+
+class TaxPeriod(NamedTuple):
+    """Rates of a country in force over a date range (bounds inclusive)."""
+    
+    valid_from: Optional[date]
+    valid_to: Optional[date]
+    categories: Mapping[Decimal, str]  # Rate -> "standard", "reduced", "zero"
+    exempt_natures: FrozenSet[str]
+
+
+class TaxRuleSet:
+    """
+    Compiled, immutable VAT rules by country.
+    
+    rules maps an ISO country code to a rate table, or to a list of
+    tables with "valid_from"/"valid_to" dates:
+        
+        {"IT": {"standard": 22, "reduced": [10, 5, 4], "exempt": ["N1"]}}
+        
+    A zero rate (exempt, non-taxable, reverse charge) is always valid.
+    Countries without a table are not checked.
+    """
+    
+    def __init__(self, rules: Mapping[str, Any] = DEFAULT_VAT_RATES):
+        """
+        Compile rules.
+        
+        Raises:
+            ValueError: If a table is malformed or periods overlap
+        """
+        compiled: Dict[str, Tuple[Tuple[date, ...], Tuple[TaxPeriod, ...]]] = {}
+        for country, tables in rules.items():
+            if isinstance(tables, Mapping):
+                tables = [tables]
+            periods = sorted(
+                (_compile_period(country, table) for table in tables),
+                key=lambda period: period.valid_from or date.min,
+            )
+            for previous, period in zip(periods, periods[1:]):
+                if previous.valid_to is None or previous.valid_to >= (
+                    period.valid_from or date.min
+                ):
+                    raise ValueError(f"Overlapping VAT rate periods for {country}")
+            if len(periods) == 1 and periods[0][:2] == (None, None):
+                # Always in force: no date lookup
+                compiled[country] = ((), tuple(periods))
+            else:
+                compiled[country] = (
+                    tuple(period.valid_from or date.min for period in periods),
+                    tuple(periods),
+                )
+        self._countries: Mapping[str, Tuple[Tuple[date, ...], Tuple[TaxPeriod, ...]]] = (
+            MappingProxyType(compiled)
+        )
+    
+    @property
+    def countries(self) -> FrozenSet[str]:
+        """Countries with a rate table."""
+        return frozenset(self._countries)
+    
+    def __contains__(self, country: object) -> bool:
+        """Check whether country has a rate table."""
+        return country in self._countries
+    
+    def period(self, country: str, on: Optional[date] = None) -> Optional[TaxPeriod]:
+        """
+        Get rates of country in force on a date (default: today).
+        
+        Returns:
+            Rate table, None if the country has no table for that date
+        """
+        entry = self._countries.get(country)
+        if entry is None:
+            return None
+        
+        starts, periods = entry
+        if not starts:
+            return periods[0]
+        
+        on = on or date.today()
+        index = bisect_right(starts, on) - 1
+        if index < 0:
+            return None
+        period = periods[index]
+        if period.valid_to is not None and on > period.valid_to:
+            return None
+        return period
+    
+    def classify(
+        self,
+        country: str,
+        rate: Decimal,
+        on: Optional[date] = None,
+    ) -> Optional[str]:
+        """
+        Get category of a VAT rate ("standard", "reduced", "zero").
+        
+        Returns:
+            Category, None if the rate is not in force in country
+        """
+        period = self.period(country, on)
+        if period is None:
+            return None
+        category = period.categories.get(rate)
+        if category is None and rate == 0:
+            return "zero"
+        return category
+    
+    def is_valid_nature(
+        self,
+        country: str,
+        nature: str,
+        on: Optional[date] = None,
+    ) -> bool:
+        """Check exemption nature code of a zero-rated row."""
+        period = self.period(country, on)
+        return period is not None and nature in period.exempt_natures
+    
+    def check_rows(
+        self,
+        country: Optional[str],
+        rows: Iterable[InvoiceRow],
+        on: Optional[date] = None,
+    ) -> List[Optional[str]]:
+        """
+        Validate and classify rows against the rates of country.
+        
+        Returns:
+            Category of each row (all None for countries without table)
+            
+        Raises:
+            TaxCalculationError: If a rate or nature code is not valid
+        """
+        rows = list(rows)
+        if not country or country not in self._countries:
+            return [None] * len(rows)
+        
+        period = self.period(country, on)
+        if period is None:
+            raise TaxCalculationError(f"no VAT rates in force for {country} on {on}")
+        
+        categories = period.categories
+        result: List[Optional[str]] = []
+        for index, row in enumerate(rows):
+            category = categories.get(row.vat_rate)
+            if category is None:
+                if row.vat_rate != 0:
+                    raise TaxCalculationError(
+                        f"row {index}: VAT rate {row.vat_rate}% is not valid in {country}"
+                    )
+                category = "zero"
+            
+            nature = row.vat_nature
+            exempt_natures = period.exempt_natures
+            if nature is not None and exempt_natures and nature not in exempt_natures:
+                raise TaxCalculationError(
+                    f"row {index}: unknown VAT exemption nature {nature} for {country}"
+                )
+            result.append(category)
+        return result
+
+
+class TaxRuleEngine:
+    """
+    Holder of the active TaxRuleSet, reloadable at runtime.
+    
+    reload compiles the new rules before swapping a single reference, so
+    calculations never wait for it: those already running keep the rule
+    set they started with (read current once per calculation).
+    """
+    
+    def __init__(self, rules: Optional[Mapping[str, Any]] = None):
+        """
+        Initialize engine.
+        
+        Args:
+            rules: Rate tables by country (default: DEFAULT_VAT_RATES)
+        """
+        self.current: TaxRuleSet = (
+            DEFAULT_TAX_RULES if rules is None else TaxRuleSet(rules)
+        )
+    
+    def reload(self, rules: Mapping[str, Any]) -> TaxRuleSet:
+        """
+        Compile and activate a new rule set.
+        
+        Raises:
+            ValueError: If rules are malformed (active set is kept)
+        """
+        rule_set = TaxRuleSet(rules)
+        self.current = rule_set
+        return rule_set
+
+
+def _compile_period(country: str, table: Mapping[str, Any]) -> TaxPeriod:
+    """Compile one rate table."""
+    if "standard" not in table:
+        raise ValueError(f"VAT rate table for {country} has no standard rate")
+    
+    categories: Dict[Decimal, str] = {}
+    for value in table.get("reduced", []):
+        rate = _rate(value)
+        categories[rate] = "zero" if rate == 0 else "reduced"
+    categories[_rate(table["standard"])] = "standard"
+    
+    valid_from = table.get("valid_from")
+    valid_to = table.get("valid_to")
+    if valid_from and valid_to and valid_from > valid_to:
+        raise ValueError(f"VAT rate period for {country} ends before it starts")
+    
+    return TaxPeriod(
+        valid_from=valid_from,
+        valid_to=valid_to,
+        categories=MappingProxyType(categories),
+        exempt_natures=frozenset(table.get("exempt", [])),
+    )
+
+
+def _rate(value: Any) -> Decimal:
+    """Convert table rate (int, float, str) to Decimal."""
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+# Compiled once at import
+DEFAULT_TAX_RULES = TaxRuleSet(DEFAULT_VAT_RATES)
@@ -0,0 +1,192 @@
+"""
+Materialised daily VAT aggregates.
+
+InvoiceManager adds the amounts of every invoice to buckets keyed by
+(tenant, day, vat_rate, currency) when it is created and subtracts them
+when it is canceled, so VAT reports read days x rates buckets instead
+of every invoice of the period. Credit notes add negative amounts.
+"""
+
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..constants import InvoiceType
+
+# (day, vat_rate, currency); vat_rate None holds invoice totals
+BucketKey = Tuple[date, Optional[Decimal], Optional[str]]
+
+_AMOUNTS = ("taxable", "vat", "gross")
+
+
+def invoice_rate_totals(invoice: Dict[str, Any]) -> Dict[Decimal, Dict[str, Decimal]]:
+    """
+    Output VAT of a stored invoice by VAT rate, as issued.
+    
+    Amounts come from the stored vat_summaries, so they are those of
+    the invoice totals; invoices stored without them are recalculated
+    from their rows. VAT the seller does not charge counts as zero:
+    split payment (already zero in the summaries) and reverse charge
+    (due by the buyer). Credit notes are positive here, see
+    invoice_vat_buckets for the sign.
+    
+    Returns:
+        Dict vat_rate -> {"taxable": Decimal, "vat": Decimal}
+    """
+    charged = not invoice.get("reverse_charge")
+    split_payment = invoice.get("split_payment")
+    totals: Dict[Decimal, Dict[str, Decimal]] = {}
+    
+    summaries = invoice.get("vat_summaries")
+    if summaries is not None:
+        for summary in summaries:
+            rate = Decimal(str(summary["vat_rate"]))
+            amounts = totals.setdefault(rate, _zero_amounts())
+            amounts["taxable"] += Decimal(str(summary["taxable_amount"]))
+            if charged:
+                amounts["vat"] += Decimal(str(summary["vat_amount"]))
+        return totals
+    
+    # Stored before VAT summaries were persisted
+    for row in invoice.get("rows", []):
+        rate = Decimal(str(row.get("vat_rate", 0)))
+        if "subtotal" in row:
+            # Computed and stored with the row
+            row_subtotal = Decimal(str(row["subtotal"]))
+        else:
+            row_subtotal = Decimal(str(row.get("quantity", 1))) * Decimal(
+                str(row.get("unit_price", 0))
+            )
+        
+        amounts = totals.setdefault(rate, _zero_amounts())
+        amounts["taxable"] += row_subtotal
+        if charged and not (split_payment and rate > 0):
+            amounts["vat"] += (row_subtotal * rate / 100).quantize(Decimal("0.01"))
+    return totals
+
+
+def invoice_vat_buckets(invoice: Dict[str, Any], sign: int = 1) -> List[Dict[str, Any]]:
+    """
+    Bucket deltas of a stored invoice (sign -1 to remove it).
+    
+    Amounts of credit notes are subtracted; they still count as one
+    document. Reverse-charge VAT is left out of the totals like in
+    invoice_rate_totals, and out of the gross amount.
+    
+    Returns:
+        One invoice totals bucket (vat_rate None) and one bucket per rate
+    """
+    day = invoice["issue_date"]
+    if isinstance(day, str):
+        day = date.fromisoformat(day[:10])
+    currency = invoice.get("currency")
+    
+    direction = sign
+    if invoice.get("invoice_type") == InvoiceType.CREDIT_NOTE.value:
+        direction = -sign
+    
+    vat = Decimal(str(invoice.get("total_vat", 0)))
+    gross = Decimal(str(invoice.get("total", 0)))
+    if invoice.get("reverse_charge"):
+        gross -= vat
+        vat = Decimal("0")
+    
+    buckets = [
+        {
+            "day": day,
+            "vat_rate": None,
+            "currency": currency,
+            "invoices": sign,
+            "taxable": direction * Decimal(str(invoice.get("subtotal", 0))),
+            "vat": direction * vat,
+            "gross": direction * gross,
+        },
+    ]
+    for rate, amounts in invoice_rate_totals(invoice).items():
+        buckets.append({
+            "day": day,
+            "vat_rate": rate,
+            "currency": currency,
+            "invoices": sign,
+            "taxable": direction * amounts["taxable"],
+            "vat": direction * amounts["vat"],
+            "gross": Decimal("0"),
+        })
+    return buckets
+
+
+def _zero_amounts() -> Dict[str, Decimal]:
+    """Empty taxable and VAT amounts of one rate."""
+    return {"taxable": Decimal("0"), "vat": Decimal("0")}
+
+
+def merge_vat_buckets(
+    target: Dict[BucketKey, Dict[str, Any]],
+    buckets: Iterable[Dict[str, Any]],
+) -> None:
+    """Add buckets into target, dropping those that become empty."""
+    for bucket in buckets:
+        key = (bucket["day"], bucket["vat_rate"], bucket["currency"])
+        current = target.get(key)
+        if current is None:
+            target[key] = dict(bucket)
+            continue
+        
+        current["invoices"] += bucket["invoices"]
+        for name in _AMOUNTS:
+            current[name] += bucket[name]
+        if not current["invoices"] and not any(current[name] for name in _AMOUNTS):
+            del target[key]
+
+
+class InMemoryVATAggregateStore:
+    """
+    In-process VAT aggregate store.
+    
+    Suitable for tests and single-process deployments: aggregates are
+    lost when the process exits and must be rebuilt
+    (ReportingService.rebuild_vat_aggregates).
+    """
+    
+    def __init__(self) -> None:
+        """Initialize empty store."""
+        # Tenant -> day -> (vat_rate, currency) -> bucket
+        self._days: Dict[str, Dict[date, Dict[BucketKey, Dict[str, Any]]]] = {}
+    
+    async def add_vat_buckets(
+        self,
+        tenant_id: str,
+        buckets: List[Dict[str, Any]],
+    ) -> None:
+        """Add invoices and amounts of buckets, creating missing ones."""
+        days = self._days.setdefault(tenant_id, {})
+        for bucket in buckets:
+            day = days.setdefault(bucket["day"], {})
+            merge_vat_buckets(day, [bucket])
+            if not day:
+                del days[bucket["day"]]
+    
+    async def get_vat_buckets(
+        self,
+        tenant_id: str,
+        start: date,
+        end: date,
+    ) -> List[Dict[str, Any]]:
+        """Get buckets with day between start and end (inclusive)."""
+        days = self._days.get(tenant_id, {})
+        return [
+            dict(bucket)
+            for day in sorted(day for day in days if start <= day <= end)
+            for bucket in days[day].values()
+        ]
+    
+    async def clear_vat_buckets(
+        self,
+        tenant_id: str,
+        start: date,
+        end: date,
+    ) -> None:
+        """Delete buckets with day between start and end (inclusive)."""
+        days = self._days.get(tenant_id, {})
+        for day in [day for day in days if start <= day <= end]:
+            del days[day]
@@ -2,10 +2,37 @@
 VAT and tax calculation service.
 """
 
-from typing import List, Optional
+from typing import Dict, List, Optional, Sequence, Tuple
+from datetime import date
 from decimal import Decimal
-from ..schemas import InvoiceRow, RetentionInfo, VATSummary, TaxCalculationResult
-from ..constants import STAMP_DUTY_THRESHOLD_IT, STAMP_DUTY_AMOUNT_IT
+from ..schemas import (
+    InvoiceRow,
+    InvoiceCreate,
+    RetentionInfo,
+    VATSummary,
+    TaxCalculationResult,
+)
+from ..constants import (
+    STAMP_DUTY_THRESHOLD_IT,
+    STAMP_DUTY_AMOUNT_IT,
+    CURRENCY_MINOR_UNITS,
+    CalculationEngine,
+)
+from .tax_cache import TaxCacheKey, TaxResultCache, copy_tax_result, tax_cache_key
+from .tax_rules import TaxRuleEngine, DEFAULT_TAX_RULES
+
+try:
+    import numpy as np
+except ImportError:  # Optional: pip install linkbay-billing[numpy]
+    np = None  # type: ignore[assignment]
+
+CENT = Decimal("0.01")
+
+# Bound keeping int64 products and sums clear of overflow
+_INT64_SAFE = 2 ** 62
+
+# First element of calculate_many cache keys
+_MANY_CACHE_TAG = "calculate_many"
 
 
 class VATCalculator:
@@ -20,8 +47,33 @@ class VATCalculator:
     - Stamp duty
     - Split payment
     - Reverse charge
+    
+    Amounts are rounded half-even (the default Decimal context) to the
+    currency's minor unit. The integer engine computes the same results
+    with scaled integers (minor units) instead of repeated Decimal
+    quantize calls, which is faster for bulk runs.
     """
     
+    def __init__(
+        self,
+        engine: str = CalculationEngine.DECIMAL.value,
+        cache: Optional[TaxResultCache] = None,
+        rules: Optional[TaxRuleEngine] = None,
+    ):
+        """
+        Initialize calculator.
+        
+        Args:
+            engine: Arithmetic engine, "decimal" or "integer"
+            cache: Reuse results of calculations with identical
+                tax-relevant inputs
+            rules: Country rate tables rows are checked against when
+                calculate is given a country
+        """
+        self.engine = CalculationEngine(engine).value
+        self.cache = cache
+        self.rules = rules
+    
     def calculate(
         self,
         rows: List[InvoiceRow],
@@ -29,6 +81,9 @@ class VATCalculator:
         social_security_rate: Optional[Decimal] = None,
         stamp_duty: bool = False,
         split_payment: bool = False,
+        currency: Optional[str] = None,
+        country: Optional[str] = None,
+        on: Optional[date] = None,
     ) -> TaxCalculationResult:
         """
         Calculate all taxes for invoice.
@@ -39,10 +94,16 @@ class VATCalculator:
             social_security_rate: Social security rate percentage
             stamp_duty: Apply stamp duty (Italy)
             split_payment: Split payment mode (Italy)
+            currency: Round to this currency's minor unit (default: cents)
+            country: Check row rates against this country's rules
+            on: Date selecting the rates in force (default: today)
             
         Returns:
             Complete tax calculation result
             
+        Raises:
+            TaxCalculationError: If a rate is not valid in country
+            
         Example:
             ```python
             calculator = VATCalculator()
@@ -69,12 +130,84 @@ class VATCalculator:
             )
             ```
         """
+        self.check_rates(rows, country, on)
+        
+        minor_units = _minor_units(currency)
+        if self.cache is None:
+            return self._calculate(
+                rows,
+                retention,
+                social_security_rate,
+                stamp_duty,
+                split_payment,
+                minor_units,
+            )
+        
+        key = tax_cache_key(
+            rows, retention, social_security_rate, stamp_duty, split_payment, minor_units
+        )
+        result = self.cache.get(key)
+        if result is None:
+            result = self._calculate(
+                rows,
+                retention,
+                social_security_rate,
+                stamp_duty,
+                split_payment,
+                minor_units,
+            )
+            self.cache.set(key, result)
+        return result
+    
+    def check_rates(
+        self,
+        rows: List[InvoiceRow],
+        country: Optional[str],
+        on: Optional[date] = None,
+    ) -> None:
+        """
+        Check row rates against the rules of country (no-op without rules).
+        
+        Raises:
+            TaxCalculationError: If a rate is not valid in country
+        """
+        if self.rules is not None and country:
+            self.rules.current.check_rows(country, rows, on)
+    
+    def _calculate(
+        self,
+        rows: List[InvoiceRow],
+        retention: Optional[RetentionInfo],
+        social_security_rate: Optional[Decimal],
+        stamp_duty: bool,
+        split_payment: bool,
+        minor_units: int,
+    ) -> TaxCalculationResult:
+        """Run calculate with the configured engine."""
+        if self.engine == CalculationEngine.INTEGER.value:
+            return self._calculate_integer(
+                rows,
+                retention,
+                social_security_rate,
+                stamp_duty,
+                split_payment,
+                minor_units,
+            )
+        
+        quantum = Decimal(1).scaleb(-minor_units)
+        
         # Calculate subtotal and group by VAT rate
         subtotal = Decimal("0")
         vat_groups = {}
         
         for row in rows:
-            row_subtotal = row.calculate_subtotal()
+            if quantum == CENT:
+                row_subtotal = row.calculate_subtotal()
+            else:
+                row_subtotal = row.quantity * row.unit_price
+                if row.discount_percent > 0:
+                    row_subtotal = row_subtotal * (1 - row.discount_percent / 100)
+                row_subtotal = row_subtotal.quantize(quantum)
             subtotal += row_subtotal
             
             vat_rate = row.vat_rate
@@ -87,7 +220,7 @@ class VATCalculator:
         if social_security_rate:
             social_security_amount = (
                 subtotal * social_security_rate / 100
-            ).quantize(Decimal("0.01"))
+            ).quantize(quantum)
             subtotal += social_security_amount
         
         # Calculate VAT summaries
@@ -99,7 +232,7 @@ class VATCalculator:
                 # Split payment: VAT calculated but not charged
                 vat_amount = Decimal("0")
             else:
-                vat_amount = (taxable * rate / 100).quantize(Decimal("0.01"))
+                vat_amount = (taxable * rate / 100).quantize(quantum)
             
             total_vat += vat_amount
             vat_summaries.append(
@@ -110,13 +243,294 @@ class VATCalculator:
                 )
             )
         
+        return self._finish(
+            subtotal,
+            vat_summaries,
+            total_vat,
+            social_security_amount,
+            retention,
+            stamp_duty,
+        )
+    
+    def calculate_many(
+        self,
+        invoices: Sequence[InvoiceCreate],
+        check_rates: bool = True,
+    ) -> List[TaxCalculationResult]:
+        """
+        Calculate taxes for many invoices in one pass.
+        
+        Rows of all invoices are flattened into columns of exact integer
+        ratios; row subtotals, per-invoice subtotals and taxable amounts
+        per (invoice, VAT rate) are then computed in minor units with
+        vectorised segment sums. Uses NumPy when installed (extra
+        "numpy") and values fit in int64, plain Python otherwise. Each
+        invoice is rounded to its own currency and checked against the
+        rates of its company's country on its issue date, so results
+        equal calculate() as called by InvoiceManager.create_invoice.
+        
+        Args:
+            invoices: Invoice inputs (InvoiceCreate, or any object with
+                the same tax fields, currency, issue_date and company)
+            check_rates: Check rows against the country rate tables
+                (False when the caller already checked each invoice)
+                
+        Returns:
+            One result per invoice, in input order
+            
+        Raises:
+            TaxCalculationError: If a rate is not valid in the country of
+                an invoice
+        """
+        invoices = list(invoices)
+        if check_rates:
+            for invoice in invoices:
+                self.check_rates(
+                    invoice.rows, invoice.company.address.country, invoice.issue_date
+                )
+        
+        # One columnar pass per minor unit
+        groups: Dict[int, List[int]] = {}
+        for index, invoice in enumerate(invoices):
+            groups.setdefault(_minor_units(invoice.currency), []).append(index)
+        
+        results: Dict[int, TaxCalculationResult] = {}
+        for minor_units, indices in groups.items():
+            group = [invoices[index] for index in indices]
+            results.update(zip(indices, self._calculate_cached(group, minor_units)))
+        return [results[index] for index in range(len(invoices))]
+    
+    def _calculate_cached(
+        self,
+        invoices: List[InvoiceCreate],
+        minor_units: int,
+    ) -> List[TaxCalculationResult]:
+        """Run _calculate_many through the result cache."""
+        if self.cache is None:
+            return self._calculate_many(invoices, minor_units)
+        
+        # Look up every invoice; identical misses are calculated once.
+        # Keys are tagged, so they never share entries with calculate()
+        keys = [
+            (
+                _MANY_CACHE_TAG,
+                *tax_cache_key(
+                    invoice.rows,
+                    invoice.retention,
+                    invoice.social_security_rate,
+                    invoice.stamp_duty,
+                    invoice.split_payment,
+                    minor_units,
+                ),
+            )
+            for invoice in invoices
+        ]
+        cached = [self.cache.get(key) for key in keys]
+        missing: Dict[TaxCacheKey, int] = {}
+        for index, (key, result) in enumerate(zip(keys, cached)):
+            if result is None and key not in missing:
+                missing[key] = index
+        
+        calculated = dict(
+            zip(
+                missing,
+                self._calculate_many(
+                    [invoices[index] for index in missing.values()], minor_units
+                ),
+            )
+        )
+        for key, result in calculated.items():
+            self.cache.set(key, result)
+        
+        # Invoices with the same key get their own copy
+        results = []
+        for index, (key, result) in enumerate(zip(keys, cached)):
+            if result is None:
+                result = calculated[key]
+                if missing[key] != index:
+                    result = copy_tax_result(result)
+            results.append(result)
+        return results
+    
+    def _calculate_many(
+        self,
+        invoices: List[InvoiceCreate],
+        minor_units: int,
+    ) -> List[TaxCalculationResult]:
+        """Columnar calculation behind calculate_many."""
+        scale = 10 ** minor_units
+        
+        # Flatten rows into columns; groups are (invoice, VAT rate) pairs
+        # numbered in order of first appearance, as in calculate()
+        rows: List[InvoiceRow] = []
+        row_invoice: List[int] = []
+        row_group: List[int] = []
+        group_invoice: List[int] = []
+        group_rate: List[Decimal] = []
+        
+        for index, invoice in enumerate(invoices):
+            groups: Dict[Decimal, int] = {}
+            for row in invoice.rows:
+                group = groups.get(row.vat_rate)
+                if group is None:
+                    group = groups[row.vat_rate] = len(group_rate)
+                    group_invoice.append(index)
+                    group_rate.append(row.vat_rate)
+                rows.append(row)
+                row_invoice.append(index)
+                row_group.append(group)
+        
+        columns = _ratio_columns(rows)
+        reduced = None
+        if np is not None and rows:
+            reduced = _reduce_numpy(
+                columns, row_invoice, row_group, len(invoices), len(group_rate), scale
+            )
+        if reduced is None:
+            reduced = _reduce_python(
+                columns, row_invoice, row_group, len(invoices), len(group_rate), scale
+            )
+        subtotals, taxables = reduced
+        
+        # VAT per group; split payment VAT is not charged and stays an
+        # unrounded zero, as in calculate()
+        vat_summaries: List[List[VATSummary]] = [[] for _ in invoices]
+        total_vats = [0] * len(invoices)
+        charged = [False] * len(invoices)
+        for invoice_index, rate, taxable in zip(group_invoice, group_rate, taxables):
+            if invoices[invoice_index].split_payment and rate > 0:
+                vat_amount = Decimal("0")
+            else:
+                amount = _percent(taxable, rate.as_integer_ratio())
+                total_vats[invoice_index] += amount
+                charged[invoice_index] = True
+                vat_amount = _to_decimal(amount, minor_units)
+            vat_summaries[invoice_index].append(
+                VATSummary(
+                    vat_rate=rate,
+                    taxable_amount=_to_decimal(taxable, minor_units),
+                    vat_amount=vat_amount,
+                )
+            )
+        
+        # Social security, stamp duty and retention per invoice
+        results = []
+        for index, invoice in enumerate(invoices):
+            subtotal = subtotals[index]
+            social_security_amount = None
+            if invoice.social_security_rate:
+                amount = _percent(
+                    subtotal, invoice.social_security_rate.as_integer_ratio()
+                )
+                social_security_amount = _to_decimal(amount, minor_units)
+                subtotal += amount
+            
+            # Sums of no rounded amount stay Decimal("0"), as in calculate()
+            results.append(
+                self._finish(
+                    _to_decimal(subtotal, minor_units)
+                    if invoice.rows or social_security_amount is not None
+                    else Decimal("0"),
+                    vat_summaries[index],
+                    _to_decimal(total_vats[index], minor_units)
+                    if charged[index]
+                    else Decimal("0"),
+                    social_security_amount,
+                    invoice.retention,
+                    invoice.stamp_duty,
+                )
+            )
+        
+        return results
+    
+    def _calculate_integer(
+        self,
+        rows: List[InvoiceRow],
+        retention: Optional[RetentionInfo],
+        social_security_rate: Optional[Decimal],
+        stamp_duty: bool,
+        split_payment: bool,
+        minor_units: int,
+    ) -> TaxCalculationResult:
+        """
+        Integer engine of calculate.
+        
+        Inputs are turned into exact integer ratios and every rounded
+        amount is a single half-even integer division, so results match
+        the Decimal engine (zero amounts are never negative zero).
+        """
+        scale = 10 ** minor_units
+        
+        # Subtotal and taxable amount per VAT rate, in minor units
+        subtotal = 0
+        vat_groups: Dict[Decimal, int] = {}
+        
+        for row in rows:
+            qn, qd, pn, pd, fn, fd = _row_ratios(row)
+            row_subtotal = _round_half_even(qn * pn * fn * scale, qd * pd * fd)
+            subtotal += row_subtotal
+            vat_groups[row.vat_rate] = vat_groups.get(row.vat_rate, 0) + row_subtotal
+        
+        # Calculate social security
+        social_security_amount = None
+        if social_security_rate:
+            amount = _percent(subtotal, social_security_rate.as_integer_ratio())
+            social_security_amount = _to_decimal(amount, minor_units)
+            subtotal += amount
+        
+        # Calculate VAT summaries
+        vat_summaries = []
+        total_vat = 0
+        charged = False
+        
+        for rate, taxable in vat_groups.items():
+            if split_payment and rate > 0:
+                # Unrounded zero, as in the Decimal engine
+                vat_amount = Decimal("0")
+            else:
+                amount = _percent(taxable, rate.as_integer_ratio())
+                total_vat += amount
+                charged = True
+                vat_amount = _to_decimal(amount, minor_units)
+            
+            vat_summaries.append(
+                VATSummary(
+                    vat_rate=rate,
+                    taxable_amount=_to_decimal(taxable, minor_units),
+                    vat_amount=vat_amount,
+                )
+            )
+        
+        # Sums of no rounded amount stay Decimal("0"), as in the Decimal
+        # engine, so both serialise identically
+        return self._finish(
+            _to_decimal(subtotal, minor_units)
+            if rows or social_security_amount is not None
+            else Decimal("0"),
+            vat_summaries,
+            _to_decimal(total_vat, minor_units) if charged else Decimal("0"),
+            social_security_amount,
+            retention,
+            stamp_duty,
+        )
+    
+    def _finish(
+        self,
+        subtotal: Decimal,
+        vat_summaries: List[VATSummary],
+        total_vat: Decimal,
+        social_security_amount: Optional[Decimal],
+        retention: Optional[RetentionInfo],
+        stamp_duty: bool,
+    ) -> TaxCalculationResult:
+        """Add stamp duty and retention, shared by both engines."""
         # Calculate total
         total = subtotal + total_vat
         
         # Calculate stamp duty (Italy)
         stamp_duty_amount = None
         if stamp_duty and total < STAMP_DUTY_THRESHOLD_IT:
-            stamp_duty_amount = STAMP_DUTY_AMOUNT_IT
+            stamp_duty_amount = Decimal(str(STAMP_DUTY_AMOUNT_IT)).quantize(CENT)
             total += stamp_duty_amount
         
         # Calculate retention
@@ -153,8 +567,158 @@ class VATCalculator:
         rate: Decimal,
         country: str,
     ) -> bool:
-        """Validate VAT rate for country."""
-        # Basic validation - user can extend
+        """
+        Validate VAT rate for country.
+        
+        Checks the rate tables of rules (default: DEFAULT_VAT_RATES);
+        for countries without a table any rate between 0 and 100 passes.
+        """
         if rate < 0 or rate > 100:
             return False
-        return True
+        
+        rule_set = self.rules.current if self.rules is not None else DEFAULT_TAX_RULES
+        if country not in rule_set:
+            return True
+        return rule_set.classify(country, rate) is not None
+
+
+def _round_half_even(num: int, den: int) -> int:
+    """Divide integers, rounding half to even (den > 0)."""
+    quotient, remainder = divmod(abs(num), den)
+    twice = 2 * remainder
+    if twice > den or (twice == den and quotient & 1):
+        quotient += 1
+    return quotient if num >= 0 else -quotient
+
+
+def _row_ratios(row: InvoiceRow) -> Tuple[int, int, int, int, int, int]:
+    """
+    Exact ratios of a row's quantity, unit price and discount factor.
+    
+    Returns:
+        (quantity num, den, unit price num, den, factor num, den) where
+        factor is 1 - discount_percent / 100
+    """
+    quantity_num, quantity_den = row.quantity.as_integer_ratio()
+    price_num, price_den = row.unit_price.as_integer_ratio()
+    if row.discount_percent > 0:
+        discount_num, discount_den = row.discount_percent.as_integer_ratio()
+        return (
+            quantity_num,
+            quantity_den,
+            price_num,
+            price_den,
+            100 * discount_den - discount_num,
+            100 * discount_den,
+        )
+    return quantity_num, quantity_den, price_num, price_den, 1, 1
+
+
+def _ratio_columns(rows: List[InvoiceRow]) -> List[Sequence[int]]:
+    """
+    Columns of exact row ratios, as _row_ratios.
+    
+    The discount factor is computed for every row (1 when there is no
+    discount), which is exact and keeps the columns branch-free.
+    """
+    if not rows:
+        return [()] * 6
+    
+    as_ratio = Decimal.as_integer_ratio
+    quantities = list(map(as_ratio, [row.quantity for row in rows]))
+    prices = list(map(as_ratio, [row.unit_price for row in rows]))
+    discounts = list(map(as_ratio, [row.discount_percent for row in rows]))
+    
+    return [
+        [num for num, _ in quantities],
+        [den for _, den in quantities],
+        [num for num, _ in prices],
+        [den for _, den in prices],
+        [100 * den - num for num, den in discounts],
+        [100 * den for _, den in discounts],
+    ]
+
+
+def _reduce_python(
+    columns: List[Sequence[int]],
+    row_invoice: List[int],
+    row_group: List[int],
+    invoice_count: int,
+    group_count: int,
+    scale: int,
+) -> Tuple[List[int], List[int]]:
+    """Subtotal per invoice and taxable per group, in minor units."""
+    subtotals = [0] * invoice_count
+    taxables = [0] * group_count
+    
+    for qn, qd, pn, pd, fn, fd, invoice, group in zip(*columns, row_invoice, row_group):
+        row_subtotal = _round_half_even(qn * pn * fn * scale, qd * pd * fd)
+        subtotals[invoice] += row_subtotal
+        taxables[group] += row_subtotal
+    
+    return subtotals, taxables
+
+
+def _reduce_numpy(
+    columns: List[Sequence[int]],
+    row_invoice: List[int],
+    row_group: List[int],
+    invoice_count: int,
+    group_count: int,
+    scale: int,
+) -> Optional[Tuple[List[int], List[int]]]:
+    """
+    NumPy version of _reduce_python.
+    
+    Returns:
+        None when some value could overflow int64
+    """
+    qn, qd, pn, pd, fn, fd = columns
+    num_bound = max(map(abs, qn)) * max(map(abs, pn)) * max(fn) * scale
+    den_bound = max(qd) * max(pd) * max(fd)
+    if num_bound >= _INT64_SAFE or den_bound >= _INT64_SAFE:
+        return None
+    
+    num = (
+        np.array(qn, dtype=np.int64)
+        * np.array(pn, dtype=np.int64)
+        * np.array(fn, dtype=np.int64)
+        * scale
+    )
+    den = (
+        np.array(qd, dtype=np.int64)
+        * np.array(pd, dtype=np.int64)
+        * np.array(fd, dtype=np.int64)
+    )
+    
+    # Half-even division
+    quotient, remainder = np.divmod(np.abs(num), den)
+    twice = 2 * remainder
+    quotient += (twice > den) | ((twice == den) & (quotient % 2 == 1))
+    row_subtotals = np.where(num < 0, -quotient, quotient)
+    
+    # Segment sums cannot exceed the row bound times the row count
+    if int(np.abs(row_subtotals).max()) * len(row_invoice) >= _INT64_SAFE:
+        return None
+    
+    subtotals = np.zeros(invoice_count, dtype=np.int64)
+    taxables = np.zeros(group_count, dtype=np.int64)
+    np.add.at(subtotals, np.array(row_invoice, dtype=np.intp), row_subtotals)
+    np.add.at(taxables, np.array(row_group, dtype=np.intp), row_subtotals)
+    
+    return subtotals.tolist(), taxables.tolist()
+
+
+def _percent(amount: int, rate: Tuple[int, int]) -> int:
+    """Rounded rate percent of an amount in minor units."""
+    return _round_half_even(amount * rate[0], rate[1] * 100)
+
+
+def _to_decimal(amount: int, minor_units: int) -> Decimal:
+    """Convert minor units to Decimal."""
+    return Decimal(amount).scaleb(-minor_units)
+
+
+def _minor_units(currency: Optional[str]) -> int:
+    """Minor unit digits of currency (cents when unknown or not given)."""
+    return CURRENCY_MINOR_UNITS.get(currency, 2) if currency else 2
@@ -0,0 +1,253 @@
+"""
+Offline VAT number and codice fiscale validation.
+
+Checks the format and check digits of VAT numbers locally, so obviously
+invalid numbers are rejected without a VIES request. Formats are
+compiled regexes and checksums are driven by weight and letter tables.
+A number passing these checks may still not be registered: only VIES
+can tell.
+"""
+
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Pattern, Tuple
+
+# VIES uses EL for Greece instead of the ISO code
+VIES_COUNTRY_CODES = {"GR": "EL"}
+
+_SEPARATORS = re.compile(r"[^0-9A-Za-z]+")
+
+# Spanish DNI/NIE control letters, by number modulo 23
+_ES_LETTERS = "TRWAGMYFPDXBNJZSQVHLCKE"
+# Spanish CIF control letters, by control digit
+_ES_CIF_LETTERS = "JABCDEFGHI"
+_ES_NIE_PREFIX = {"X": "0", "Y": "1", "Z": "2"}
+
+# Sum of the digits of 2 * d, for Luhn-style checksums
+_DOUBLED = (0, 2, 4, 6, 8, 1, 3, 5, 7, 9)
+
+_NL_WEIGHTS = (9, 8, 7, 6, 5, 4, 3, 2)
+_PT_WEIGHTS = (9, 8, 7, 6, 5, 4, 3, 2)
+
+
+def _luhn(digits: str) -> bool:
+    """Luhn check of a digit string (IT partita IVA)."""
+    total = 0
+    for index, char in enumerate(reversed(digits)):
+        digit = ord(char) - 48
+        total += _DOUBLED[digit] if index & 1 else digit
+    return total % 10 == 0
+
+
+def _weighted_mod11(digits: str, weights: Tuple[int, ...]) -> int:
+    """Weighted sum of digits modulo 11."""
+    return sum(int(char) * weight for char, weight in zip(digits, weights)) % 11
+
+
+def _check_it(number: str) -> bool:
+    """Partita IVA: 7-digit serial, 3-digit office code, Luhn digit."""
+    office = number[7:10]
+    if not ("001" <= office <= "100" or office in ("120", "121", "888", "999")):
+        return False
+    return number[:7] != "0000000" and _luhn(number)
+
+
+def _check_de(number: str) -> bool:
+    """Steuernummer: ISO 7064 MOD 11,10."""
+    product = 10
+    for char in number[:8]:
+        total = (int(char) + product) % 10 or 10
+        product = (2 * total) % 11
+    return (11 - product) % 10 == int(number[8])
+
+
+def _check_fr(number: str) -> bool:
+    """Numéro de TVA: numeric key derived from the SIREN (Luhn)."""
+    if number[2:5] != "000" and not _luhn(number[2:]):
+        # Monaco numbers are not SIRENs
+        return False
+    key = number[:2]
+    if not key.isdigit():
+        # Newer alphanumeric keys have no published algorithm
+        return True
+    return int(key) == (12 + 3 * (int(number[2:]) % 97)) % 97
+
+
+def _check_es(number: str) -> bool:
+    """NIF: DNI/NIE control letter or CIF control character."""
+    first, last = number[0], number[-1]
+    if first.isdigit():
+        # DNI: 8 digits and letter
+        return _ES_LETTERS[int(number[:8]) % 23] == last
+    if first in _ES_NIE_PREFIX:
+        return _ES_LETTERS[int(_ES_NIE_PREFIX[first] + number[1:8]) % 23] == last
+    if first in "KLM":
+        return _ES_LETTERS[int(number[1:8]) % 23] == last
+    
+    # CIF: Luhn-style control over the 7 digits
+    digits = number[1:8]
+    total = sum(int(char) for char in digits[1::2])
+    total += sum(_DOUBLED[int(char)] for char in digits[::2])
+    control = (10 - total % 10) % 10
+    return last == str(control) or last == _ES_CIF_LETTERS[control]
+
+
+def _check_nl(number: str) -> bool:
+    """BTW-id: MOD 11 of the RSIN, or MOD 97 of the whole id (since 2020)."""
+    if number[-2:] == "00":
+        return False
+    if _weighted_mod11(number[:8], _NL_WEIGHTS) == int(number[8]):
+        return True
+    # Letters count as 10 + position in the alphabet (N=23, L=21, B=11)
+    value = "".join(
+        char if char.isdigit() else str(ord(char) - 55) for char in "NL" + number
+    )
+    return int(value) % 97 == 1
+
+
+def _check_be(number: str) -> bool:
+    """Ondernemingsnummer: 97 - first 8 digits modulo 97."""
+    return 97 - int(number[:8]) % 97 == int(number[8:])
+
+
+def _check_at(number: str) -> bool:
+    """UID: U and 8 digits, Luhn-style check digit offset by 4."""
+    digits = number[1:8]
+    total = sum(int(char) for char in digits[::2])
+    total += sum(_DOUBLED[int(char)] for char in digits[1::2])
+    return (96 - total) % 10 == int(number[8])
+
+
+def _check_pt(number: str) -> bool:
+    """NIF: weighted MOD 11 check digit."""
+    check = 11 - _weighted_mod11(number[:8], _PT_WEIGHTS)
+    return (0 if check >= 10 else check) == int(number[8])
+
+
+# Country -> (format of the number without prefix, checksum)
+_RULES: Dict[str, Tuple[Pattern[str], Callable[[str], bool]]] = {
+    "IT": (re.compile(r"\d{11}"), _check_it),
+    "DE": (re.compile(r"[1-9]\d{8}"), _check_de),
+    "FR": (re.compile(r"[0-9A-HJ-NP-Z]{2}\d{9}"), _check_fr),
+    "ES": (
+        re.compile(r"\d{8}[A-Z]|[XYZKLM]\d{7}[A-Z]|[ABCDEFGHJNPQRSUVW]\d{7}[0-9A-J]"),
+        _check_es,
+    ),
+    "NL": (re.compile(r"\d{9}B\d{2}"), _check_nl),
+    "BE": (re.compile(r"[01]\d{9}"), _check_be),
+    "AT": (re.compile(r"U\d{8}"), _check_at),
+    "PT": (re.compile(r"[1-9]\d{8}"), _check_pt),
+}
+
+# Codice fiscale: omocodia replaces digits with LMNPQRSTUV
+_TAX_CODE = re.compile(
+    r"[A-Z]{6}[0-9L-NP-V]{2}[ABCDEHLMPRST][0-9L-NP-V]{2}[A-Z][0-9L-NP-V]{3}[A-Z]"
+)
+_TAX_CODE_ODD = dict(zip(
+    "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ",
+    (
+        1, 0, 5, 7, 9, 13, 15, 17, 19, 21,
+        1, 0, 5, 7, 9, 13, 15, 17, 19, 21, 2, 4, 18, 20, 11, 3, 6, 8, 12, 14,
+        16, 10, 22, 25, 24, 23,
+    ),
+))
+# Omocodia letters back to digits
+_TAX_CODE_DIGITS = str.maketrans("LMNPQRSTUV", "0123456789")
+# Days of each birth month letter (the year is ambiguous: February has 29)
+_TAX_CODE_MONTH_DAYS = dict(
+    zip("ABCDEHLMPRST", (31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31))
+)
+_TAX_CODE_EVEN = {
+    **{str(digit): digit for digit in range(10)},
+    **{chr(65 + index): index for index in range(26)},
+}
+
+
+def normalize_vat_number(vat_number: str, country_code: str) -> Tuple[str, str]:
+    """
+    Canonical (country code, number) of a VAT number.
+    
+    Separators are removed and a leading country prefix is stripped, so
+    "IT 123.456" and "123456" for IT give the same result.
+    """
+    country = country_code.strip().upper()
+    number = _SEPARATORS.sub("", vat_number).upper()
+    prefix = VIES_COUNTRY_CODES.get(country, country)
+    if number.startswith(prefix):
+        number = number[len(prefix):]
+    elif number.startswith(country):
+        number = number[len(country):]
+    return country, number
+
+
+def check_vat_number(vat_number: str, country_code: str) -> Optional[bool]:
+    """
+    Check format and check digits of a VAT number.
+    
+    Args:
+        vat_number: VAT number, with or without country prefix
+        country_code: ISO country code of the number
+        
+    Returns:
+        True if well formed, False if not, None for countries without
+        rules (IT, DE, FR, ES, NL, BE, AT, PT are supported)
+    """
+    country, number = normalize_vat_number(vat_number, country_code)
+    rule = _RULES.get(country)
+    if rule is None:
+        return None
+    return rule[0].fullmatch(number) is not None and rule[1](number)
+
+
+def check_vat_numbers(numbers: Iterable[Tuple[str, str]]) -> List[Optional[bool]]:
+    """
+    Check many (vat_number, country_code) pairs, e.g. a customer import.
+    
+    Returns:
+        Result of check_vat_number for each pair, in input order
+    """
+    rules = _RULES
+    separators = _SEPARATORS.sub
+    results: List[Optional[bool]] = []
+    append = results.append
+    
+    for vat_number, country_code in numbers:
+        country = country_code.strip().upper()
+        rule = rules.get(country)
+        if rule is None:
+            append(None)
+            continue
+        
+        # isalnum() also accepts non-ASCII digits and letters
+        if not (vat_number.isascii() and vat_number.isalnum()):
+            vat_number = separators("", vat_number)
+        number = vat_number.upper()
+        if number.startswith(country):
+            number = number[2:]
+        append(rule[0].fullmatch(number) is not None and rule[1](number))
+    return results
+
+
+def check_tax_code(tax_code: str) -> bool:
+    """
+    Check an Italian codice fiscale (TaxInfo.tax_code of Italian parties).
+    
+    Accepts the 16-character code of natural persons (including
+    omocodia variants) and the 11-digit code of companies, which equals
+    their partita IVA. The birth day must exist in the birth month; it
+    is increased by 40 for women.
+    """
+    code = _SEPARATORS.sub("", tax_code).upper()
+    if len(code) == 11:
+        return code.isdigit() and _luhn(code)
+    if _TAX_CODE.fullmatch(code) is None:
+        return False
+    
+    day = int(code[9:11].translate(_TAX_CODE_DIGITS))
+    if day > 40:
+        day -= 40
+    if not 1 <= day <= _TAX_CODE_MONTH_DAYS[code[8]]:
+        return False
+    
+    total = sum(_TAX_CODE_ODD[char] for char in code[0:15:2])
+    total += sum(_TAX_CODE_EVEN[char] for char in code[1:15:2])
+    return chr(65 + total % 26) == code[15]
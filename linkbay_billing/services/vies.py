@@ -0,0 +1,255 @@
+"""
+Caching VIES validator.
+
+Wraps a VIESValidator (SOAP/REST client of the EU VIES service) with
+result caching, request deduplication, a concurrency limit and a
+circuit breaker, since VIES is slow and rate-limited per client.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..protocols import VIESValidator
+from .vat_numbers import VIES_COUNTRY_CODES, check_vat_number, normalize_vat_number
+
+
+class CachedVIESValidator:
+    """
+    VIESValidator adding caching and backend protection to another one.
+    
+    - Numbers failing the offline format/checksum check
+      (check_vat_number) are invalid without a VIES request.
+    - Valid numbers are cached for positive_ttl seconds, invalid ones
+      for negative_ttl (a number may be registered shortly after).
+    - Concurrent lookups of the same number share one backend request.
+    - At most max_concurrency backend requests run at a time.
+    - After failure_threshold consecutive backend errors the circuit
+      opens for reset_timeout seconds: lookups are answered from the
+      cache, including expired entries, without calling the backend.
+      Then a single trial request decides whether it closes again.
+      
+    When VIES cannot answer and nothing is cached, the result is
+    "unknown": valid is None.
+    """
+    
+    def __init__(
+        self,
+        validator: VIESValidator,
+        positive_ttl: float = 86400.0,
+        negative_ttl: float = 300.0,
+        max_concurrency: int = 4,
+        timeout: Optional[float] = 10.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        max_entries: int = 100000,
+    ):
+        """
+        Initialize caching validator.
+        
+        Args:
+            validator: Backend validator
+            positive_ttl: Seconds a valid answer is reused
+            negative_ttl: Seconds an invalid answer is reused
+            max_concurrency: Maximum concurrent backend requests
+            timeout: Seconds before a backend request counts as failed
+                (None: no timeout)
+            failure_threshold: Consecutive failures opening the circuit
+            reset_timeout: Seconds the circuit stays open
+            max_entries: Maximum cached numbers, least recently used
+                dropped first (expired entries are kept as fallback)
+        """
+        self.validator = validator
+        self.max_concurrency = max_concurrency
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.backend_calls = 0
+        self.failures = 0
+        self.rejected = 0
+        self._entries: OrderedDict[Tuple[str, str], Tuple[float, Dict[str, Any]]] = (
+            OrderedDict()
+        )
+        self._inflight: Dict[Tuple[str, str], asyncio.Future[Optional[Dict[str, Any]]]] = {}
+        # Created in the running loop on first use (see _limiter)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._consecutive_failures = 0
+        self._open_until = 0.0
+        self._trial_running = False
+    
+    @property
+    def circuit_open(self) -> bool:
+        """Whether backend requests are currently suspended."""
+        return self._consecutive_failures >= self.failure_threshold and (
+            self._trial_running or time.monotonic() < self._open_until
+        )
+    
+    async def validate_vat_number(
+        self,
+        vat_number: str,
+        country_code: str,
+    ) -> Dict[str, Any]:
+        """
+        Validate VAT number via VIES.
+        
+        Returns:
+            Dict with keys: valid (bool, None if unknown), company_name
+            (str), address (str)
+        """
+        if check_vat_number(vat_number, country_code) is False:
+            self.rejected += 1
+            return _invalid()
+        
+        key = normalize_vat_number(vat_number, country_code)
+        now = time.monotonic()
+        
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > now:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        
+        pending = self._inflight.get(key)
+        if pending is not None:
+            result = await asyncio.shield(pending)
+        else:
+            result = await self._lookup(key)
+        
+        if result is not None:
+            return result
+        
+        # Backend unavailable: serve the expired answer if there is one
+        entry = self._entries.get(key)
+        if entry is not None:
+            return entry[1]
+        return _unknown()
+    
+    async def validate_many(
+        self,
+        numbers: Iterable[Tuple[str, str]],
+    ) -> List[Dict[str, Any]]:
+        """
+        Validate (vat_number, country_code) pairs concurrently.
+        
+        Duplicates are looked up once; results are in input order.
+        """
+        return list(
+            await asyncio.gather(
+                *(
+                    self.validate_vat_number(vat_number, country_code)
+                    for vat_number, country_code in numbers
+                )
+            )
+        )
+    
+    def clear(self) -> None:
+        """Drop all cached answers."""
+        self._entries.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get cache counters and circuit state."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "backend_calls": self.backend_calls,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "entries": len(self._entries),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "circuit_open": self.circuit_open,
+        }
+    
+    async def _lookup(self, key: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+        """Query backend once for all concurrent callers (None on failure)."""
+        future: asyncio.Future[Optional[Dict[str, Any]]] = (
+            asyncio.get_running_loop().create_future()
+        )
+        self._inflight[key] = future
+        result = None
+        try:
+            result = await self._call_backend(key)
+            if result is not None:
+                ttl = self.positive_ttl if result.get("valid") else self.negative_ttl
+                self._store(key, result, ttl)
+            return result
+        finally:
+            del self._inflight[key]
+            future.set_result(result)
+    
+    async def _call_backend(self, key: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+        """Call backend through the semaphore and circuit breaker."""
+        trial = False
+        if self._consecutive_failures >= self.failure_threshold:
+            if self._trial_running or time.monotonic() < self._open_until:
+                return None
+            # Half-open: let one request through
+            trial = self._trial_running = True
+        
+        try:
+            async with self._limiter():
+                self.backend_calls += 1
+                request = self.validator.validate_vat_number(
+                    key[1], VIES_COUNTRY_CODES.get(key[0], key[0])
+                )
+                if self.timeout is not None:
+                    result = await asyncio.wait_for(request, self.timeout)
+                else:
+                    result = await request
+        except Exception:
+            self.failures += 1
+            self._consecutive_failures += 1
+            if self._consecutive_failures >= self.failure_threshold:
+                self._open_until = time.monotonic() + self.reset_timeout
+            return None
+        finally:
+            if trial:
+                self._trial_running = False
+        
+        self._consecutive_failures = 0
+        return result
+    
+    def _limiter(self) -> asyncio.Semaphore:
+        """
+        Semaphore limiting backend requests in the running loop.
+        
+        Created lazily: a semaphore made outside a loop (e.g. at import
+        time) binds to the wrong loop on Python < 3.10, and one used in a
+        loop cannot be reused in another (e.g. successive asyncio.run).
+        """
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+    
+    def _store(
+        self,
+        key: Tuple[str, str],
+        result: Dict[str, Any],
+        ttl: float,
+    ) -> None:
+        """Cache answer, evicting least recently used numbers."""
+        self._entries[key] = (time.monotonic() + ttl, result)
+        self._entries.move_to_end(key)
+        
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+def _invalid() -> Dict[str, Any]:
+    """Result of a number rejected offline."""
+    return {"valid": False, "company_name": None, "address": None}
+
+
+def _unknown() -> Dict[str, Any]:
+    """Result of a lookup VIES could not answer."""
+    return {"valid": None, "company_name": None, "address": None}
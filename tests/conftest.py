@@ -0,0 +1,251 @@
+"""Shared fixtures: in-memory storage and invoice factories."""
+
+import asyncio
+import copy
+import itertools
+from datetime import date
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Set
+
+import pytest
+
+from linkbay_billing import (
+    Address,
+    Company,
+    Customer,
+    InvoiceCreate,
+    InvoiceManager,
+    InvoiceRow,
+    InvoiceStorage,
+    PaymentInfo,
+    TaxInfo,
+)
+from linkbay_billing.services.serial_generator import SerialNumberGenerator
+
+
+def pytest_addoption(parser: Any) -> None:
+    parser.addoption(
+        "--benchmarks",
+        action="store_true",
+        help="run the timing benchmarks (marked benchmark)",
+    )
+
+
+def pytest_collection_modifyitems(config: Any, items: List[Any]) -> None:
+    if config.getoption("--benchmarks"):
+        return
+    skip = pytest.mark.skip(reason="timing benchmark, run with --benchmarks")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+def _day(value: Any) -> Any:
+    """Date of a stored date/datetime/ISO string."""
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    if hasattr(value, "date"):
+        return value.date()
+    return value
+
+
+class MemoryStorage(InvoiceStorage):
+    """
+    InvoiceStorage implementing only the required methods.
+    
+    Subclasses the protocol the way the README suggests, so the optional
+    stubs are inherited and must be ignored by the services.
+    """
+    
+    def __init__(self):
+        self.invoices: Dict[str, Dict[str, Any]] = {}
+        self.payments: Dict[str, List[Dict[str, Any]]] = {}
+        # Writes of invoices for these customer ids raise
+        self.fail_customers: Set[str] = set()
+        self._ids = itertools.count(1)
+    
+    async def create_invoice(self, tenant_id, data):
+        if data["customer"]["id"] in self.fail_customers:
+            raise RuntimeError(f"write failed for {data['invoice_number']}")
+        record = {"id": f"inv_{next(self._ids)}", "tenant_id": tenant_id, **data}
+        self.invoices[record["id"]] = copy.deepcopy(record)
+        return record
+    
+    async def get_invoice(self, tenant_id, invoice_id):
+        record = self.invoices.get(invoice_id)
+        if record is None or record["tenant_id"] != tenant_id:
+            return None
+        return copy.deepcopy(record)
+    
+    async def get_invoice_by_number(self, tenant_id, invoice_number):
+        for record in self.invoices.values():
+            if (
+                record["tenant_id"] == tenant_id
+                and record["invoice_number"] == invoice_number
+            ):
+                return copy.deepcopy(record)
+        return None
+    
+    async def update_invoice(self, tenant_id, invoice_id, updates):
+        record = self.invoices[invoice_id]
+        record.update(copy.deepcopy(updates))
+        record["version"] = record.get("version", 1) + 1
+        return copy.deepcopy(record)
+    
+    async def list_invoices(self, tenant_id, skip=0, limit=100, filters=None):
+        records = [
+            copy.deepcopy(record)
+            for record in self.invoices.values()
+            if record["tenant_id"] == tenant_id and _matches(record, filters or {})
+        ]
+        return records[skip:] if limit is None else records[skip:skip + limit]
+    
+    async def record_payment(self, tenant_id, invoice_id, payment_data):
+        payment = {"id": f"pay_{next(self._ids)}", **payment_data}
+        self.payments.setdefault(invoice_id, []).append(payment)
+        return dict(payment)
+    
+    async def get_payments(self, tenant_id, invoice_id):
+        return [dict(payment) for payment in self.payments.get(invoice_id, [])]
+    
+    async def get_last_serial_number(self, tenant_id, year, series=None):
+        serials = [
+            int(record["invoice_number"].rsplit("-", 1)[-1])
+            for record in self.invoices.values()
+            if record["tenant_id"] == tenant_id
+            and _day(record["issue_date"]).year == year
+            and record.get("series") == series
+        ]
+        return max(serials, default=None)
+    
+    def serials(self, tenant_id: str = "t1") -> List[int]:
+        """Sorted serials of the stored invoices of a tenant."""
+        return sorted(
+            int(record["invoice_number"].rsplit("-", 1)[-1])
+            for record in self.invoices.values()
+            if record["tenant_id"] == tenant_id
+        )
+
+
+class ConditionalStorage(MemoryStorage):
+    """MemoryStorage with conditional writes (compare_and_set_invoice)."""
+    
+    async def compare_and_set_invoice(self, tenant_id, invoice_id, expected, updates):
+        record = self.invoices.get(invoice_id)
+        if record is None or any(
+            record.get(field) not in values for field, values in expected.items()
+        ):
+            return None
+        return await self.update_invoice(tenant_id, invoice_id, updates)
+
+
+def _matches(record: Dict[str, Any], filters: Dict[str, Any]) -> bool:
+    """Apply the list_invoices filters used by the services."""
+    status = record.get("status")
+    if "status" in filters and status != filters["status"]:
+        return False
+    if "status_in" in filters and status not in filters["status_in"]:
+        return False
+    if "status_not" in filters and status == filters["status_not"]:
+        return False
+    if "customer_id" in filters and (
+        record["customer"].get("id") != filters["customer_id"]
+    ):
+        return False
+    
+    issue_date = _day(record["issue_date"])
+    if "issue_date_from" in filters and issue_date < filters["issue_date_from"]:
+        return False
+    if "issue_date_to" in filters and issue_date > filters["issue_date_to"]:
+        return False
+    if "due_date_before" in filters:
+        due_date = (record.get("payment_info") or {}).get("due_date")
+        if due_date is None or _day(due_date) >= filters["due_date_before"]:
+            return False
+    return True
+
+
+class FakeVIES:
+    """VIESValidator knowing a set of registered numbers, optionally failing or slow."""
+    
+    def __init__(self, registered=("IT01234560017", "IT00743110157"), delay=0.0):
+        self.registered = set(registered)
+        self.delay = delay
+        self.fail = False
+        self.calls: List[Any] = []
+        self.running = 0
+        self.max_running = 0
+    
+    async def validate_vat_number(self, vat_number, country_code):
+        self.calls.append((country_code, vat_number))
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.fail:
+                raise ConnectionError("VIES unavailable")
+            valid = country_code + vat_number in self.registered
+            return {"valid": valid, "company_name": "ACME" if valid else None, "address": None}
+        finally:
+            self.running -= 1
+
+
+def _address(country: str = "IT") -> Address:
+    return Address(street="Via Roma 1", city="Milano", postal_code="20100", country=country)
+
+
+@pytest.fixture
+def make_invoice() -> Callable[..., InvoiceCreate]:
+    """Factory of valid InvoiceCreate objects; keyword arguments override."""
+    
+    def factory(**overrides: Any) -> InvoiceCreate:
+        data: Dict[str, Any] = {
+            "company": Company(
+                name="ACME",
+                address=_address(),
+                tax_info=TaxInfo(vat_number="IT01234560017"),
+                email="billing@acme.com",
+            ),
+            "customer": Customer(
+                id="cust_1",
+                name="Mario Rossi",
+                address=_address(),
+                email="mario@example.com",
+            ),
+            "rows": [
+                InvoiceRow(
+                    description="Consulting",
+                    quantity=Decimal("2"),
+                    unit_price=Decimal("10.005"),
+                    vat_rate=Decimal("22"),
+                ),
+            ],
+            "issue_date": date(2025, 1, 10),
+            "payment_info": PaymentInfo(method="bank_transfer", terms="net_30"),
+        }
+        data.update(overrides)
+        return InvoiceCreate(**data)
+    
+    return factory
+
+
+@pytest.fixture
+def storage() -> MemoryStorage:
+    return MemoryStorage()
+
+
+@pytest.fixture
+def manager_factory() -> Callable[..., InvoiceManager]:
+    """Build an InvoiceManager over a storage; keyword arguments pass through."""
+    
+    def factory(storage: Any, **kwargs: Any) -> InvoiceManager:
+        kwargs.setdefault("serial_provider", SerialNumberGenerator(storage))
+        return InvoiceManager(storage, **kwargs)
+    
+    return factory
+
+
+@pytest.fixture
+def manager(storage: MemoryStorage, manager_factory) -> InvoiceManager:
+    return manager_factory(storage)
+
@@ -0,0 +1,137 @@
+"""
+Timing benchmarks, skipped by default.
+
+Run with: pytest tests/test_benchmarks.py --benchmarks -s
+Each benchmark prints its timings and checks the result it measured.
+"""
+
+import asyncio
+import time
+from decimal import Decimal
+
+import pytest
+from conftest import MemoryStorage
+
+from linkbay_billing import InvoiceResponse, InvoiceRow
+
+pytestmark = pytest.mark.benchmark
+
+
+def report(title, timings):
+    print(f"\n{title}")
+    for label, value in timings:
+        print(f"  {label:>24}: {value}")
+
+
+class SlowStorage(MemoryStorage):
+    """MemoryStorage with a round trip latency on the numbering path."""
+    
+    latency = 0.001
+    
+    async def get_last_serial_number(self, tenant_id, year, series=None):
+        await asyncio.sleep(self.latency)
+        return await super().get_last_serial_number(tenant_id, year, series)
+    
+    async def create_invoice(self, tenant_id, data):
+        await asyncio.sleep(self.latency)
+        return await super().create_invoice(tenant_id, data)
+
+
+@pytest.mark.parametrize("creators", [1, 8, 64])
+async def test_serial_contention(manager_factory, make_invoice, creators):
+    invoices = 256
+    storage = SlowStorage()
+    manager = manager_factory(storage)
+    invoice_data = make_invoice()
+    
+    async def creator(count):
+        for _ in range(count):
+            await manager.create_invoice("t1", invoice_data)
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(creator(invoices // creators) for _ in range(creators)))
+    elapsed = time.perf_counter() - started
+    
+    report(
+        f"serial contention, {creators} concurrent creators, 1 tenant",
+        [
+            ("invoices", invoices),
+            ("seconds", f"{elapsed:.3f}"),
+            ("invoices/s", f"{invoices / elapsed:.0f}"),
+        ],
+    )
+    assert storage.serials() == list(range(1, invoices + 1))
+
+
+@pytest.mark.parametrize("count", [1, 100, 10_000])
+async def test_trusted_responses(manager, storage, make_invoice, count):
+    invoice = await manager.create_invoice("t1", make_invoice())
+    records = [storage.invoices[invoice.id]] * count
+    
+    started = time.perf_counter()
+    validated = [InvoiceResponse(**record) for record in records]
+    validated_elapsed = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    trusted = [InvoiceResponse.from_trusted(record) for record in records]
+    trusted_elapsed = time.perf_counter() - started
+    
+    report(
+        f"response construction, {count} invoices",
+        [
+            ("validated ms", f"{validated_elapsed * 1000:.2f}"),
+            ("from_trusted ms", f"{trusted_elapsed * 1000:.2f}"),
+            ("speedup", f"{validated_elapsed / trusted_elapsed:.1f}x"),
+        ],
+    )
+    assert trusted[-1].model_dump() == validated[-1].model_dump()
+
+
+def recomputed_amounts(row):
+    """Row amounts as computed before memoisation: subtotal four times."""
+    def subtotal():
+        amount = row.quantity * row.unit_price
+        if row.discount_percent > 0:
+            amount = amount * (1 - row.discount_percent / 100)
+        return amount.quantize(Decimal("0.01"))
+    
+    def vat():
+        return (subtotal() * row.vat_rate / 100).quantize(Decimal("0.01"))
+    
+    return subtotal(), vat(), (subtotal() + vat()).quantize(Decimal("0.01"))
+
+
+def test_row_amounts_1m_rows():
+    count = 1_000_000
+    rows = [
+        InvoiceRow.model_construct(
+            description="Item",
+            quantity=Decimal(index % 7 + 1),
+            unit_price=Decimal(index % 1000).scaleb(-2),
+            vat_rate=Decimal("22"),
+            discount_percent=Decimal("10") if index % 3 else Decimal("0"),
+        )
+        for index in range(count)
+    ]
+    
+    started = time.perf_counter()
+    expected = [recomputed_amounts(row) for row in rows]
+    recomputed_elapsed = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    first = [(row.subtotal, row.vat_amount, row.total) for row in rows]
+    first_elapsed = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    cached = [(row.subtotal, row.vat_amount, row.total) for row in rows]
+    cached_elapsed = time.perf_counter() - started
+    
+    report(
+        f"row amounts, {count} rows",
+        [
+            ("recomputed s", f"{recomputed_elapsed:.2f}"),
+            ("memoised, first pass s", f"{first_elapsed:.2f}"),
+            ("memoised, cached s", f"{cached_elapsed:.2f}"),
+        ],
+    )
+    assert first == cached == expected
@@ -0,0 +1,147 @@
+"""Bulk invoice creation."""
+
+import asyncio
+from datetime import date
+from decimal import Decimal
+
+from conftest import MemoryStorage
+
+from linkbay_billing import InvoiceRow, TaxRuleEngine
+from linkbay_billing.services.vat_calculator import VATCalculator
+
+
+class BatchStorage(MemoryStorage):
+    """Storage writing bulk invoices in one call."""
+    
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+    
+    async def create_invoices(self, tenant_id, items):
+        self.batches.append(len(items))
+        # Let concurrent callers interleave
+        await asyncio.sleep(0)
+        return [await self.create_invoice(tenant_id, item) for item in items]
+
+
+async def test_bulk_on_protocol_subclass_without_batch_writes(manager, storage, make_invoice):
+    response = await manager.create_invoices_bulk(
+        "t1", [make_invoice(), make_invoice(), make_invoice()]
+    )
+    
+    assert response.created == 3
+    assert storage.serials() == [1, 2, 3]
+
+
+async def test_bulk_uses_batch_writes(manager_factory, make_invoice):
+    storage = BatchStorage()
+    manager = manager_factory(storage)
+    
+    response = await manager.create_invoices_bulk(
+        "t1",
+        [make_invoice(issue_date=date(2025, 1, day)) for day in (3, 1, 2)],
+        batch_size=2,
+    )
+    
+    assert response.created == 3
+    assert storage.batches == [2, 1]
+    # Numbered in issue date order, reported in submission order
+    assert [result.invoice.invoice_number[-1] for result in response.results] == [
+        "3", "1", "2",
+    ]
+
+
+async def test_keyed_items_replay_on_resubmission(manager, storage, make_invoice):
+    items = [
+        make_invoice(idempotency_key="row-1"),
+        make_invoice(idempotency_key="row-2"),
+    ]
+    
+    first = await manager.create_invoices_bulk("t1", items)
+    second = await manager.create_invoices_bulk("t1", items)
+    
+    assert first.created == second.created == 2
+    assert [result.invoice.id for result in second.results] == [
+        result.invoice.id for result in first.results
+    ]
+    assert storage.serials() == [1, 2]
+
+
+async def test_bulk_failure_leaves_no_gap(manager, storage, make_invoice):
+    storage.fail_customers.add("broken")
+    broken = make_invoice().customer.model_copy(update={"id": "broken"})
+    items = [make_invoice(), make_invoice(customer=broken), make_invoice()]
+    
+    response = await manager.create_invoices_bulk("t1", items)
+    
+    assert [result.error is None for result in response.results] == [True, False, True]
+    assert storage.serials() == [1, 2]
+    assert response.results[2].invoice.invoice_number == "TENANT-2025-000002"
+
+
+async def test_concurrent_creation_is_gapless(manager_factory, make_invoice):
+    storage = BatchStorage()
+    storage.fail_customers.add("broken")
+    manager = manager_factory(storage)
+    broken = make_invoice().customer.model_copy(update={"id": "broken"})
+    
+    def bulk(size, broken_at):
+        return manager.create_invoices_bulk(
+            "t1",
+            [
+                make_invoice(customer=broken) if index == broken_at else make_invoice()
+                for index in range(size)
+            ],
+            batch_size=2,
+        )
+    
+    responses = await asyncio.gather(
+        bulk(5, 2),
+        bulk(4, None),
+        bulk(3, 0),
+        manager.create_invoice("t1", make_invoice()),
+        manager.create_invoice("t1", make_invoice()),
+    )
+    
+    # A failing item fails its whole storage batch
+    assert [response.failed for response in responses[:3]] == [2, 0, 2]
+    created = sum(response.created for response in responses[:3]) + 2
+    assert storage.serials() == list(range(1, created + 1))
+
+
+async def test_bulk_taxes_match_single_creation(storage, manager_factory, make_invoice):
+    manager = manager_factory(storage, vat_calculator=VATCalculator(rules=TaxRuleEngine()))
+    jpy = make_invoice(
+        currency="JPY",
+        rows=[
+            InvoiceRow(
+                description="Item",
+                quantity=Decimal("3"),
+                unit_price=Decimal("333.5"),
+                vat_rate=Decimal("22"),
+            )
+        ],
+    )
+    invalid = make_invoice(
+        rows=[
+            InvoiceRow(
+                description="Item",
+                quantity=Decimal("1"),
+                unit_price=Decimal("10"),
+                vat_rate=Decimal("7"),
+            )
+        ]
+    )
+    
+    response = await manager.create_invoices_bulk(
+        "t1", [make_invoice(split_payment=True), invalid, jpy]
+    )
+    
+    assert [result.error is None for result in response.results] == [True, False, True]
+    for result, item in zip(response.results[::2], [make_invoice(split_payment=True), jpy]):
+        single = await manager.create_invoice("t1", item)
+        assert result.invoice.model_dump_json(
+            include={"subtotal", "total_vat", "total", "vat_summaries"}
+        ) == single.model_dump_json(
+            include={"subtotal", "total_vat", "total", "vat_summaries"}
+        )
@@ -0,0 +1,100 @@
+"""Change events and the transactional outbox."""
+
+import contextlib
+
+from conftest import MemoryStorage
+
+from linkbay_billing import FileChangeFeed, InMemoryChangeFeed
+
+
+class OutboxStorage(MemoryStorage):
+    """Storage writing events to its own outbox inside a transaction."""
+    
+    def __init__(self):
+        super().__init__()
+        self.outbox = []
+        self.transactions = []
+    
+    async def append_events(self, tenant_id, events):
+        self.outbox.extend(events)
+    
+    @contextlib.asynccontextmanager
+    async def unit_of_work(self, tenant_id):
+        self.transactions.append(tenant_id)
+        yield
+
+
+async def test_protocol_subclass_without_outbox_uses_change_feed(
+    storage, manager_factory, make_invoice
+):
+    feed = InMemoryChangeFeed()
+    manager = manager_factory(storage, change_feed=feed)
+    
+    invoice = await manager.create_invoice("t1", make_invoice())
+    
+    events = await feed.read_events(0)
+    assert [event["invoice_id"] for event in events] == [invoice.id]
+
+
+async def test_outbox_written_inside_unit_of_work(manager_factory, make_invoice):
+    storage = OutboxStorage()
+    feed = InMemoryChangeFeed()
+    manager = manager_factory(storage, change_feed=feed)
+    
+    await manager.create_invoice("t1", make_invoice())
+    
+    assert storage.transactions == ["t1"]
+    assert len(storage.outbox) == 1
+    assert await feed.read_events(0) == []
+
+
+class FailingChangeFeed(InMemoryChangeFeed):
+    """Feed whose appends raise while failing is set."""
+    
+    def __init__(self):
+        super().__init__()
+        self.failing = True
+    
+    async def append_events(self, tenant_id, events):
+        if self.failing:
+            raise ConnectionError("feed unavailable")
+        await super().append_events(tenant_id, events)
+
+
+async def test_feed_failure_after_write_is_retried(
+    storage, manager_factory, make_invoice
+):
+    feed = FailingChangeFeed()
+    manager = manager_factory(storage, change_feed=feed)
+    
+    first = await manager.create_invoice("t1", make_invoice())
+    bulk = await manager.create_invoices_bulk("t1", [make_invoice(), make_invoice()])
+    
+    numbers = [first.invoice_number] + [r.invoice.invoice_number for r in bulk.results]
+    assert bulk.failed == 0
+    assert len(set(numbers)) == 3
+    assert storage.serials() == [1, 2, 3]
+    assert await manager.publish_pending_events() > 0
+    
+    feed.failing = False
+    assert await manager.publish_pending_events() == 0
+    events = await feed.read_events(0)
+    assert [event["invoice_id"] for event in events] == [
+        first.id, *(r.invoice.id for r in bulk.results)
+    ]
+
+
+async def test_file_feed_ignores_torn_trailing_line(tmp_path):
+    feed = FileChangeFeed(str(tmp_path))
+    await feed.append_events("t1", [{"id": "e1"}])
+    with open(tmp_path / "events.jsonl", "ab") as f:
+        f.write(b'{"id":"e2","posi')
+    
+    reopened = FileChangeFeed(str(tmp_path))
+    assert [event["id"] for event in await reopened.read_events(0)] == ["e1"]
+    
+    await reopened.append_events("t1", [{"id": "e3"}])
+    events = await FileChangeFeed(str(tmp_path)).read_events(0)
+    assert [(event["id"], event["position"]) for event in events] == [
+        ("e1", 1), ("e3", 2)
+    ]
@@ -0,0 +1,101 @@
+"""Credit notes and the credited total of the original invoice."""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from conftest import ConditionalStorage, MemoryStorage
+
+from linkbay_billing import CreditNoteCreate, InvoiceRow
+from linkbay_billing.exceptions import InvalidInvoiceDataError
+
+
+def credit(invoice_id, **overrides):
+    data = {
+        "original_invoice_id": invoice_id,
+        "reason": "returned goods",
+        "issue_date": date(2025, 1, 20),
+    }
+    data.update(overrides)
+    return CreditNoteCreate(**data)
+
+
+@pytest.mark.parametrize("storage_class", [MemoryStorage, ConditionalStorage])
+async def test_full_credit(manager_factory, make_invoice, storage_class):
+    storage = storage_class()
+    manager = manager_factory(storage)
+    invoice = await manager.create_invoice("t1", make_invoice())
+    
+    note = await manager.create_credit_note("t1", credit(invoice.id))
+    
+    assert note.invoice_type == "credit_note"
+    assert note.total == invoice.total
+    assert await manager.get_credited_total("t1", invoice.id) == invoice.total
+    with pytest.raises(InvalidInvoiceDataError):
+        await manager.create_credit_note("t1", credit(invoice.id))
+
+
+@pytest.mark.parametrize("storage_class", [MemoryStorage, ConditionalStorage])
+async def test_failed_credit_note_releases_credited_total(
+    manager_factory, make_invoice, storage_class
+):
+    storage = storage_class()
+    # No retries: the rollback must not start from the stale snapshot
+    manager = manager_factory(storage, max_write_attempts=1)
+    invoice = await manager.create_invoice("t1", make_invoice())
+    storage.fail_customers.add("cust_1")
+    
+    with pytest.raises(RuntimeError, match="write failed"):
+        await manager.create_credit_note("t1", credit(invoice.id))
+    
+    stored = storage.invoices[invoice.id]
+    assert Decimal(str(stored.get("credited_total", 0))) == Decimal("0")
+    assert stored["version"] == invoice.version + 2
+    assert len(storage.invoices) == 1
+    
+    storage.fail_customers.clear()
+    note = await manager.create_credit_note("t1", credit(invoice.id))
+    assert note.total == invoice.total
+
+
+def rows(*prices):
+    return [
+        InvoiceRow(
+            description=f"Item {index}",
+            quantity=Decimal("1"),
+            unit_price=Decimal(price),
+            vat_rate=Decimal("22"),
+        )
+        for index, price in enumerate(prices)
+    ]
+
+
+async def test_partial_credit_reuses_social_security_rate(manager, make_invoice):
+    invoice = await manager.create_invoice(
+        "t1",
+        make_invoice(rows=rows("0.12", "0.01"), social_security_rate=Decimal("4")),
+    )
+    
+    # 0.01 of social security on 0.13 would suggest a rate of 7.69%
+    note = await manager.create_credit_note("t1", credit(invoice.id, row_indices=[0]))
+    
+    expected = manager.vat_calculator.calculate(
+        rows=rows("0.12"), social_security_rate=Decimal("4")
+    )
+    assert note.social_security_rate == Decimal("4")
+    assert note.social_security_amount == expected.social_security_amount
+    assert note.total == expected.total
+
+
+async def test_partial_credit_decides_stamp_duty_on_credited_amount(
+    manager, make_invoice
+):
+    invoice = await manager.create_invoice(
+        "t1", make_invoice(rows=rows("100", "10"), stamp_duty=True)
+    )
+    assert invoice.stamp_duty_amount is None
+    
+    note = await manager.create_credit_note("t1", credit(invoice.id, row_indices=[1]))
+    
+    assert note.stamp_duty_amount == Decimal("2.00")
+    assert note.total == Decimal("12.20") + Decimal("2.00")
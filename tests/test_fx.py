@@ -0,0 +1,161 @@
+"""Exchange rate tables, the rate cache and converted VAT reports."""
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+from linkbay_billing import (
+    ExchangeRateNotFoundError,
+    FXRateCache,
+    FXRateTable,
+    InvoiceRow,
+)
+from linkbay_billing.services.reporting import ReportingService
+
+# Friday and Monday rates: nothing is published over the weekend
+RATES = {
+    ("USD", "EUR"): {
+        date(2025, 1, 3): Decimal("0.9"),
+        date(2025, 1, 6): Decimal("0.8"),
+    },
+    ("EUR", "JPY"): {
+        date(2025, 1, 3): Decimal("161.37"),
+    },
+}
+
+
+class RecordingProvider:
+    """FXRateProvider over RATES, recording the ranges asked for."""
+    
+    def __init__(self):
+        self.calls = []
+    
+    async def get_rates(self, currency, quote_currency, start, end):
+        self.calls.append((currency, quote_currency, start, end))
+        rates = RATES.get((currency, quote_currency), {})
+        return {day: rate for day, rate in rates.items() if start <= day <= end}
+
+
+def test_table_falls_back_to_previous_date():
+    table = FXRateTable()
+    table.add(RATES[("USD", "EUR")])
+    week = timedelta(days=7)
+    
+    assert table.lookup(date(2025, 1, 3), week) == Decimal("0.9")
+    assert table.lookup(date(2025, 1, 5), week) == Decimal("0.9")
+    assert table.lookup(date(2025, 1, 6), week) == Decimal("0.8")
+    assert table.lookup(date(2025, 1, 13), week) == Decimal("0.8")
+    
+    # Older than max_age, or before the first publication
+    assert table.lookup(date(2025, 1, 14), week) is None
+    assert table.lookup(date(2025, 1, 5), timedelta(days=1)) is None
+    assert table.lookup(date(2025, 1, 2), week) is None
+
+
+def test_table_add_merges_and_overrides():
+    table = FXRateTable()
+    table.add({date(2025, 1, 6): Decimal("0.8")})
+    table.add({date(2025, 1, 3): Decimal("0.9"), date(2025, 1, 6): Decimal("0.85")})
+    
+    assert table.dates == [date(2025, 1, 3), date(2025, 1, 6)]
+    assert table.rates == [Decimal("0.9"), Decimal("0.85")]
+
+
+async def test_cache_fetches_only_missing_days():
+    provider = RecordingProvider()
+    cache = FXRateCache(provider, lookback_days=3)
+    
+    # Preloading covers the lookback window of the first date too
+    await cache.preload("USD", "EUR", date(2025, 1, 4), date(2025, 1, 6))
+    assert provider.calls == [("USD", "EUR", date(2025, 1, 1), date(2025, 1, 6))]
+    
+    assert await cache.get_rate("USD", "EUR", date(2025, 1, 4)) == Decimal("0.9")
+    assert await cache.get_rate("USD", "EUR", date(2025, 1, 5)) == Decimal("0.9")
+    assert await cache.get_rate("USD", "EUR", date(2025, 1, 5)) == Decimal("0.9")
+    assert cache.provider_calls == 1
+    
+    # Extending the range fetches only the days outside it
+    assert await cache.get_rate("USD", "EUR", date(2025, 1, 8)) == Decimal("0.8")
+    await cache.preload("USD", "EUR", date(2025, 1, 1), date(2025, 1, 10))
+    assert provider.calls[1:] == [
+        ("USD", "EUR", date(2025, 1, 7), date(2025, 1, 8)),
+        ("USD", "EUR", date(2024, 12, 29), date(2024, 12, 31)),
+        ("USD", "EUR", date(2025, 1, 9), date(2025, 1, 10)),
+    ]
+    assert cache.provider_calls == 4
+    
+    cache.clear()
+    assert await cache.get_rate("USD", "EUR", date(2025, 1, 5)) == Decimal("0.9")
+    assert cache.provider_calls == 5
+
+
+async def test_cache_miss_and_same_currency():
+    provider = RecordingProvider()
+    cache = FXRateCache(provider, lookback_days=3)
+    
+    with pytest.raises(ExchangeRateNotFoundError) as info:
+        await cache.get_rate("USD", "EUR", date(2025, 1, 10))
+    assert (info.value.currency, info.value.quote_currency) == ("USD", "EUR")
+    assert info.value.on == date(2025, 1, 10)
+    with pytest.raises(ExchangeRateNotFoundError):
+        await cache.get_rate("GBP", "EUR", date(2025, 1, 3))
+    
+    assert await cache.get_rate("EUR", "EUR", date(2025, 1, 10)) == Decimal("1")
+    assert await cache.convert(Decimal("1.005"), "EUR", "EUR", date(2025, 1, 10)) == (
+        Decimal("1.005")
+    )
+    await cache.preload("EUR", "EUR", date(2025, 1, 1), date(2025, 1, 10))
+    assert len(provider.calls) == 2
+
+
+async def test_convert_rounds_to_quote_minor_unit():
+    cache = FXRateCache(RecordingProvider())
+    
+    assert await cache.convert(
+        Decimal("10.00"), "EUR", "JPY", date(2025, 1, 4)
+    ) == Decimal("1614")
+    assert await cache.convert(
+        Decimal("10.01"), "USD", "EUR", date(2025, 1, 6)
+    ) == Decimal("8.01")
+
+
+async def test_vat_report_in_reporting_currency(storage, manager_factory, make_invoice):
+    manager = manager_factory(storage)
+    row = InvoiceRow(
+        description="Consulting",
+        quantity=Decimal("1"),
+        unit_price=Decimal("100.10"),
+        vat_rate=Decimal("22"),
+    )
+    await manager.create_invoice("t1", make_invoice(rows=[row], issue_date=date(2025, 1, 2)))
+    await manager.create_invoice(
+        "t1",
+        make_invoice(rows=[row], currency="USD", issue_date=date(2025, 1, 4)),
+    )
+    await manager.create_invoice(
+        "t1",
+        make_invoice(rows=[row], currency="USD", issue_date=date(2025, 1, 6)),
+    )
+    provider = RecordingProvider()
+    reporting = ReportingService(storage, fx_rates=FXRateCache(provider))
+    
+    report = await reporting.generate_vat_report(
+        "t1", date(2025, 1, 1), date(2025, 1, 31), reporting_currency="EUR"
+    )
+    
+    # 100.10 + 22.02 VAT in EUR, at 0.9 (Saturday: Friday's rate) and at 0.8
+    assert report.currency == "EUR"
+    assert report.total_invoices == 3
+    assert report.total_taxable == Decimal("100.10") + Decimal("90.09") + Decimal("80.08")
+    assert report.total_vat == Decimal("22.02") + Decimal("19.82") + Decimal("17.62")
+    assert [(s.vat_rate, s.taxable_amount) for s in report.vat_by_rate] == [
+        (Decimal("22"), report.total_taxable)
+    ]
+    # The whole period is loaded with the first USD invoice
+    assert provider.calls == [("USD", "EUR", date(2024, 12, 25), date(2025, 1, 31))]
+    
+    with pytest.raises(ValueError):
+        await ReportingService(storage).generate_vat_report(
+            "t1", date(2025, 1, 1), date(2025, 1, 31), reporting_currency="EUR"
+        )
@@ -0,0 +1,64 @@
+"""Idempotent invoice creation and payments."""
+
+import asyncio
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from linkbay_billing import PaymentRecordCreate
+from linkbay_billing.exceptions import IdempotencyKeyReusedError
+
+
+async def test_retry_returns_first_invoice(manager, storage, make_invoice):
+    first = await manager.create_invoice("t1", make_invoice(idempotency_key="req-1"))
+    retry = await manager.create_invoice("t1", make_invoice(idempotency_key="req-1"))
+    
+    assert retry.id == first.id
+    assert retry.invoice_number == first.invoice_number
+    assert len(storage.invoices) == 1
+
+
+async def test_concurrent_retries_create_once(manager, storage, make_invoice):
+    responses = await asyncio.gather(
+        *(
+            manager.create_invoice("t1", make_invoice(idempotency_key="req-1"))
+            for _ in range(5)
+        )
+    )
+    
+    assert {response.id for response in responses} == {responses[0].id}
+    assert len(storage.invoices) == 1
+
+
+async def test_key_reused_with_other_payload(manager, make_invoice):
+    await manager.create_invoice("t1", make_invoice(idempotency_key="req-1"))
+    
+    with pytest.raises(IdempotencyKeyReusedError):
+        await manager.create_invoice(
+            "t1", make_invoice(idempotency_key="req-1", notes="different")
+        )
+
+
+async def test_keys_are_scoped_by_tenant(manager, storage, make_invoice):
+    await manager.create_invoice("t1", make_invoice(idempotency_key="req-1"))
+    await manager.create_invoice("t2", make_invoice(idempotency_key="req-1"))
+    
+    assert len(storage.invoices) == 2
+
+
+async def test_payment_retry_is_recorded_once(manager, storage, make_invoice):
+    invoice = await manager.create_invoice("t1", make_invoice())
+    payment = PaymentRecordCreate(
+        amount=Decimal("10.00"),
+        payment_date=date(2025, 2, 1),
+        payment_method="bank_transfer",
+        idempotency_key="pay-1",
+    )
+    
+    first = await manager.record_payment("t1", invoice.id, payment)
+    retry = await manager.record_payment("t1", invoice.id, payment)
+    
+    assert retry.id == first.id
+    assert len(storage.payments[invoice.id]) == 1
+    assert (await manager.get_invoice("t1", invoice.id)).amount_paid == Decimal("10.00")
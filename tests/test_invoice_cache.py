@@ -0,0 +1,75 @@
+"""Read-through invoice cache."""
+
+import asyncio
+
+from conftest import MemoryStorage
+
+from linkbay_billing import InvoiceUpdate, LocalInvoiceCache
+
+
+async def test_writes_invalidate_cached_record(manager, make_invoice):
+    invoice = await manager.create_invoice("t1", make_invoice())
+    await manager.get_invoice("t1", invoice.id)
+    
+    await manager.update_invoice("t1", invoice.id, InvoiceUpdate(notes="updated"))
+    
+    assert (await manager.get_invoice("t1", invoice.id)).notes == "updated"
+
+
+async def test_other_process_writes_are_stale_until_ttl(
+    storage, manager_factory, make_invoice
+):
+    reader = manager_factory(storage)
+    writer = manager_factory(storage)
+    invoice = await writer.create_invoice("t1", make_invoice())
+    await reader.get_invoice("t1", invoice.id)
+    
+    await writer.update_invoice("t1", invoice.id, InvoiceUpdate(notes="updated"))
+    
+    assert (await reader.get_invoice("t1", invoice.id)).notes is None
+    await reader.cache.clear()
+    assert (await reader.get_invoice("t1", invoice.id)).notes == "updated"
+
+
+async def test_disabled_cache_reads_storage(storage, manager_factory, make_invoice):
+    reader = manager_factory(storage, cache=LocalInvoiceCache(max_entries=0))
+    writer = manager_factory(storage)
+    invoice = await writer.create_invoice("t1", make_invoice())
+    await reader.get_invoice("t1", invoice.id)
+    
+    await writer.update_invoice("t1", invoice.id, InvoiceUpdate(notes="updated"))
+    
+    assert (await reader.get_invoice("t1", invoice.id)).notes == "updated"
+
+
+class GatedStorage(MemoryStorage):
+    """MemoryStorage whose next get_invoice pauses after reading the record."""
+    
+    def __init__(self):
+        super().__init__()
+        self.read_done = asyncio.Event()
+        self.release = None
+    
+    async def get_invoice(self, tenant_id, invoice_id):
+        record = await super().get_invoice(tenant_id, invoice_id)
+        if self.release is not None:
+            release, self.release = self.release, None
+            self.read_done.set()
+            await release.wait()
+        return record
+
+
+async def test_load_overlapping_update_is_not_cached(manager_factory, make_invoice):
+    storage = GatedStorage()
+    manager = manager_factory(storage)
+    invoice = await manager.create_invoice("t1", make_invoice())
+    storage.release = asyncio.Event()
+    release = storage.release
+    
+    load = asyncio.ensure_future(manager.get_invoice("t1", invoice.id))
+    await storage.read_done.wait()
+    await manager.update_invoice("t1", invoice.id, InvoiceUpdate(notes="updated"))
+    release.set()
+    
+    assert (await load).notes is None
+    assert (await manager.get_invoice("t1", invoice.id)).notes == "updated"
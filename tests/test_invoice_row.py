@@ -0,0 +1,97 @@
+"""Memoised InvoiceRow amounts."""
+
+from decimal import Decimal
+
+import pytest
+
+from linkbay_billing import InvoiceResponse, InvoiceRow
+
+CENT = Decimal("0.01")
+
+
+def recomputed(row):
+    """Amounts computed from the row fields, without the memo."""
+    subtotal = row.quantity * row.unit_price
+    if row.discount_percent > 0:
+        subtotal = subtotal * (1 - row.discount_percent / 100)
+    subtotal = subtotal.quantize(CENT)
+    vat = (subtotal * row.vat_rate / 100).quantize(CENT)
+    return subtotal, vat, (subtotal + vat).quantize(CENT)
+
+
+def amounts(row):
+    return row.calculate_subtotal(), row.calculate_vat(), row.calculate_total()
+
+
+ROWS = [
+    ("2", "10.005", "22", "0"),
+    ("3", "9.99", "22", "10"),
+    ("0.333", "3", "4", "0"),
+    ("1", "-12.345", "10", "0"),
+    ("7", "1.4285", "5", "33.333"),
+    ("0", "100", "22", "0"),
+]
+
+
+@pytest.mark.parametrize("quantity,unit_price,vat_rate,discount", ROWS)
+def test_memoised_amounts_equal_recomputed(quantity, unit_price, vat_rate, discount):
+    row = InvoiceRow(
+        description="Item",
+        quantity=Decimal(quantity),
+        unit_price=Decimal(unit_price),
+        vat_rate=Decimal(vat_rate),
+        discount_percent=Decimal(discount),
+    )
+    
+    assert amounts(row) == recomputed(row)
+    # Second read comes from the memo
+    assert amounts(row) == recomputed(row)
+    assert (row.subtotal, row.vat_amount, row.total) == recomputed(row)
+
+
+def test_field_changes_recompute():
+    row = InvoiceRow(
+        description="Item",
+        quantity=Decimal("2"),
+        unit_price=Decimal("10"),
+        vat_rate=Decimal("22"),
+    )
+    assert row.total == Decimal("24.40")
+    
+    row.quantity = Decimal("3")
+    assert amounts(row) == recomputed(row) == (
+        Decimal("30.00"), Decimal("6.60"), Decimal("36.60")
+    )
+    
+    row.discount_percent = Decimal("50")
+    assert amounts(row) == recomputed(row)
+    
+    copy = row.model_copy(update={"vat_rate": Decimal("4")})
+    assert amounts(copy) == recomputed(copy)
+    assert amounts(row) == recomputed(row)
+
+
+def test_amounts_are_serialised():
+    row = InvoiceRow(
+        description="Item",
+        quantity=Decimal("3"),
+        unit_price=Decimal("9.99"),
+        vat_rate=Decimal("22"),
+        discount_percent=Decimal("10"),
+    )
+    data = row.model_dump()
+    
+    assert (data["subtotal"], data["vat_amount"], data["total"]) == recomputed(row)
+    assert amounts(InvoiceRow(**data)) == recomputed(row)
+
+
+async def test_trusted_rows_reuse_stored_amounts(storage, manager_factory, make_invoice):
+    manager = manager_factory(storage)
+    invoice = await manager.create_invoice("t1", make_invoice())
+    record = storage.invoices[invoice.id]
+    
+    row = InvoiceResponse.from_trusted(record).rows[0]
+    
+    assert amounts(row) == recomputed(row)
+    row.unit_price = Decimal("20")
+    assert amounts(row) == recomputed(row)
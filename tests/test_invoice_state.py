@@ -0,0 +1,121 @@
+"""Invoice status state machine and conditional status writes."""
+
+import pytest
+from conftest import ConditionalStorage, MemoryStorage
+
+from linkbay_billing import InvoiceUpdate
+from linkbay_billing.exceptions import InvalidStatusTransitionError
+from linkbay_billing.services.invoice_state import can_transition, check_transition
+
+
+def test_transition_table():
+    assert can_transition("issued", "sent")
+    assert can_transition("sent", "sent")
+    assert not can_transition("canceled", "sent")
+    assert not can_transition("paid", "overdue")
+    
+    with pytest.raises(InvalidStatusTransitionError):
+        check_transition("inv_1", "refunded", "paid")
+
+
+@pytest.mark.parametrize("storage_class", [MemoryStorage, ConditionalStorage])
+async def test_mark_as_sent(manager_factory, make_invoice, storage_class):
+    storage = storage_class()
+    manager = manager_factory(storage)
+    invoice = await manager.create_invoice("t1", make_invoice())
+    
+    sent = await manager.mark_as_sent("t1", invoice.id)
+    
+    assert sent.status == "sent"
+    assert storage.invoices[invoice.id]["status"] == "sent"
+
+
+@pytest.mark.parametrize("storage_class", [MemoryStorage, ConditionalStorage])
+async def test_illegal_transition_rejected(manager_factory, make_invoice, storage_class):
+    storage = storage_class()
+    manager = manager_factory(storage)
+    invoice = await manager.create_invoice("t1", make_invoice())
+    await manager.cancel_invoice("t1", invoice.id)
+    
+    with pytest.raises(InvalidStatusTransitionError):
+        await manager.mark_as_sent("t1", invoice.id)
+    assert storage.invoices[invoice.id]["status"] == "canceled"
+
+
+@pytest.mark.parametrize("storage_class", [MemoryStorage, ConditionalStorage])
+async def test_expected_status_mismatch(manager_factory, make_invoice, storage_class):
+    storage = storage_class()
+    manager = manager_factory(storage)
+    invoice = await manager.create_invoice("t1", make_invoice())
+    await manager.mark_as_sent("t1", invoice.id)
+    
+    with pytest.raises(InvalidStatusTransitionError):
+        await manager.mark_as_sent("t1", invoice.id, expected_status="issued")
+
+
+@pytest.mark.parametrize("storage_class", [MemoryStorage, ConditionalStorage])
+async def test_batch_mark_as_sent_mixed_states(manager_factory, make_invoice, storage_class):
+    storage = storage_class()
+    manager = manager_factory(storage)
+    issued = await manager.create_invoice("t1", make_invoice())
+    canceled = await manager.create_invoice("t1", make_invoice())
+    await manager.cancel_invoice("t1", canceled.id)
+    
+    result = await manager.mark_invoices_as_sent(
+        "t1", [issued.id, canceled.id, "missing", issued.id], batch_size=2
+    )
+    
+    assert (result.updated, result.failed) == (1, 2)
+    assert [r.invoice_id for r in result.results] == [issued.id, canceled.id, "missing"]
+    assert result.results[0].invoice.status == "sent"
+    assert result.results[1].error and result.results[2].error
+    assert storage.invoices[canceled.id]["status"] == "canceled"
+
+
+@pytest.mark.parametrize("storage_class", [MemoryStorage, ConditionalStorage])
+async def test_batch_expected_status(manager_factory, make_invoice, storage_class):
+    storage = storage_class()
+    manager = manager_factory(storage)
+    issued = await manager.create_invoice("t1", make_invoice())
+    sent = await manager.create_invoice("t1", make_invoice())
+    await manager.mark_as_sent("t1", sent.id)
+    version = storage.invoices[sent.id]["version"]
+    
+    result = await manager.mark_invoices_as_sent(
+        "t1", [issued.id, sent.id], expected_status="issued"
+    )
+    
+    assert [r.invoice is not None for r in result.results] == [True, False]
+    assert storage.invoices[sent.id]["version"] == version
+
+
+@pytest.mark.parametrize("storage_class", [MemoryStorage, ConditionalStorage])
+async def test_batch_cancel_rejects_paid(manager_factory, make_invoice, storage_class):
+    storage = storage_class()
+    manager = manager_factory(storage)
+    open_invoice = await manager.create_invoice("t1", make_invoice())
+    paid = await manager.create_invoice("t1", make_invoice())
+    await manager.update_invoice("t1", paid.id, InvoiceUpdate(status="paid"))
+    
+    result = await manager.cancel_invoices("t1", [open_invoice.id, paid.id], reason="dup")
+    
+    assert (result.updated, result.failed) == (1, 1)
+    assert storage.invoices[open_invoice.id]["status"] == "canceled"
+    assert storage.invoices[paid.id]["status"] == "paid"
+
+
+@pytest.mark.parametrize("storage_class", [MemoryStorage, ConditionalStorage])
+async def test_batch_update_illegal_status(manager_factory, make_invoice, storage_class):
+    storage = storage_class()
+    manager = manager_factory(storage)
+    issued = await manager.create_invoice("t1", make_invoice())
+    canceled = await manager.create_invoice("t1", make_invoice())
+    await manager.cancel_invoice("t1", canceled.id)
+    
+    result = await manager.update_invoices(
+        "t1", [issued.id, canceled.id], InvoiceUpdate(status="sent", notes="batch")
+    )
+    
+    assert [r.invoice is not None for r in result.results] == [True, False]
+    assert storage.invoices[issued.id]["notes"] == "batch"
+    assert storage.invoices[canceled.id].get("notes") != "batch"
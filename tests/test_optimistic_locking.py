@@ -0,0 +1,72 @@
+"""Versioned invoice updates."""
+
+import pytest
+from conftest import ConditionalStorage, MemoryStorage
+
+from linkbay_billing import InvoiceUpdate
+from linkbay_billing.exceptions import InvoiceConflictError
+
+
+class RacingStorage(ConditionalStorage):
+    """Another writer changes the invoice before each of the first writes."""
+    
+    def __init__(self, races: int):
+        super().__init__()
+        self.races = races
+    
+    async def compare_and_set_invoice(self, tenant_id, invoice_id, expected, updates):
+        if self.races:
+            self.races -= 1
+            await self.update_invoice(tenant_id, invoice_id, {"notes": "other writer"})
+        return await super().compare_and_set_invoice(
+            tenant_id, invoice_id, expected, updates
+        )
+
+
+@pytest.mark.parametrize("storage_class", [MemoryStorage, ConditionalStorage])
+async def test_update_bumps_version(manager_factory, make_invoice, storage_class):
+    storage = storage_class()
+    manager = manager_factory(storage)
+    invoice = await manager.create_invoice("t1", make_invoice())
+    
+    updated = await manager.update_invoice(
+        "t1", invoice.id, InvoiceUpdate(notes="paid by wire"), expected_version=1
+    )
+    
+    assert updated.notes == "paid by wire"
+    assert updated.version == 2
+
+
+@pytest.mark.parametrize("storage_class", [MemoryStorage, ConditionalStorage])
+async def test_stale_expected_version(manager_factory, make_invoice, storage_class):
+    storage = storage_class()
+    manager = manager_factory(storage)
+    invoice = await manager.create_invoice("t1", make_invoice())
+    await manager.update_invoice("t1", invoice.id, InvoiceUpdate(notes="first"))
+    
+    with pytest.raises(InvoiceConflictError):
+        await manager.update_invoice(
+            "t1", invoice.id, InvoiceUpdate(notes="second"), expected_version=1
+        )
+    assert storage.invoices[invoice.id]["notes"] == "first"
+
+
+async def test_concurrent_change_is_retried(manager_factory, make_invoice):
+    storage = RacingStorage(races=1)
+    manager = manager_factory(storage)
+    invoice = await manager.create_invoice("t1", make_invoice())
+    
+    updated = await manager.update_invoice("t1", invoice.id, InvoiceUpdate(notes="mine"))
+    
+    assert updated.notes == "mine"
+    assert updated.version == 3
+
+
+async def test_conflict_after_max_attempts(manager_factory, make_invoice):
+    storage = RacingStorage(races=10)
+    manager = manager_factory(storage, max_write_attempts=3)
+    invoice = await manager.create_invoice("t1", make_invoice())
+    
+    with pytest.raises(InvoiceConflictError):
+        await manager.update_invoice("t1", invoice.id, InvoiceUpdate(notes="mine"))
+    assert storage.races == 7
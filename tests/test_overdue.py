@@ -0,0 +1,71 @@
+"""Overdue sweep."""
+
+import copy
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from conftest import ConditionalStorage, MemoryStorage
+
+from linkbay_billing import PaymentInfo, PaymentRecordCreate
+
+
+def stale_scan(storage_class):
+    """Storage class whose listings return a snapshot taken earlier."""
+    
+    class StaleScanStorage(storage_class):
+        snapshot = None
+        
+        async def list_invoices(self, tenant_id, skip=0, limit=100, filters=None):
+            if self.snapshot is None:
+                return await super().list_invoices(tenant_id, skip, limit, filters)
+            records = copy.deepcopy(self.snapshot)
+            return records[skip:] if limit is None else records[skip:skip + limit]
+    
+    return StaleScanStorage
+
+
+def due(make_invoice, due_date=date(2025, 2, 1)):
+    return make_invoice(
+        payment_info=PaymentInfo(method="bank_transfer", terms="net_30", due_date=due_date)
+    )
+
+
+@pytest.mark.parametrize("storage_class", [MemoryStorage, ConditionalStorage])
+async def test_marks_past_due_invoices(manager_factory, make_invoice, storage_class):
+    storage = storage_class()
+    manager = manager_factory(storage)
+    past_due = await manager.create_invoice("t1", due(make_invoice))
+    not_due = await manager.create_invoice("t1", due(make_invoice, date(2025, 4, 1)))
+    
+    result = await manager.mark_overdue("t1", as_of=date(2025, 3, 1))
+    
+    assert (result.marked, result.failed) == (1, 0)
+    assert storage.invoices[past_due.id]["status"] == "overdue"
+    assert storage.invoices[not_due.id]["status"] == "issued"
+
+
+@pytest.mark.parametrize("storage_class", [MemoryStorage, ConditionalStorage])
+async def test_invoices_paid_since_the_scan_are_skipped(
+    manager_factory, make_invoice, storage_class
+):
+    storage = stale_scan(storage_class)()
+    manager = manager_factory(storage)
+    paid = await manager.create_invoice("t1", due(make_invoice))
+    unpaid = await manager.create_invoice("t1", due(make_invoice))
+    storage.snapshot = list(storage.invoices.values())
+    await manager.record_payment(
+        "t1",
+        paid.id,
+        PaymentRecordCreate(
+            amount=Decimal("24.41"),
+            payment_date=date(2025, 2, 20),
+            payment_method="bank_transfer",
+        ),
+    )
+    
+    result = await manager.mark_overdue("t1", as_of=date(2025, 3, 1))
+    
+    assert result.marked == 1
+    assert storage.invoices[paid.id]["status"] == "paid"
+    assert storage.invoices[unpaid.id]["status"] == "overdue"
@@ -0,0 +1,87 @@
+"""Cursor pagination and invoice iteration."""
+
+from datetime import date
+
+import pytest
+from conftest import MemoryStorage
+
+from linkbay_billing import InvalidInvoiceDataError
+from linkbay_billing.services.pagination import iter_storage_invoices
+
+
+class KeysetStorage(MemoryStorage):
+    """Storage listing invoices after an (issue_date, id) key."""
+    
+    async def list_invoices_after(self, tenant_id, after=None, limit=100, filters=None):
+        records = sorted(
+            await self.list_invoices(tenant_id, 0, None, filters),
+            key=lambda record: (record["issue_date"], record["id"]),
+        )
+        if after is not None:
+            key = (after["issue_date"], after["id"])
+            records = [
+                record for record in records
+                if (record["issue_date"], record["id"]) > key
+            ]
+        return records[:limit]
+
+
+@pytest.mark.parametrize("storage_class", [MemoryStorage, KeysetStorage])
+async def test_cursor_pages_cover_all_invoices(manager_factory, make_invoice, storage_class):
+    manager = manager_factory(storage_class())
+    created = [
+        await manager.create_invoice("t1", make_invoice(issue_date=date(2025, 1, day)))
+        for day in range(1, 6)
+    ]
+    
+    seen = []
+    cursor = None
+    while True:
+        page = await manager.list_invoices_page("t1", limit=2, cursor=cursor)
+        seen.extend(invoice.id for invoice in page.invoices)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    
+    assert seen == [invoice.id for invoice in created]
+
+
+@pytest.mark.parametrize("storage_class", [MemoryStorage, KeysetStorage])
+async def test_page_limit_must_be_positive(manager_factory, make_invoice, storage_class):
+    manager = manager_factory(storage_class())
+    await manager.create_invoice("t1", make_invoice())
+    
+    with pytest.raises(InvalidInvoiceDataError):
+        await manager.list_invoices_page("t1", limit=0)
+
+
+class StreamingStorage(MemoryStorage):
+    """Storage streaming invoices from a cursor."""
+    
+    def __init__(self):
+        super().__init__()
+        self.streams = 0
+    
+    async def stream_invoices(self, tenant_id, filters=None, batch_size=1000):
+        self.streams += 1
+        for record in await self.list_invoices(tenant_id, 0, None, filters):
+            yield record
+
+
+@pytest.mark.parametrize("storage_class", [MemoryStorage, StreamingStorage])
+async def test_iter_storage_invoices(manager_factory, make_invoice, storage_class):
+    storage = storage_class()
+    manager = manager_factory(storage)
+    created = [await manager.create_invoice("t1", make_invoice()) for _ in range(5)]
+    await manager.cancel_invoice("t1", created[0].id)
+    
+    ids = [
+        record["id"]
+        async for record in iter_storage_invoices(
+            storage, "t1", {"status": "issued"}, page_size=2
+        )
+    ]
+    
+    assert ids == [invoice.id for invoice in created[1:]]
+    if storage_class is StreamingStorage:
+        assert storage.streams == 1
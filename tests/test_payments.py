@@ -0,0 +1,59 @@
+"""Payments and the running amount_paid."""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from conftest import MemoryStorage
+
+from linkbay_billing import PaymentRecordCreate
+from linkbay_billing.exceptions import PaymentAmountError
+
+
+class LedgerStorage(MemoryStorage):
+    """Storage inserting payments and bumping amount_paid together."""
+    
+    def __init__(self):
+        super().__init__()
+        self.applied = 0
+    
+    async def apply_payment(self, tenant_id, invoice_id, payment_data):
+        self.applied += 1
+        payment = await self.record_payment(tenant_id, invoice_id, payment_data)
+        record = self.invoices[invoice_id]
+        record["amount_paid"] = record.get("amount_paid", Decimal("0")) + payment_data["amount"]
+        return {"payment": payment, "invoice": dict(record)}
+
+
+def payment(amount: str) -> PaymentRecordCreate:
+    return PaymentRecordCreate(
+        amount=Decimal(amount),
+        payment_date=date(2025, 2, 1),
+        payment_method="bank_transfer",
+    )
+
+
+@pytest.mark.parametrize("storage_class", [MemoryStorage, LedgerStorage])
+async def test_payments_update_status(manager_factory, make_invoice, storage_class):
+    storage = storage_class()
+    manager = manager_factory(storage)
+    invoice = await manager.create_invoice("t1", make_invoice())
+    
+    await manager.record_payment("t1", invoice.id, payment("10.00"))
+    partially_paid = await manager.get_invoice("t1", invoice.id)
+    await manager.record_payment("t1", invoice.id, payment("14.41"))
+    paid = await manager.get_invoice("t1", invoice.id)
+    
+    assert (partially_paid.status, partially_paid.amount_paid) == (
+        "partially_paid", Decimal("10.00"),
+    )
+    assert (paid.status, paid.amount_paid) == ("paid", Decimal("24.41"))
+    if storage_class is LedgerStorage:
+        assert storage.applied == 2
+
+
+async def test_overpayment_rejected(manager, make_invoice):
+    invoice = await manager.create_invoice("t1", make_invoice())
+    
+    with pytest.raises(PaymentAmountError):
+        await manager.record_payment("t1", invoice.id, payment("30.00"))
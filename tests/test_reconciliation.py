@@ -0,0 +1,52 @@
+"""Bank statement matching."""
+
+from datetime import date
+from decimal import Decimal
+
+from linkbay_billing import ReconciliationService, StatementEntry
+
+
+def entry(amount: str, reference=None, counterparty=None) -> StatementEntry:
+    return StatementEntry(
+        line=1,
+        amount=Decimal(amount),
+        booking_date=date(2025, 2, 1),
+        reference=reference,
+        counterparty_name=counterparty,
+    )
+
+
+async def reconcile(manager, *entries):
+    return await ReconciliationService(manager).reconcile("t1", list(entries))
+
+
+async def test_reference_match_applies_payment(manager, make_invoice):
+    invoice = await manager.create_invoice("t1", make_invoice())
+    
+    report = await reconcile(manager, entry("24.41", f"Payment {invoice.invoice_number}"))
+    
+    assert report.matched == 1
+    assert (await manager.get_invoice("t1", invoice.id)).status == "paid"
+
+
+async def test_amount_and_counterparty_match_applies_payment(manager, make_invoice):
+    invoice = await manager.create_invoice("t1", make_invoice())
+    
+    report = await reconcile(manager, entry("24.41", counterparty="MARIO ROSSI"))
+    
+    assert report.matched == 1
+    assert (await manager.get_invoice("t1", invoice.id)).status == "paid"
+
+
+async def test_amount_only_goes_to_review(manager, make_invoice):
+    invoice = await manager.create_invoice("t1", make_invoice())
+    
+    report = await reconcile(
+        manager,
+        entry("24.41"),
+        entry("24.41", counterparty="Someone Else Ltd"),
+    )
+    
+    assert (report.matched, report.ambiguous) == (0, 2)
+    assert report.lines[0].candidate_invoice_ids == [invoice.id]
+    assert (await manager.get_invoice("t1", invoice.id)).status == "issued"
@@ -0,0 +1,55 @@
+"""Invoice responses built from stored records."""
+
+from decimal import Decimal
+
+import pytest
+
+from linkbay_billing import InvoiceResponse, InvoiceRow
+
+
+async def test_trusted_and_validated_responses_are_equal(
+    storage, manager_factory, make_invoice
+):
+    rows = [
+        InvoiceRow(
+            description="Hosting",
+            quantity=Decimal("3"),
+            unit_price=Decimal("9.99"),
+            vat_rate=Decimal("22"),
+            discount_percent=Decimal("10"),
+        ),
+        InvoiceRow(
+            description="Books",
+            quantity=Decimal("1"),
+            unit_price=Decimal("15.50"),
+            vat_rate=Decimal("4"),
+        ),
+    ]
+    manager = manager_factory(storage)
+    invoice = await manager.create_invoice(
+        "t1", make_invoice(rows=rows, metadata={"order": "A-1"})
+    )
+    record = storage.invoices[invoice.id]
+    
+    trusted = InvoiceResponse.from_trusted(record)
+    validated = InvoiceResponse(**record)
+    
+    assert trusted.model_dump() == validated.model_dump()
+    assert [row.total for row in trusted.rows] == [row.total for row in validated.rows]
+
+
+@pytest.mark.parametrize("trusted_storage", [False, True])
+async def test_mutating_a_response_does_not_alter_the_cache(
+    storage, manager_factory, make_invoice, trusted_storage
+):
+    manager = manager_factory(storage, trusted_storage=trusted_storage)
+    invoice = await manager.create_invoice("t1", make_invoice(metadata={"order": "A-1"}))
+    
+    first = await manager.get_invoice("t1", invoice.id)
+    first.metadata["order"] = "changed"
+    first.rows.clear()
+    second = await manager.get_invoice("t1", invoice.id)
+    
+    assert manager.cache.stats()["hits"] == 1
+    assert second.metadata == {"order": "A-1"}
+    assert len(second.rows) == 1
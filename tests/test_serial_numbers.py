@@ -0,0 +1,104 @@
+"""Serial number generation."""
+
+from datetime import datetime
+
+import pytest
+from conftest import MemoryStorage
+
+from linkbay_billing.exceptions import SerialNumberError
+from linkbay_billing.services.serial_allocator import SerialAllocator
+from linkbay_billing.services.serial_generator import SerialNumberGenerator
+
+
+class BlockStorage(MemoryStorage):
+    """Storage with an atomic serial counter (hi-lo blocks)."""
+    
+    def __init__(self):
+        super().__init__()
+        self.counters = {}
+        self.released = []
+    
+    async def reserve_serial_block(self, tenant_id, year, series=None, size=1):
+        key = (tenant_id, year, series)
+        first = self.counters.get(key, 0) + 1
+        self.counters[key] = first + size - 1
+        return first
+    
+    async def release_serial_block(self, tenant_id, year, series, start, end):
+        self.released.append((start, end))
+
+
+DATE = datetime(2025, 3, 1)
+
+
+async def test_hi_lo_blocks():
+    storage = BlockStorage()
+    generator = SerialNumberGenerator(storage, block_size=10)
+    
+    numbers = [await generator.generate_number("t1", "invoice", DATE) for _ in range(3)]
+    
+    assert numbers == ["TENANT-2025-000001", "TENANT-2025-000002", "TENANT-2025-000003"]
+    assert storage.counters[("t1", 2025, None)] == 10
+    assert await generator.release_unused_serials() == {("t1", 2025, None): (4, 10)}
+    assert storage.released == [(4, 10)]
+
+
+async def test_hi_lo_requires_block_reservation(storage):
+    generator = SerialNumberGenerator(storage, block_size=10)
+    
+    with pytest.raises(SerialNumberError):
+        await generator.generate_number("t1", "invoice", DATE)
+
+
+class CASStorage(MemoryStorage):
+    """Storage with a compare-and-set serial counter."""
+    
+    def __init__(self):
+        super().__init__()
+        self.counter = None
+    
+    async def get_last_serial_number(self, tenant_id, year, series=None):
+        return self.counter
+    
+    async def compare_and_set_serial(self, tenant_id, year, series, expected, new):
+        if self.counter != expected:
+            return False
+        self.counter = new
+        return True
+
+
+async def test_partial_commit_gives_back_tail():
+    storage = CASStorage()
+    generator = SerialNumberGenerator(
+        storage, allocator=SerialAllocator(storage, use_compare_and_set=True)
+    )
+    
+    reservation = await generator.reserve_numbers(
+        "t1", [("invoice", DATE)] * 5
+    )
+    assert storage.counter == 5
+    await generator.commit_numbers(reservation, 2)
+    
+    assert storage.counter == 2
+    assert await generator.generate_number("t1", "invoice", DATE) == "TENANT-2025-000003"
+
+
+async def test_hi_lo_partial_commit_returns_serials_to_block():
+    storage = BlockStorage()
+    generator = SerialNumberGenerator(storage, block_size=10)
+    
+    reservation = await generator.reserve_numbers("t1", [("invoice", DATE)] * 4)
+    await generator.commit_numbers(reservation, 1)
+    
+    assert await generator.generate_number("t1", "invoice", DATE) == "TENANT-2025-000002"
+    assert storage.released == []
+
+
+async def test_reserve_numbers_rejects_mixed_years(storage):
+    generator = SerialNumberGenerator(storage)
+    
+    with pytest.raises(ValueError):
+        await generator.reserve_numbers(
+            "t1", [("invoice", DATE), ("invoice", datetime(2026, 1, 1))]
+        )
+
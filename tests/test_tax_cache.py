@@ -0,0 +1,55 @@
+"""Tax result cache."""
+
+from decimal import Decimal
+
+from linkbay_billing import InvoiceRow, TaxResultCache
+from linkbay_billing.services.vat_calculator import VATCalculator
+
+
+def rows():
+    return [
+        InvoiceRow(
+            description="Item",
+            quantity=Decimal("2"),
+            unit_price=Decimal("10.005"),
+            vat_rate=Decimal("22"),
+        ),
+    ]
+
+
+def test_equal_inputs_share_one_calculation():
+    cache = TaxResultCache()
+    calculator = VATCalculator(cache=cache)
+    
+    first = calculator.calculate(rows())
+    second = calculator.calculate(rows())
+    
+    assert first == second
+    assert (cache.hits, cache.misses, len(cache)) == (1, 1, 1)
+
+
+def test_returned_results_are_copies():
+    cache = TaxResultCache()
+    calculator = VATCalculator(cache=cache)
+    
+    first = calculator.calculate(rows())
+    expected = first.model_dump()
+    first.total = Decimal("0")
+    first.vat_summaries[0].vat_amount = Decimal("0")
+    first.vat_summaries.append(first.vat_summaries[0])
+    
+    second = calculator.calculate(rows())
+    assert second.model_dump() == expected
+    second.vat_summaries[0].taxable_amount = Decimal("1")
+    assert calculator.calculate(rows()).model_dump() == expected
+
+
+def test_calculate_many_duplicates_are_copies(make_invoice):
+    calculator = VATCalculator(cache=TaxResultCache())
+    invoices = [make_invoice(), make_invoice()]
+    
+    first, second = calculator.calculate_many(invoices)
+    assert first == second
+    
+    first.vat_summaries[0].vat_amount = Decimal("0")
+    assert second.vat_summaries[0].vat_amount == Decimal("4.40")
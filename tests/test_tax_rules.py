@@ -0,0 +1,94 @@
+"""Per-country VAT rule tables."""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from linkbay_billing import InvoiceRow, TaxCalculationError, TaxRuleEngine
+from linkbay_billing.services.tax_rules import DEFAULT_TAX_RULES, TaxRuleSet
+
+
+def row(vat_rate, vat_nature=None):
+    return InvoiceRow(
+        description="Item",
+        quantity=Decimal("1"),
+        unit_price=Decimal("10"),
+        vat_rate=Decimal(vat_rate),
+        vat_nature=vat_nature,
+    )
+
+
+PERIODS = {
+    "XX": [
+        {"standard": 20, "valid_from": date(2024, 8, 1)},
+        {"standard": 18, "valid_from": date(2024, 1, 1), "valid_to": date(2024, 6, 30)},
+    ]
+}
+
+
+@pytest.mark.parametrize(
+    "tables",
+    [
+        [
+            {"standard": 20, "valid_to": date(2024, 12, 31)},
+            {"standard": 22, "valid_from": date(2024, 12, 31)},
+        ],
+        [{"standard": 20}, {"standard": 22, "valid_from": date(2025, 1, 1)}],
+    ],
+)
+def test_overlapping_periods_rejected(tables):
+    with pytest.raises(ValueError, match="Overlapping"):
+        TaxRuleSet({"XX": tables})
+
+
+@pytest.mark.parametrize(
+    "on, standard",
+    [
+        (date(2023, 12, 31), None),
+        (date(2024, 1, 1), Decimal("18")),
+        (date(2024, 6, 30), Decimal("18")),
+        (date(2024, 7, 1), None),  # Gap after valid_to
+        (date(2024, 7, 31), None),
+        (date(2024, 8, 1), Decimal("20")),
+        (date(2099, 1, 1), Decimal("20")),
+    ],
+)
+def test_period_lookup_at_boundaries(on, standard):
+    period = TaxRuleSet(PERIODS).period("XX", on)
+    
+    if standard is None:
+        assert period is None
+    else:
+        assert period.categories[standard] == "standard"
+
+
+def test_check_rows_classifies_and_rejects():
+    assert DEFAULT_TAX_RULES.check_rows("IT", [row("22"), row("4"), row("0", "N2.2")]) == [
+        "standard",
+        "reduced",
+        "zero",
+    ]
+    assert DEFAULT_TAX_RULES.check_rows("US", [row("7")]) == [None]
+    
+    with pytest.raises(TaxCalculationError, match="VAT rate 7%"):
+        DEFAULT_TAX_RULES.check_rows("IT", [row("22"), row("7")])
+    with pytest.raises(TaxCalculationError, match="nature N9"):
+        DEFAULT_TAX_RULES.check_rows("IT", [row("0", "N9")])
+    with pytest.raises(TaxCalculationError, match="no VAT rates in force"):
+        TaxRuleSet(PERIODS).check_rows("XX", [row("20")], date(2024, 7, 15))
+
+
+def test_reload_keeps_active_rules_when_malformed():
+    engine = TaxRuleEngine()
+    active = engine.current
+    
+    with pytest.raises(ValueError):
+        engine.reload({"IT": {"reduced": [10]}})
+    with pytest.raises(ValueError):
+        engine.reload({**PERIODS, "YY": [{"standard": 20}, {"standard": 21}]})
+    assert engine.current is active
+    
+    reloaded = engine.reload(PERIODS)
+    assert engine.current is reloaded
+    assert "IT" not in engine.current
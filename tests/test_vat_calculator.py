@@ -0,0 +1,147 @@
+"""VATCalculator engines."""
+
+import random
+import re
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from linkbay_billing import (
+    InvoiceRow,
+    RetentionInfo,
+    TaxCalculationError,
+    TaxResultCache,
+    TaxRuleEngine,
+)
+from linkbay_billing.services.vat_calculator import VATCalculator
+
+
+def row(quantity, unit_price, vat_rate="22", discount="0"):
+    return InvoiceRow(
+        description="Item",
+        quantity=Decimal(quantity),
+        unit_price=Decimal(unit_price),
+        vat_rate=Decimal(vat_rate),
+        discount_percent=Decimal(discount),
+    )
+
+
+def serialised(result):
+    """JSON of a result, which also compares the exponents of amounts."""
+    # Negative amounts at 0% give Decimal("-0.00"), integers have no signed zero
+    return re.sub(r'"-(0(\.0+)?)"', r'"\1"', result.model_dump_json())
+
+
+CASES = [
+    # Half-even ties on the row subtotal and on VAT
+    {"rows": [row("1", "0.005"), row("1", "0.015"), row("1", "0.025")]},
+    {"rows": [row("1", "0.125", "10")]},
+    {"rows": [row("3", "0.335", "22", "10")]},
+    {"rows": [row("0.333", "3", "4"), row("7", "1.4285", "5")]},
+    # Negative prices (discount lines)
+    {"rows": [row("1", "100"), row("1", "-12.345")]},
+    {"rows": [row("2", "10.005")], "social_security_rate": Decimal("4")},
+    {"rows": [row("5", "19.99"), row("2", "7.5", "10")], "split_payment": True},
+    {
+        "rows": [row("10", "100", "22", "12.5")],
+        "retention": RetentionInfo(rate=Decimal("20"), amount=Decimal("0")),
+        "stamp_duty": True,
+    },
+    {"rows": [row("1", "77.47", "0")], "stamp_duty": True},
+    {"rows": [row("3", "333.5"), row("1", "0.5", "10")], "currency": "JPY"},
+    {"rows": [], "stamp_duty": True},
+]
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_integer_engine_matches_decimal(case):
+    expected = VATCalculator().calculate(**case)
+    result = VATCalculator(engine="integer").calculate(**case)
+    
+    assert serialised(result) == serialised(expected)
+
+
+def test_integer_engine_matches_decimal_on_random_rows():
+    rng = random.Random(17)
+    decimal_engine = VATCalculator()
+    integer_engine = VATCalculator(engine="integer")
+    
+    for _ in range(200):
+        rows = [
+            row(
+                str(Decimal(rng.randint(1, 5000)).scaleb(-rng.randint(0, 3))),
+                str(Decimal(rng.randint(-500, 100000)).scaleb(-rng.randint(0, 4))),
+                rng.choice(["0", "4", "5", "10", "22"]),
+                rng.choice(["0", "0", "5", "12.5", "33.333"]),
+            )
+            for _ in range(rng.randint(1, 6))
+        ]
+        options = {
+            "social_security_rate": rng.choice([None, Decimal("4")]),
+            "split_payment": rng.random() < 0.2,
+            "currency": rng.choice([None, "EUR", "JPY"]),
+        }
+        
+        result = integer_engine.calculate(rows, **options)
+        expected = decimal_engine.calculate(rows, **options)
+        assert serialised(result) == serialised(expected)
+
+
+def test_unknown_engine_rejected():
+    with pytest.raises(ValueError):
+        VATCalculator(engine="float")
+
+
+def invoice(case, country="IT", issue_date=date(2025, 1, 10)):
+    """Invoice-like input of calculate_many for a calculate() case."""
+    return SimpleNamespace(
+        rows=case["rows"],
+        retention=case.get("retention"),
+        social_security_rate=case.get("social_security_rate"),
+        stamp_duty=case.get("stamp_duty", False),
+        split_payment=case.get("split_payment", False),
+        currency=case.get("currency"),
+        issue_date=issue_date,
+        company=SimpleNamespace(address=SimpleNamespace(country=country)),
+    )
+
+
+@pytest.mark.parametrize("engine", ["decimal", "integer"])
+def test_calculate_many_matches_calculate(engine):
+    calculator = VATCalculator(engine=engine)
+    
+    results = calculator.calculate_many([invoice(case) for case in CASES])
+    
+    assert [serialised(result) for result in results] == [
+        serialised(calculator.calculate(**case)) for case in CASES
+    ]
+
+
+def test_calculate_many_results_do_not_depend_on_cache_order():
+    expected = [serialised(VATCalculator().calculate(**case)) for case in CASES]
+    
+    calculator = VATCalculator(cache=TaxResultCache())
+    singles = [serialised(calculator.calculate(**case)) for case in CASES]
+    batch = calculator.calculate_many([invoice(case) for case in CASES])
+    
+    reversed_calculator = VATCalculator(cache=TaxResultCache())
+    reversed_batch = reversed_calculator.calculate_many([invoice(case) for case in CASES])
+    reversed_singles = [
+        serialised(reversed_calculator.calculate(**case)) for case in CASES
+    ]
+    
+    assert singles == reversed_singles == expected
+    assert [serialised(result) for result in batch] == expected
+    assert [serialised(result) for result in reversed_batch] == expected
+
+
+def test_calculate_many_checks_rates_of_each_company_country():
+    calculator = VATCalculator(rules=TaxRuleEngine())
+    case = {"rows": [row("1", "100", "19")]}
+    
+    result, = calculator.calculate_many([invoice(case, country="DE")])
+    assert result.total_vat == Decimal("19.00")
+    with pytest.raises(TaxCalculationError):
+        calculator.calculate_many([invoice(case, country="DE"), invoice(case)])
@@ -0,0 +1,144 @@
+"""Offline VAT number and codice fiscale checks."""
+
+import pytest
+from conftest import FakeVIES
+
+from linkbay_billing import (
+    Address,
+    CachedVIESValidator,
+    Customer,
+    InvoiceResponse,
+    TaxInfo,
+    check_tax_code,
+    check_vat_number,
+    check_vat_numbers,
+)
+from linkbay_billing.exceptions import InvalidInvoiceDataError, InvalidVATNumberError
+
+
+@pytest.mark.parametrize(
+    "vat_number,country,expected",
+    [
+        ("IT01234560017", "IT", True),
+        ("IT 007 431 101 57", "it", True),
+        ("12345678901", "IT", False),
+        ("IT0123456001", "IT", False),
+        ("12345", "SE", None),
+    ],
+)
+def test_check_vat_number(vat_number, country, expected):
+    assert check_vat_number(vat_number, country) is expected
+
+
+@pytest.mark.parametrize(
+    "tax_code",
+    [
+        "RSSMRA80A01H501U",
+        "rssmra 80a01 h501u",
+        "RSSMRA80A41H501Y",  # Woman born on the 1st
+        "RSSMRA80B69H501U",  # February 29th
+        "RSSMRA80A01H50MM",  # Omocodia on the municipality code
+        "RSSMRA80A3MH501P",  # Omocodia on the day (31)
+        "RSSMRAULALMHRLMD",  # Omocodia on every digit
+        "01234560017",  # Company
+    ],
+)
+def test_valid_tax_codes(tax_code):
+    assert check_tax_code(tax_code)
+
+
+@pytest.mark.parametrize(
+    "tax_code",
+    [
+        "RSSMRA80A01H501X",  # Check letter
+        "RSSMRA80F01H501U",  # No month F
+        "RSSMRA80A00H501V",
+        "RSSMRA80A32H501C",
+        "RSSMRA80A40H501Z",
+        "RSSMRA80A72H501G",
+        "RSSMRA80B30H501X",  # February 30th
+        "RSSMRA80B70H501B",
+        "RSSMRA80D31H501D",  # April 31st
+        "12345678901",
+    ],
+)
+def test_invalid_tax_codes(tax_code):
+    assert not check_tax_code(tax_code)
+
+
+def test_check_vat_numbers_rejects_non_ascii_digits():
+    numbers = [("0\u0661234560017", "IT"), ("IT\uff10\uff11234560017", "IT"), ("01234560017", "IT")]
+    
+    assert check_vat_numbers(numbers) == [False, False, True]
+    assert check_vat_numbers(numbers) == [check_vat_number(*pair) for pair in numbers]
+
+
+def customer(country, tax_code):
+    return Customer(
+        id="cust_2",
+        name="Maria Garcia",
+        address=Address(street="Calle Mayor 1", city="Madrid", postal_code="28013", country=country),
+        tax_info=TaxInfo(tax_code=tax_code),
+        email="maria@example.com",
+    )
+
+
+async def test_tax_code_checked_for_italian_parties(storage, manager, make_invoice):
+    with pytest.raises(InvalidInvoiceDataError) as info:
+        await manager.create_invoice(
+            "t1", make_invoice(customer=customer("IT", "RSSMRA80A32H501C"))
+        )
+    assert info.value.field == "customer.tax_info.tax_code"
+    
+    bulk = await manager.create_invoices_bulk(
+        "t1", [make_invoice(customer=customer("IT", "RSSMRA80A32H501C"))]
+    )
+    assert "codice fiscale" in bulk.results[0].error
+    assert storage.invoices == {}
+    
+    # Foreign tax IDs are not codici fiscali
+    created = await manager.create_invoice(
+        "t1", make_invoice(customer=customer("ES", "12345678Z"))
+    )
+    assert created.customer.tax_info.tax_code == "12345678Z"
+    record = storage.invoices[created.id]
+    assert InvoiceResponse(**record).customer.tax_info.tax_code == "12345678Z"
+
+
+def reverse_charge_invoice(make_invoice, vat_number):
+    customer = Customer(
+        id="cust_2",
+        name="Buyer SRL",
+        address=Address(street="Via Po 2", city="Torino", postal_code="10100", country="IT"),
+        tax_info=TaxInfo(vat_number=vat_number),
+        email="buyer@example.com",
+        is_company=True,
+    )
+    return make_invoice(customer=customer, reverse_charge=True)
+
+
+async def test_malformed_buyer_vat_never_reaches_vies(
+    storage, manager_factory, make_invoice
+):
+    backend = FakeVIES()
+    manager = manager_factory(storage, vies_validator=CachedVIESValidator(backend))
+    
+    with pytest.raises(InvalidVATNumberError):
+        await manager.create_invoice(
+            "t1", reverse_charge_invoice(make_invoice, "12345678901")
+        )
+    assert backend.calls == []
+    
+    await manager.create_invoice("t1", reverse_charge_invoice(make_invoice, "01234560017"))
+    assert backend.calls == [("IT", "01234560017")]
+
+
+async def test_plain_validator_answer_is_used(storage, manager_factory, make_invoice):
+    backend = FakeVIES(registered=())
+    manager = manager_factory(storage, vies_validator=backend)
+    
+    with pytest.raises(InvalidVATNumberError):
+        await manager.create_invoice(
+            "t1", reverse_charge_invoice(make_invoice, "01234560017")
+        )
+    assert len(backend.calls) == 1
@@ -0,0 +1,136 @@
+"""VAT reports from invoice scans and from daily aggregates."""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from conftest import ConditionalStorage, MemoryStorage
+
+from linkbay_billing import CreditNoteCreate, InMemoryVATAggregateStore, InvoiceRow
+from linkbay_billing.services.reporting import ReportingService
+
+PERIOD = (date(2025, 1, 1), date(2025, 3, 31))
+
+
+def rows():
+    return [
+        InvoiceRow(
+            description="Consulting",
+            quantity=Decimal("3"),
+            unit_price=Decimal("33.335"),
+            vat_rate=Decimal("22"),
+        ),
+        InvoiceRow(
+            description="Books",
+            quantity=Decimal("1"),
+            unit_price=Decimal("15.50"),
+            vat_rate=Decimal("4"),
+        ),
+    ]
+
+
+def report_data(report):
+    data = report.model_dump(exclude={"generated_at", "vat_by_rate"})
+    data["vat_by_rate"] = {
+        summary.vat_rate: (summary.taxable_amount, summary.vat_amount)
+        for summary in report.vat_by_rate
+    }
+    return data
+
+
+async def issue_documents(manager, make_invoice):
+    """Invoices of every kind the report has to handle, on several days."""
+    plain = await manager.create_invoice("t1", make_invoice(rows=rows()))
+    await manager.create_invoice(
+        "t1", make_invoice(rows=rows(), issue_date=date(2025, 2, 3), split_payment=True)
+    )
+    await manager.create_invoice(
+        "t1", make_invoice(rows=rows(), issue_date=date(2025, 2, 3), reverse_charge=True)
+    )
+    canceled = await manager.create_invoice("t1", make_invoice(issue_date=date(2025, 3, 1)))
+    await manager.cancel_invoice("t1", canceled.id)
+    
+    credited = await manager.create_invoice("t1", make_invoice(rows=rows()))
+    await manager.create_credit_note(
+        "t1",
+        CreditNoteCreate(
+            original_invoice_id=credited.id,
+            reason="returned books",
+            row_indices=[1],
+            issue_date=date(2025, 2, 3),
+        ),
+    )
+    await manager.create_credit_note(
+        "t1",
+        CreditNoteCreate(
+            original_invoice_id=plain.id,
+            reason="wrong customer",
+            issue_date=date(2025, 3, 1),
+        ),
+    )
+    
+    # Canceled credit notes are reversed as well
+    note = await manager.create_credit_note(
+        "t1",
+        CreditNoteCreate(
+            original_invoice_id=credited.id,
+            reason="duplicate",
+            row_indices=[0],
+            issue_date=date(2025, 3, 1),
+        ),
+    )
+    await manager.cancel_invoice("t1", note.id)
+
+
+@pytest.mark.parametrize("storage_class", [MemoryStorage, ConditionalStorage])
+async def test_aggregate_report_equals_scan(manager_factory, make_invoice, storage_class):
+    storage = storage_class()
+    aggregates = InMemoryVATAggregateStore()
+    manager = manager_factory(storage, vat_aggregates=aggregates)
+    await issue_documents(manager, make_invoice)
+    
+    scanned = await ReportingService(storage).generate_vat_report("t1", *PERIOD)
+    aggregated = await ReportingService(
+        storage, vat_aggregates=aggregates
+    ).generate_vat_report("t1", *PERIOD)
+    
+    assert report_data(aggregated) == report_data(scanned)
+    assert await ReportingService(
+        storage, vat_aggregates=aggregates
+    ).check_vat_aggregates("t1", *PERIOD) == []
+
+
+async def test_report_amounts(storage, manager_factory, make_invoice):
+    manager = manager_factory(storage)
+    await issue_documents(manager, make_invoice)
+    
+    report = await ReportingService(storage).generate_vat_report("t1", *PERIOD)
+    
+    # Rows: 100.00 at 22% (VAT 22.00) and 15.50 at 4% (VAT 0.62)
+    # plain - full credit + split payment + reverse charge + credited - books
+    assert report.total_invoices == 6
+    assert report_data(report)["vat_by_rate"] == {
+        Decimal("22"): (Decimal("300.00"), Decimal("22.00")),
+        Decimal("4"): (Decimal("31.00"), Decimal("0.00")),
+    }
+    assert report.total_taxable == Decimal("331.00")
+    assert report.total_vat == Decimal("22.00")
+    assert report.total_gross == Decimal("353.00")
+
+
+async def test_records_without_vat_summaries(storage, manager_factory, make_invoice):
+    aggregates = InMemoryVATAggregateStore()
+    manager = manager_factory(storage)
+    await issue_documents(manager, make_invoice)
+    for record in storage.invoices.values():
+        del record["vat_summaries"]
+    reporting = ReportingService(storage, vat_aggregates=aggregates)
+    
+    await reporting.rebuild_vat_aggregates("t1", *PERIOD)
+    
+    scanned = await ReportingService(storage).generate_vat_report("t1", *PERIOD)
+    aggregated = await reporting.generate_vat_report("t1", *PERIOD)
+    assert report_data(aggregated) == report_data(scanned)
+    assert scanned.total_vat == sum(
+        (summary.vat_amount for summary in scanned.vat_by_rate), Decimal("0")
+    )
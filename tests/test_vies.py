@@ -0,0 +1,115 @@
+"""Caching VIES validator."""
+
+import asyncio
+
+from conftest import FakeVIES
+
+from linkbay_billing.services.vies import CachedVIESValidator
+
+VALID = "IT01234560017"
+OTHER = "IT00743110157"
+
+
+async def test_results_are_cached():
+    backend = FakeVIES()
+    validator = CachedVIESValidator(backend)
+    
+    first = await validator.validate_vat_number(VALID, "IT")
+    second = await validator.validate_vat_number("IT 012 345 600 17", "it")
+    
+    assert first["valid"] and second == first
+    assert backend.calls == [("IT", "01234560017")]
+    assert validator.stats()["hits"] == 1
+
+
+async def test_negative_answers_expire_sooner():
+    backend = FakeVIES(registered=())
+    validator = CachedVIESValidator(backend, negative_ttl=0)
+    
+    assert (await validator.validate_vat_number(VALID, "IT"))["valid"] is False
+    backend.registered.add(VALID)
+    assert (await validator.validate_vat_number(VALID, "IT"))["valid"] is True
+    assert len(backend.calls) == 2
+
+
+async def test_malformed_numbers_are_rejected_offline():
+    backend = FakeVIES()
+    validator = CachedVIESValidator(backend)
+    
+    result = await validator.validate_vat_number("12345678901", "IT")
+    
+    assert result["valid"] is False
+    assert backend.calls == []
+    assert validator.stats()["rejected"] == 1
+
+
+async def test_concurrent_lookups_share_one_request():
+    backend = FakeVIES(delay=0.01)
+    validator = CachedVIESValidator(backend)
+    
+    results = await validator.validate_many([(VALID, "IT")] * 5 + [(OTHER, "IT")] * 5)
+    
+    assert all(result["valid"] for result in results)
+    assert sorted(backend.calls) == [("IT", "00743110157"), ("IT", "01234560017")]
+
+
+async def test_backend_concurrency_is_limited():
+    backend = FakeVIES(registered=(), delay=0.01)
+    validator = CachedVIESValidator(backend, max_concurrency=2)
+    numbers = [(str(number), "SE") for number in range(6)]
+    
+    await validator.validate_many(numbers)
+    
+    assert len(backend.calls) == 6
+    assert backend.max_running == 2
+
+
+def test_validator_can_be_created_outside_a_loop_and_reused_across_loops():
+    backend = FakeVIES(delay=0.01)
+    validator = CachedVIESValidator(backend, positive_ttl=0, max_concurrency=1)
+    numbers = [(VALID, "IT"), (OTHER, "IT")]
+    
+    # Contention makes the semaphore bind to the loop it waits in
+    for _ in range(2):
+        results = asyncio.run(validator.validate_many(numbers))
+        assert all(result["valid"] for result in results)
+    assert len(backend.calls) == 4
+
+
+async def test_circuit_opens_and_serves_expired_answers():
+    backend = FakeVIES()
+    validator = CachedVIESValidator(
+        backend, positive_ttl=0, failure_threshold=2, reset_timeout=60
+    )
+    assert (await validator.validate_vat_number(VALID, "IT"))["valid"]
+    backend.fail = True
+    
+    for _ in range(2):
+        # Failed lookups fall back to the expired answer
+        assert (await validator.validate_vat_number(VALID, "IT"))["valid"]
+    assert validator.circuit_open
+    
+    calls = len(backend.calls)
+    assert (await validator.validate_vat_number(VALID, "IT"))["valid"]
+    assert (await validator.validate_vat_number(OTHER, "IT"))["valid"] is None
+    assert len(backend.calls) == calls
+
+
+async def test_trial_request_closes_the_circuit():
+    backend = FakeVIES()
+    backend.fail = True
+    validator = CachedVIESValidator(backend, failure_threshold=1, reset_timeout=0)
+    
+    assert (await validator.validate_vat_number(VALID, "IT"))["valid"] is None
+    backend.fail = False
+    
+    assert (await validator.validate_vat_number(VALID, "IT"))["valid"] is True
+    assert not validator.circuit_open
+    assert validator.stats()["failures"] == 1
+
+
+async def test_slow_backend_counts_as_failure():
+    validator = CachedVIESValidator(FakeVIES(delay=0.1), timeout=0.001)
+
+    assert (await validator.validate_vat_number(VALID, "IT"))["valid"] is None
+    assert validator.stats()["failures"] == 1